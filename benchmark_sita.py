@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Benchmark Sita Liczb Pierwszych
+Mierzy przepustowość jąder sita segmentowanego na bieżącym komputerze
+i porównuje je z poprzednią, skalarną implementacją.
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import pickle
+import sys
+import time
+from multiprocessing import Pool
+from typing import Callable, Dict, List, Set, Tuple
+
+import numpy as np
+
+import generuj_cache_pierwszych as gcp
+
+
+def segmentowane_sito_z_kolem_skalarne(
+        start: int, koniec: int, pierwsze_podstawowe: np.ndarray) -> Set[int]:
+    """Poprzednie jądro sita koła 30 - znakowanie pętlą Pythona (punkt odniesienia)."""
+    if start > koniec:
+        return set()
+
+    wzorzec_kola = np.array([1, 7, 11, 13, 17, 19, 23, 29])
+    rozmiar_kola = 30
+
+    bloki_start = start // rozmiar_kola
+    bloki_koniec = koniec // rozmiar_kola
+    rozmiar_segmentu = (bloki_koniec - bloki_start + 1) * len(wzorzec_kola)
+
+    segment = np.ones(rozmiar_segmentu, dtype=bool)
+
+    def indeks_do_liczby(idx):
+        blok = idx // len(wzorzec_kola)
+        pos_w_bloku = idx % len(wzorzec_kola)
+        return (bloki_start + blok) * rozmiar_kola + wzorzec_kola[pos_w_bloku]
+
+    def liczba_do_indeksu(liczba):
+        blok = liczba // rozmiar_kola - bloki_start
+        reszta = liczba % rozmiar_kola
+        try:
+            pos_w_bloku = np.where(wzorzec_kola == reszta)[0][0]
+            return blok * len(wzorzec_kola) + pos_w_bloku
+        except IndexError:
+            return -1
+
+    for p in pierwsze_podstawowe:
+        if p <= 5:
+            continue
+        if p * p > koniec:
+            break
+
+        pierwsza_wielokrotnosc = ((start + p - 1) // p) * p
+        if pierwsza_wielokrotnosc < p * p:
+            pierwsza_wielokrotnosc = p * p
+
+        for wielokrotnosc in range(pierwsza_wielokrotnosc, koniec + 1, p):
+            idx = liczba_do_indeksu(wielokrotnosc)
+            if 0 <= idx < len(segment):
+                segment[idx] = False
+
+    pierwsze_w_segmencie = set()
+    for i in range(len(segment)):
+        if segment[i]:
+            liczba = indeks_do_liczby(i)
+            if start <= liczba <= koniec:
+                pierwsze_w_segmencie.add(liczba)
+
+    return pierwsze_w_segmencie
+
+
+def zmierz_jadro(jadro: Callable, start: int, rozmiar: int, powtorzenia: int) -> Dict[str, float]:
+    """Zmierz najlepszy czas jądra dla segmentu [start, start + rozmiar)."""
+    koniec = start + rozmiar - 1
+    pierwsze_podstawowe = gcp.generuj_podstawowe_pierwsze(koniec)
+
+    najlepszy = float('inf')
+    znalezione = 0
+    for _ in range(powtorzenia):
+        t0 = time.perf_counter()
+        wynik = jadro(start, koniec, pierwsze_podstawowe)
+        najlepszy = min(najlepszy, time.perf_counter() - t0)
+        znalezione = len(wynik)
+
+    return {
+        'czas': najlepszy,
+        'liczb_na_sekunde': rozmiar / najlepszy,
+        'znalezione': znalezione
+    }
+
+
+def porownaj_jadra(start: int, rozmiar: int, powtorzenia: int):
+    """Porównaj jądro wektorowe z poprzednim jądrem skalarnym."""
+    print(f"\n=== JĄDRO SEGMENTU KOŁA 30 ===")
+    print(f"Segment: {start:,} - {start + rozmiar - 1:,} ({rozmiar:,} liczb)")
+
+    wyniki = {}
+    for nazwa, jadro in [('skalarne', segmentowane_sito_z_kolem_skalarne),
+                         ('wektorowe', gcp.segmentowane_sito_z_kolem)]:
+        wyniki[nazwa] = zmierz_jadro(jadro, start, rozmiar, powtorzenia)
+        print(f"  {nazwa:<10} {wyniki[nazwa]['czas']:8.3f} s  "
+              f"{wyniki[nazwa]['liczb_na_sekunde']:14,.0f} liczb/s  "
+              f"({wyniki[nazwa]['znalezione']:,} pierwszych)")
+
+    if wyniki['skalarne']['znalezione'] != wyniki['wektorowe']['znalezione']:
+        print("  ❌ Jądra zwróciły różną liczbę liczb pierwszych!")
+    print(f"  Przyspieszenie: {wyniki['skalarne']['czas'] / wyniki['wektorowe']['czas']:.1f}x")
+
+
+def _zadanie_puste(args) -> int:
+    """Zadanie bez pracy - mierzy sam koszt rozesłania argumentów do procesów."""
+    return 0
+
+
+def _zadania_segmentow(limit: int, rozmiar_segmentu: int) -> List[Tuple[int, int]]:
+    """Granice segmentów tak jak w segmentowane_sito_rownolegle."""
+    start_segmentow = max(math.isqrt(limit) + 1, 1000)
+    return [(s, min(s + rozmiar_segmentu - 1, limit))
+            for s in range(start_segmentow, limit + 1, rozmiar_segmentu)]
+
+
+def _domyslny_chunksize(liczba_zadan: int, procesy: int) -> int:
+    """Rozmiar paczki zadań wybierany przez Pool.map, gdy nie podano chunksize."""
+    chunksize, reszta = divmod(liczba_zadan, procesy * 4)
+    return chunksize + 1 if reszta else max(1, chunksize)
+
+
+def _bajty_ipc(argumenty: list, chunksize: int) -> int:
+    """Suma rozmiarów paczek zadań zapiklowanych tak, jak wysyła je pula."""
+    return sum(len(pickle.dumps(argumenty[i:i + chunksize], protocol=pickle.HIGHEST_PROTOCOL))
+               for i in range(0, len(argumenty), chunksize))
+
+
+def porownaj_ladunek_zadan(limit: int, rozmiar_segmentu: int, procesy: int):
+    """
+    Porównaj koszt IPC zadań z liczbami bazowymi w krotce i z pamięcią współdzieloną.
+
+    Bajty to suma zapiklowanych paczek zadań; opóźnienie to czas rozesłania
+    wszystkich zadań do puli z pustą funkcją roboczą (bez samego przesiewania).
+    Pomiar obejmuje domyślne paczkowanie Pool.map i pojedyncze zadania (chunksize=1).
+    """
+    pierwsze_podstawowe = gcp.generuj_podstawowe_pierwsze(limit)
+    zadania = _zadania_segmentow(limit, rozmiar_segmentu)
+
+    print(f"\n=== ŁADUNEK ZADAŃ PULI (limit {limit:,}) ===")
+    print(f"Segmenty: {len(zadania):,} x {rozmiar_segmentu:,}, "
+          f"liczby bazowe: {len(pierwsze_podstawowe):,} ({pierwsze_podstawowe.nbytes:,} B)")
+
+    pamiec = gcp.opublikuj_w_pamieci_wspoldzielonej(pierwsze_podstawowe)
+    try:
+        warianty = {
+            'krotka': ([(s, k, pierwsze_podstawowe) for s, k in zadania], {}),
+            'wspoldzielona': (zadania, {
+                'initializer': gcp._inicjalizuj_worker,
+                'initargs': (pamiec.name, len(pierwsze_podstawowe),
+                             pierwsze_podstawowe.dtype.str)}),
+        }
+
+        for chunksize in (_domyslny_chunksize(len(zadania), procesy), 1):
+            print(f"  chunksize={chunksize}:")
+            wyniki = {}
+            for nazwa, (argumenty, opcje_puli) in warianty.items():
+                bajty = _bajty_ipc(argumenty, chunksize)
+                with Pool(processes=procesy, **opcje_puli) as pool:
+                    t0 = time.perf_counter()
+                    pool.map(_zadanie_puste, argumenty, chunksize)
+                    opoznienie = time.perf_counter() - t0
+                wyniki[nazwa] = (bajty, opoznienie)
+                print(f"    {nazwa:<14} {bajty:16,} B IPC  {opoznienie:8.3f} s rozsyłania")
+
+            bajty_krotka, czas_krotka = wyniki['krotka']
+            bajty_wspolne, czas_wspolny = wyniki['wspoldzielona']
+            print(f"    Mniej bajtów: {bajty_krotka / bajty_wspolne:.1f}x, "
+                  f"szybsze rozsyłanie: {czas_krotka / czas_wspolny:.1f}x")
+    finally:
+        pamiec.close()
+        pamiec.unlink()
+
+
+def porownaj_tryby_wyniku(limit: int, rozmiar_segmentu: int, procesy: int):
+    """Porównaj odsyłanie tablic z segmentów z zapisem do współdzielonej bitmapy."""
+    print(f"\n=== ZWRACANIE WYNIKÓW PULI (limit {limit:,}) ===")
+    czasy = {}
+    for nazwa, bez_kopiowania in [('tablice', False), ('bitmapa', True)]:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            wynik = gcp.segmentowane_sito_rownolegle(
+                limit, rozmiar_segmentu, procesy, bez_kopiowania)
+        czasy[nazwa] = time.perf_counter() - t0
+        print(f"  {nazwa:<10} {czasy[nazwa]:8.3f} s  ({len(wynik):,} pierwszych)")
+        del wynik
+    print(f"  Przyspieszenie: {czasy['tablice'] / czasy['bitmapa']:.2f}x")
+
+
+def porownaj_backendy(limit: int, rozmiar_segmentu: int, procesy: int):
+    """Porównaj pulę procesów z pulą wątków (ten sam kernel, bitmapa wyniku)."""
+    print(f"\n=== PROCESY A WĄTKI (limit {limit:,}, {procesy} wykonawców) ===")
+    czasy = {}
+    for backend in gcp.BACKENDY:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            wynik = gcp.segmentowane_sito_rownolegle(
+                limit, rozmiar_segmentu, procesy, backend=backend)
+        czasy[backend] = time.perf_counter() - t0
+        print(f"  {backend:<10} {czasy[backend]:8.3f} s  ({len(wynik):,} pierwszych)")
+        del wynik
+    print(f"  Przyspieszenie wątków: {czasy['procesy'] / czasy['watki']:.2f}x")
+
+
+def zmierz_przesiewanie_zakresu(
+        start: int,
+        zakres: int,
+        rozmiar_segmentu: int,
+        blok_podreczny: int,
+        pierwsze_podstawowe: np.ndarray) -> float:
+    """Czas przesiania [start, start + zakres) segmentami danego rozmiaru (jeden proces)."""
+    t0 = time.perf_counter()
+    for segment_start in range(start, start + zakres, rozmiar_segmentu):
+        segment_koniec = min(segment_start + rozmiar_segmentu, start + zakres) - 1
+        gcp.segmentowane_sito_z_kolem(
+            segment_start, segment_koniec, pierwsze_podstawowe, blok_podreczny)
+    return time.perf_counter() - t0
+
+
+def porownaj_rozmiary_segmentow(start: int, zakres: int):
+    """
+    Przepustowość sita koła dla segmentów od 1/4 do 32 rozmiarów L2 tego komputera.
+
+    Każdy rozmiar mierzony jest bez podbloków oraz z podblokami wielkości L1d i L2.
+    """
+    pamiec_podreczna = gcp.wykryj_pamiec_podreczna()
+    bajty_l1, bajty_l2 = pamiec_podreczna['l1d'], pamiec_podreczna['l2']
+    liczby_na_bajt = gcp.ROZMIAR_KOLA / len(gcp.WZORZEC_KOLA)
+
+    print(f"\n=== ROZMIAR SEGMENTU (L1d {bajty_l1 // 1024} KB, L2 {bajty_l2 // 1024} KB) ===")
+    print(f"Zakres: {start:,} - {start + zakres - 1:,}")
+    pierwsze_podstawowe = gcp.generuj_podstawowe_pierwsze(start + zakres)
+    zalecany = gcp.rozmiar_segmentu_dla_pamieci_podrecznej(start + zakres, 1, pamiec_podreczna)
+
+    bloki = [('bez podbloków', 0),
+             ('podbloki L1d', gcp.blok_podreczny_dla_bajtow(bajty_l1)),
+             ('podbloki L2', gcp.blok_podreczny_dla_bajtow(bajty_l2))]
+    print(f"  {'segment':>14} {'pamięć':>9}" + ''.join(f" {nazwa:>15}" for nazwa, _ in bloki))
+    for wielokrotnosc_l2 in [0.25, 1, 4, 16, 32]:
+        rozmiar = int(wielokrotnosc_l2 * bajty_l2 * liczby_na_bajt)
+        rozmiar -= rozmiar % gcp.ROZMIAR_KOLA
+        przepustowosci = [zakres / zmierz_przesiewanie_zakresu(
+            start, zakres, rozmiar, blok, pierwsze_podstawowe) for _, blok in bloki]
+        znacznik = ' <- domyślny' if wielokrotnosc_l2 == gcp.WIELOKROTNOSC_L2_SEGMENTU else ''
+        print(f"  {rozmiar:14,} {wielokrotnosc_l2:7g}L2" +
+              ''.join(f" {p / 1e6:11.1f} M/s" for p in przepustowosci) + znacznik)
+    print(f"  Rozmiar wybrany przez oblicz_optymalne_parametry: {zalecany:,}")
+
+
+def main():
+    """Główna funkcja benchmarku."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark jąder sita liczb pierwszych",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Przykłady użycia:
+  %(prog)s                          # Segment 1M liczb od 10^8
+  %(prog)s --start 1000000000       # Segment wysoko (więcej liczb bazowych)
+  %(prog)s --rozmiar 200000 --powtorzenia 5
+  %(prog)s --ipc 1000000000 10000000000   # Koszt IPC zadań puli
+  %(prog)s --wyniki 1000000000            # Tablice z segmentów vs wspólna bitmapa
+  %(prog)s --segmenty                     # Przepustowość dla rozmiarów segmentu (L1d/L2)
+  %(prog)s --backendy 10000000 100000000  # Pula procesów vs pula wątków
+        """
+    )
+
+    parser.add_argument('--start', type=int, default=10**8,
+                        help='Początek mierzonego segmentu (domyślnie: 100000000)')
+    parser.add_argument('--rozmiar', type=int, default=10**6,
+                        help='Rozmiar mierzonego segmentu (domyślnie: 1000000)')
+    parser.add_argument('--powtorzenia', type=int, default=3,
+                        help='Liczba powtórzeń pomiaru (domyślnie: 3)')
+    parser.add_argument('--ipc', type=int, nargs='+', metavar='LIMIT',
+                        help='Zmierz koszt IPC zadań puli dla podanych limitów')
+    parser.add_argument('--wyniki', type=int, nargs='+', metavar='LIMIT',
+                        help='Porównaj tryby zwracania wyników puli dla podanych limitów')
+    parser.add_argument('--backendy', type=int, nargs='+', metavar='LIMIT',
+                        help='Porównaj pulę procesów z pulą wątków dla podanych limitów')
+    parser.add_argument('--segmenty', action='store_true',
+                        help='Zmierz przepustowość dla różnych rozmiarów segmentu od --start')
+    parser.add_argument('--zakres', type=int, default=3 * 10**8,
+                        help='Długość przesiewanego zakresu dla --segmenty (domyślnie: 300000000)')
+    parser.add_argument('--segment', type=int, default=10**6,
+                        help='Rozmiar segmentu dla pomiarów puli (domyślnie: 1000000)')
+    parser.add_argument('--procesy', type=int, default=2,
+                        help='Liczba procesów dla pomiarów puli (domyślnie: 2)')
+
+    args = parser.parse_args()
+
+    # Paski postępu generowania liczb bazowych tylko zaśmiecają wyniki
+    gcp.PROGRESS_CALLBACK = lambda aktualny, calkowity, prefix: None
+
+    print("=== BENCHMARK SITA LICZB PIERWSZYCH ===")
+    if args.segmenty:
+        porownaj_rozmiary_segmentow(args.start, args.zakres)
+    elif args.ipc or args.wyniki or args.backendy:
+        for limit in args.ipc or []:
+            porownaj_ladunek_zadan(limit, args.segment, args.procesy)
+        for limit in args.wyniki or []:
+            porownaj_tryby_wyniku(limit, args.segment, args.procesy)
+        for limit in args.backendy or []:
+            porownaj_backendy(limit, args.segment, args.procesy)
+    else:
+        porownaj_jadra(args.start, args.rozmiar, args.powtorzenia)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nOperacja przerwana przez użytkownika.")
+        sys.exit(1)
@@ -7,13 +7,14 @@ Program eksportuje wszystkie liczby pierwsze z cache do pliku CSV.
 import argparse
 import csv
 import os
-import pickle
 import sys
 import time
-from typing import Set
+from typing import Iterable, Iterator, List, Tuple, Union
 
-# Nazwa domyślnego pliku cache
-PLIK_CACHE_PIERWSZYCH = "pierwsze_cache.pkl"
+import numpy as np
+
+from format_cache import PLIK_CACHE_PIERWSZYCH, CachePierwszych, jako_posortowana_tablica, \
+    znajdz_plik_cache
 
 
 def wyswietl_postep(aktualny, calkowity, prefix="Postęp", dlugosc=50):
@@ -28,32 +29,35 @@ def wyswietl_postep(aktualny, calkowity, prefix="Postęp", dlugosc=50):
         sys.stdout.flush()
 
 
-def wczytaj_cache(nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH):
-    """Wczytaj cache liczb pierwszych z pliku."""
+def bloki_pierwszych(pierwsze: Union[CachePierwszych, Iterable[int]]) -> Iterator[np.ndarray]:
+    """
+    Posortowane liczby pierwsze blokami - otwarty cache czytany kawałkami, tablica
+    lub zbiór w jednym bloku.
+    """
+    if isinstance(pierwsze, CachePierwszych):
+        return pierwsze.bloki()
+    return iter([jako_posortowana_tablica(pierwsze)])
+
+
+def wczytaj_cache(nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH) -> Tuple[CachePierwszych, int]:
+    """Otwórz cache liczb pierwszych z pliku (mapowany - eksport czyta go blokami)."""
+    nazwa_pliku = znajdz_plik_cache(nazwa_pliku)
     if not os.path.exists(nazwa_pliku):
         raise FileNotFoundError(f"Plik cache '{nazwa_pliku}' nie istnieje")
 
     try:
-        with open(nazwa_pliku, 'rb') as f:
-            dane = pickle.load(f)
-
-        pierwsze = dane.get('pierwsze', set())
-        max_sprawdzone = dane.get('max_sprawdzone', 0)
-
-        if not isinstance(pierwsze, set):
-            pierwsze = set(pierwsze) if pierwsze else set()
-
-        return pierwsze, max_sprawdzone, dane
+        cache = CachePierwszych(nazwa_pliku)
+        return cache, cache.max_sprawdzone
 
     except Exception as e:
         raise Exception(f"Błąd podczas wczytywania cache: {e}")
 
 
-def eksportuj_do_csv_podstawowy(pierwsze: Set[int], nazwa_pliku: str):
+def eksportuj_do_csv_podstawowy(pierwsze: Union[CachePierwszych, Iterable[int]], nazwa_pliku: str):
     """Eksportuj liczby pierwsze do prostego pliku CSV (jedna kolumna)."""
     print(f"Eksportowanie do prostego CSV: {nazwa_pliku}")
 
-    posortowane_pierwsze = sorted(pierwsze)
+    liczba_pierwszych = len(pierwsze)
 
     try:
         with open(nazwa_pliku, 'w', newline='', encoding='utf-8') as csvfile:
@@ -62,13 +66,14 @@ def eksportuj_do_csv_podstawowy(pierwsze: Set[int], nazwa_pliku: str):
             # Nagłówek
             writer.writerow(['liczba_pierwsza'])
 
-            # Zapisz liczby pierwsze z paskiem postępu
-            for i, liczba in enumerate(posortowane_pierwsze):
-                if i % max(1, len(posortowane_pierwsze) //
-                           100) == 0 or i == len(posortowane_pierwsze) - 1:
-                    wyswietl_postep(i + 1, len(posortowane_pierwsze), "Zapisywanie CSV")
-
-                writer.writerow([liczba])
+            # Zapisz liczby pierwsze blokami z paskiem postępu - bez rozpakowania całego cache
+            zapisane = 0
+            for blok in bloki_pierwszych(pierwsze):
+                if len(blok) == 0:
+                    continue
+                writer.writerows(zip(blok.tolist()))
+                zapisane += len(blok)
+                wyswietl_postep(zapisane, liczba_pierwszych, "Zapisywanie CSV")
 
         print(f"✅ Eksport zakończony: {nazwa_pliku}")
         return True
@@ -78,11 +83,14 @@ def eksportuj_do_csv_podstawowy(pierwsze: Set[int], nazwa_pliku: str):
         return False
 
 
-def eksportuj_do_csv_zaawansowany(pierwsze: Set[int], nazwa_pliku: str, chunk_size: int = 10000):
+def eksportuj_do_csv_zaawansowany(
+        pierwsze: Union[CachePierwszych, Iterable[int]],
+        nazwa_pliku: str,
+        chunk_size: int = 10000):
     """Eksportuj liczby pierwsze do CSV z dodatkowymi informacjami."""
     print(f"Eksportowanie do zaawansowanego CSV: {nazwa_pliku}")
 
-    posortowane_pierwsze = sorted(pierwsze)
+    liczba_pierwszych = len(pierwsze)
 
     try:
         with open(nazwa_pliku, 'w', newline='', encoding='utf-8') as csvfile:
@@ -97,32 +105,32 @@ def eksportuj_do_csv_zaawansowany(pierwsze: Set[int], nazwa_pliku: str, chunk_si
                 'chunk_id'
             ])
 
-            # Zapisz liczby pierwsze z dodatkowymi informacjami
+            # Zapisz liczby pierwsze z dodatkowymi informacjami, liczonymi dla całego bloku
+            zapisane = 0
             poprzednia_pierwsza = 0
 
-            for i, liczba in enumerate(posortowane_pierwsze):
-                if i % max(1, len(posortowane_pierwsze) //
-                           100) == 0 or i == len(posortowane_pierwsze) - 1:
-                    wyswietl_postep(i + 1, len(posortowane_pierwsze), "Zapisywanie CSV")
-
-                # Oblicz różnicę od poprzedniej liczby pierwszej
-                roznica = liczba - poprzednia_pierwsza if poprzednia_pierwsza > 0 else 0
-
-                # Sprawdź czy to liczba pierwsza bliźniacza (różnica 2)
-                czy_blizniacza = roznica == 2
-
-                # ID chunka (grupowanie po chunk_size)
-                chunk_id = i // chunk_size
-
-                writer.writerow([
-                    i + 1,           # indeks (1-based)
-                    liczba,          # liczba pierwsza
-                    roznica,         # różnica od poprzedniej
-                    czy_blizniacza,  # czy bliźniacza
-                    chunk_id         # ID chunka
-                ])
-
-                poprzednia_pierwsza = liczba
+            for blok in bloki_pierwszych(pierwsze):
+                if len(blok) == 0:
+                    continue
+                liczby = blok.astype(np.int64)
+                indeksy = np.arange(zapisane, zapisane + len(liczby))
+
+                # Różnica od poprzedniej liczby pierwszej (0 dla pierwszej w cache)
+                roznice = np.diff(liczby, prepend=poprzednia_pierwsza)
+                if poprzednia_pierwsza == 0:
+                    roznice[0] = 0
+
+                writer.writerows(zip(
+                    (indeksy + 1).tolist(),           # indeks (1-based)
+                    liczby.tolist(),                  # liczba pierwsza
+                    roznice.tolist(),                 # różnica od poprzedniej
+                    (roznice == 2).tolist(),          # czy bliźniacza (różnica 2)
+                    (indeksy // chunk_size).tolist()  # ID chunka (grupowanie po chunk_size)
+                ))
+
+                zapisane += len(liczby)
+                poprzednia_pierwsza = int(liczby[-1])
+                wyswietl_postep(zapisane, liczba_pierwszych, "Zapisywanie CSV")
 
         print(f"✅ Eksport zakończony: {nazwa_pliku}")
         return True
@@ -132,49 +140,64 @@ def eksportuj_do_csv_zaawansowany(pierwsze: Set[int], nazwa_pliku: str, chunk_si
         return False
 
 
+def nazwy_chunkow(
+        nazwa_bazowa: str,
+        liczba_pierwszych: int,
+        rozmiar_chunka: int = 1000000) -> List[str]:
+    """
+    Pliki zapisywane przez eksportuj_do_csv_w_chunkach (jeden - nazwa_bazowa, gdy
+    cache mieści się w chunku).
+    """
+    if liczba_pierwszych <= rozmiar_chunka:
+        return [nazwa_bazowa]
+    nazwa_bez_rozszerzenia, rozszerzenie = os.path.splitext(nazwa_bazowa)
+    liczba_chunkow = (liczba_pierwszych + rozmiar_chunka - 1) // rozmiar_chunka
+    return [f"{nazwa_bez_rozszerzenia}_chunk_{numer:03d}{rozszerzenie or '.csv'}"
+            for numer in range(1, liczba_chunkow + 1)]
+
+
 def eksportuj_do_csv_w_chunkach(
-        pierwsze: Set[int],
+        pierwsze: Union[CachePierwszych, Iterable[int]],
         nazwa_bazowa: str,
         rozmiar_chunka: int = 1000000):
     """Eksportuj liczby pierwsze do wielu mniejszych plików CSV."""
-    posortowane_pierwsze = sorted(pierwsze)
+    liczba_pierwszych = len(pierwsze)
 
-    if len(posortowane_pierwsze) <= rozmiar_chunka:
-        print(f"Cache ma tylko {len(posortowane_pierwsze):,} liczb, eksportuję do jednego pliku")
+    if liczba_pierwszych <= rozmiar_chunka:
+        print(f"Cache ma tylko {liczba_pierwszych:,} liczb, eksportuję do jednego pliku")
         return eksportuj_do_csv_podstawowy(pierwsze, nazwa_bazowa)
 
     print(f"Eksportowanie do chunków po {rozmiar_chunka:,} liczb każdy")
 
-    liczba_chunkow = (len(posortowane_pierwsze) + rozmiar_chunka - 1) // rozmiar_chunka
+    pliki_chunkow = nazwy_chunkow(nazwa_bazowa, liczba_pierwszych, rozmiar_chunka)
+    liczba_chunkow = len(pliki_chunkow)
 
+    csvfile = None
     try:
-        for chunk_idx in range(liczba_chunkow):
-            start = chunk_idx * rozmiar_chunka
-            end = min(start + rozmiar_chunka, len(posortowane_pierwsze))
-
-            chunk_pierwsze = posortowane_pierwsze[start:end]
-
-            # Nazwa pliku dla chunka
-            nazwa_bez_rozszerzenia = os.path.splitext(nazwa_bazowa)[0]
-            rozszerzenie = os.path.splitext(nazwa_bazowa)[1] or '.csv'
-            nazwa_chunka = f"{nazwa_bez_rozszerzenia}_chunk_{chunk_idx + 1:03d}{rozszerzenie}"
-
-            print(
-                f"\nChunk {chunk_idx + 1}/{liczba_chunkow}: {len(chunk_pierwsze):,} liczb -> {nazwa_chunka}")
-
-            with open(nazwa_chunka, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-
-                # Nagłówek
-                writer.writerow(['indeks_globalny', 'liczba_pierwsza'])
-
-                # Zapisz chunk
-                for i, liczba in enumerate(chunk_pierwsze):
-                    if i % max(1, len(chunk_pierwsze) // 20) == 0 or i == len(chunk_pierwsze) - 1:
-                        wyswietl_postep(i + 1, len(chunk_pierwsze), f"Chunk {chunk_idx + 1}")
-
-                    indeks_globalny = start + i + 1
-                    writer.writerow([indeks_globalny, liczba])
+        # Bloki cache są dzielone na granicach chunków - plik chunka otwierany jest na jego początku
+        zapisane = 0
+        for blok in bloki_pierwszych(pierwsze):
+            while len(blok):
+                chunk_idx, w_chunku = divmod(zapisane, rozmiar_chunka)
+                dlugosc_chunka = min(rozmiar_chunka, liczba_pierwszych - chunk_idx * rozmiar_chunka)
+                if w_chunku == 0:
+                    if csvfile is not None:
+                        csvfile.close()
+                    nazwa_chunka = pliki_chunkow[chunk_idx]
+                    print(f"\nChunk {chunk_idx + 1}/{liczba_chunkow}: "
+                          f"{dlugosc_chunka:,} liczb -> {nazwa_chunka}")
+                    csvfile = open(nazwa_chunka, 'w', newline='', encoding='utf-8')
+                    writer = csv.writer(csvfile)
+
+                    # Nagłówek
+                    writer.writerow(['indeks_globalny', 'liczba_pierwsza'])
+
+                # Zapisz część bloku należącą do bieżącego chunka
+                czesc, blok = blok[:dlugosc_chunka - w_chunku], blok[dlugosc_chunka - w_chunku:]
+                numery = range(zapisane + 1, zapisane + len(czesc) + 1)
+                writer.writerows(zip(numery, czesc.tolist()))
+                zapisane += len(czesc)
+                wyswietl_postep(w_chunku + len(czesc), dlugosc_chunka, f"Chunk {chunk_idx + 1}")
 
         print(f"\n✅ Eksport chunków zakończony: {liczba_chunkow} plików")
         return True
@@ -183,6 +206,10 @@ def eksportuj_do_csv_w_chunkach(
         print(f"❌ Błąd podczas eksportu chunków: {e}")
         return False
 
+    finally:
+        if csvfile is not None:
+            csvfile.close()
+
 
 def wyswietl_statystyki_csv(nazwa_pliku: str, liczba_pierwszych: int):
     """Wyświetl statystyki utworzonego pliku CSV."""
@@ -208,7 +235,7 @@ Przykłady użycia:
   %(prog)s --plik moje_pierwsze.csv     # Własna nazwa pliku
   %(prog)s --zaawansowany               # CSV z dodatkowymi informacjami
   %(prog)s --chunki 500000              # Podziel na chunki po 500k
-  %(prog)s --cache moj_cache.pkl        # Użyj innego cache
+  %(prog)s --cache moj_cache.bin        # Użyj innego cache
         """
     )
 
@@ -239,14 +266,14 @@ Przykłady użycia:
     try:
         # Wczytaj cache
         print(f"Wczytywanie cache z: {args.cache}")
-        pierwsze, max_sprawdzone, dane_cache = wczytaj_cache(args.cache)
+        pierwsze, max_sprawdzone = wczytaj_cache(args.cache)
 
-        if not pierwsze:
+        if len(pierwsze) == 0:
             print("❌ Cache jest pusty - brak danych do eksportu")
             return
 
         print(f"Cache zawiera: {len(pierwsze):,} liczb pierwszych")
-        print(f"Zakres: {min(pierwsze):,} - {max(pierwsze):,}")
+        print(f"Zakres: {pierwsze.n_ta_pierwsza(1):,} - {pierwsze.n_ta_pierwsza(len(pierwsze)):,}")
         print(f"Maksymalna sprawdzona liczba: {max_sprawdzone:,}")
 
         # Eksportuj według wybranej opcji
@@ -0,0 +1,1139 @@
+#!/usr/bin/env python3
+"""
+Format Cache Liczb Pierwszych
+Binarny, wersjonowany plik cache: 128-bajtowy nagłówek (magia, wersja formatu,
+kodowanie, max_sprawdzone, liczność, najmniejsza i największa liczba, czas utworzenia,
+parametry generatora) i dane w jednym z trzech kodowań - posortowana tablica
+uint32/uint64 (wczytywana bez kopiowania przez np.memmap), bitmapa koła 30 (bajt na
+30 liczb, dla pełnego pokrycia zakresu) albo odstępy/2 w bajtach z indeksem bloków
+(dla rzadkich zbiorów dużych liczb). Zapis wybiera najmniejsze. Sumy CRC32 bloków
+danych wykrywają uszkodzenia bez ponownego sita; statystyki to odczyt nagłówka.
+Stary cache (pickle ze słownikiem ze zbiorem albo tablicą) jest nadal czytany;
+--migruj zamienia go na nowy format.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import struct
+import sys
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+# Domyślny plik cache i plik starego formatu (pickle), czytany, gdy nowego nie ma
+PLIK_CACHE_PIERWSZYCH = "pierwsze_cache.bin"
+PLIK_CACHE_PICKLE = "pierwsze_cache.pkl"
+
+# Nagłówek: magia, wersja formatu, maska liczb pierwszych spoza koła (bitmapa i
+# odstępy), kodowanie ('<u4'/'<u8' - tablica, 'k30' - bitmapa koła, 'od2' - odstępy),
+# max_sprawdzone, liczność, bajty odstępów, największa liczba, liczba bloków odstępów
+# i ich maksymalna liczność (w wersji 1 ostatnie cztery tylko dla odstępów)
+MAGIA_FORMATU = b'PIERWSZE'
+STRUKTURA_NAGLOWKA = struct.Struct('<8sHBx4sQQQQQI')
+# Wersja 2 dokłada metadane: najmniejszą liczbę, czas utworzenia (sekundy Unix),
+# liczbę i rozmiar bloków sum CRC32 danych oraz długość i CRC32 parametrów generatora
+# (JSON). Sumy (uint32) i parametry leżą za danymi (wyrównanymi do 4 bajtów), a ostatnie
+# 4 bajty nagłówka to CRC32 jego reszty. Nagłówek ma ROZMIAR_NAGLOWKA bajtów (wersja 1 -
+# ROZMIAR_NAGLOWKA_V1), więc dane są wyrównane do 64 bajtów. Bitmapa ma jeszcze za
+# parametrami (wyrównane do 8 bajtów) liczniki stron: liczby bitów przed każdą stroną
+# i łącznie ('<i8'), a w nagłówku ich liczbę, rozmiar strony i CRC32 - pliki wersji 2
+# bez liczników mają tu zera, a starsze odczyty (parametry tuż za sumami) ich nie widzą
+WERSJA_FORMATU = 2
+WERSJE_FORMATU = (1, 2)
+ROZMIAR_NAGLOWKA = 128
+ROZMIAR_NAGLOWKA_V1 = 64
+STRUKTURA_METADANYCH = struct.Struct('<QdQIII')
+STRUKTURA_STRON = struct.Struct('<QII')
+STRUKTURA_SUMY_NAGLOWKA = struct.Struct('<I')
+# Bajty danych na jedną sumę CRC32 - uszkodzenie wskazuje blok 1 MB bez ponownego sita
+ROZMIAR_BLOKU_SUMY = 1 << 20
+TYPY_LICZB = ('<u4', '<u8')
+KODOWANIE_BITMAPY = 'k30'
+KODOWANIE_ODSTEPOW = 'od2'
+KODOWANIA = ('tablica', 'bitmapa', 'odstepy')
+
+# Koło 30 (ten sam układ co bitmapa sita w generuj_cache_pierwszych): bajt b opisuje
+# liczby [30*b, 30*b + 29], a bit j (kolejność 'little') liczbę 30*b + WZORZEC_KOLA[j]
+WZORZEC_KOLA = np.array([1, 7, 11, 13, 17, 19, 23, 29], dtype=np.int64)
+ROZMIAR_KOLA = 30
+# Liczby pierwsze, których koło nie obejmuje - w nagłówku bitmapy jako maska bitów
+PIERWSZE_POZA_KOLEM = (2, 3, 5)
+# Bit w bajcie bitmapy dla reszty mod 30 (0 dla reszt spoza koła), jego numer
+# i liczba ustawionych bitów dla każdej wartości bajtu
+_BIT_RESZTY = np.zeros(ROZMIAR_KOLA, dtype=np.uint8)
+_BIT_RESZTY[WZORZEC_KOLA] = 1 << np.arange(len(WZORZEC_KOLA))
+_NUMER_BITU_RESZTY = np.zeros(ROZMIAR_KOLA, dtype=np.intp)
+_NUMER_BITU_RESZTY[WZORZEC_KOLA] = np.arange(len(WZORZEC_KOLA))
+LICZBA_BITOW = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+# Bity reszt <= r (ranga wewnątrz bajtu) - bity reszt rosną, więc suma to alternatywa
+_MASKA_DO_RESZTY = np.cumsum(_BIT_RESZTY).astype(np.uint8)
+
+# Odstępy: połowa odstępu do poprzedniej liczby w bajcie, bloki do ROZMIAR_BLOKU_ODSTEPOW
+# liczb, a za danymi (wyrównany do 8 bajtów) indeks bloków (pierwsza liczba,
+# przesunięcie w danych, liczba wcześniejszych liczb). Odstęp ponad 2*255 (pierwszy
+# przy ~3*10^11, albo przerwa rzadkiego zbioru) zaczyna nowy blok, więc bloki mają
+# zmienną liczność
+ROZMIAR_BLOKU_ODSTEPOW = 1 << 12
+_MAKS_POLOWY_ODSTEPU = 255
+STRUKTURA_INDEKSU = np.dtype([('pierwsza', '<u8'), ('przesuniecie', '<u8'),
+                              ('liczba_przed', '<u8')])
+# Bloki indeksu rozpakowywane naraz - ogranicza pamięć pośrednią przy dużych przedziałach
+BLOKI_NA_PARTIE = 256
+
+# Zapis i rozpakowywanie blokami - konwersje nie kopiują naraz całej tablicy
+ROZMIAR_BLOKU_ZAPISU = 1 << 22
+ROZMIAR_BLOKU_BITMAPY = 1 << 20
+# Bajty bitmapy na licznik bitów CachePierwszych (ranga: licznik + suma w obrębie strony)
+ROZMIAR_STRONY_BITMAPY = 1 << 16
+
+
+def dtype_dla_wartosci(maks: int) -> np.dtype:
+    """Najmniejszy typ pliku (uint32 albo uint64, little-endian) mieszczący maks."""
+    return np.dtype(TYPY_LICZB[0] if maks < 2**32 else TYPY_LICZB[1])
+
+
+def czy_plik_binarny(nazwa_pliku: str) -> bool:
+    """Czy plik zaczyna się magią formatu binarnego (rozszerzenie nie ma znaczenia)."""
+    with open(nazwa_pliku, 'rb') as f:
+        return f.read(len(MAGIA_FORMATU)) == MAGIA_FORMATU
+
+
+def znajdz_plik_cache(nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH) -> str:
+    """
+    Plik do wczytania: nazwa_pliku albo - gdy to nieistniejący domyślny plik
+    binarny - stary pierwsze_cache.pkl, jeśli istnieje (do czasu migracji).
+    """
+    if not os.path.exists(nazwa_pliku) and nazwa_pliku == PLIK_CACHE_PIERWSZYCH \
+            and os.path.exists(PLIK_CACHE_PICKLE):
+        return PLIK_CACHE_PICKLE
+    return nazwa_pliku
+
+
+def wczytaj_naglowek(nazwa_pliku: str) -> Dict[str, Any]:
+    """
+    Odczytaj nagłówek pliku binarnego bez wczytywania liczb.
+
+    'kodowanie' to 'tablica', 'bitmapa' albo 'odstepy'; 'dtype' to typ liczb tablicy
+    (dla pozostałych - typ tablicy po rozpakowaniu), a 'przesuniecie' - początek danych.
+    Odstępy mają też 'liczba_blokow', 'rozmiar_bloku' i 'rozmiar_odstepow'. Z wersji 2
+    pochodzą 'najmniejsza', 'najwieksza', 'utworzono' (sekundy Unix), 'parametry'
+    generatora i położenie sum CRC32 ('liczba_sum', 'rozmiar_bloku_sum',
+    'przesuniecie_sum'); w wersji 1 są None, a 'najwieksza' jest znana tylko dla
+    odstępów. Liczniki stron bitmapy opisują 'liczba_stron' (0 - brak), 'rozmiar_strony',
+    'suma_stron' i 'przesuniecie_stron'. Zgłasza ValueError, gdy plik nie jest w formacie
+    binarnym, ma nieznaną wersję lub kodowanie, uszkodzony nagłówek lub parametry albo
+    jest krótszy niż wynika z nagłówka (urwany zapis).
+    """
+    with open(nazwa_pliku, 'rb') as f:
+        surowy = f.read(ROZMIAR_NAGLOWKA)
+        if len(surowy) < ROZMIAR_NAGLOWKA_V1 or not surowy.startswith(MAGIA_FORMATU):
+            raise ValueError(f"'{nazwa_pliku}' nie jest binarnym plikiem cache")
+        _, wersja, maska_malych, typ, max_sprawdzone, liczba, rozmiar_odstepow, najwieksza, \
+            liczba_blokow, rozmiar_bloku = STRUKTURA_NAGLOWKA.unpack_from(surowy)
+        if wersja not in WERSJE_FORMATU:
+            raise ValueError(f"Nieobsługiwana wersja formatu cache: {wersja}")
+        if wersja == 1:
+            przesuniecie, najmniejsza, utworzono, liczba_sum, rozmiar_bloku_sum, parametry = \
+                ROZMIAR_NAGLOWKA_V1, None, None, 0, 0, b''
+            liczba_stron = rozmiar_strony = suma_stron = 0
+            najwieksza = najwieksza if rozmiar_bloku else None
+        else:
+            if len(surowy) < ROZMIAR_NAGLOWKA:
+                raise ValueError(f"Plik cache '{nazwa_pliku}' jest urwany (niepełny nagłówek)")
+            suma, = STRUKTURA_SUMY_NAGLOWKA.unpack_from(
+                surowy, ROZMIAR_NAGLOWKA - STRUKTURA_SUMY_NAGLOWKA.size)
+            if suma != _suma_naglowka(surowy):
+                raise ValueError(f"Uszkodzony nagłówek pliku cache '{nazwa_pliku}' "
+                                 f"(niezgodna suma CRC32)")
+            przesuniecie = ROZMIAR_NAGLOWKA
+            najmniejsza, utworzono, liczba_sum, rozmiar_bloku_sum, rozmiar_parametrow, \
+                suma_parametrow = STRUKTURA_METADANYCH.unpack_from(surowy, ROZMIAR_NAGLOWKA_V1)
+            liczba_stron, rozmiar_strony, suma_stron = \
+                STRUKTURA_STRON.unpack_from(surowy, ROZMIAR_NAGLOWKA_V1 + STRUKTURA_METADANYCH.size)
+    typ = typ.rstrip(b'\0').decode('ascii', 'replace')
+    male_pierwsze = tuple(p for i, p in enumerate(PIERWSZE_POZA_KOLEM) if maska_malych >> i & 1)
+    dodatkowe = {}
+    if typ == KODOWANIE_BITMAPY:
+        kodowanie, dtype = 'bitmapa', dtype_dla_wartosci(max_sprawdzone)
+        rozmiar_danych = max_sprawdzone // ROZMIAR_KOLA + 1
+    elif typ == KODOWANIE_ODSTEPOW and rozmiar_bloku:
+        kodowanie, dtype = 'odstepy', dtype_dla_wartosci(najwieksza)
+        rozmiar_danych = rozmiar_odstepow + _wyrownanie_indeksu(rozmiar_odstepow) + \
+            liczba_blokow * STRUKTURA_INDEKSU.itemsize
+        dodatkowe = {'liczba_blokow': liczba_blokow, 'rozmiar_bloku': rozmiar_bloku,
+                     'rozmiar_odstepow': rozmiar_odstepow}
+    elif typ in TYPY_LICZB:
+        kodowanie, dtype = 'tablica', np.dtype(typ)
+        rozmiar_danych = liczba * dtype.itemsize
+    else:
+        raise ValueError(f"Nieobsługiwane kodowanie cache: {typ}")
+
+    # Sumy CRC32, parametry generatora i liczniki stron (wersja 2) leżą za danymi
+    przesuniecie_sum = przesuniecie + rozmiar_danych + _wyrownanie_sum(rozmiar_danych)
+    oczekiwany_rozmiar = przesuniecie + rozmiar_danych
+    przesuniecie_stron = None
+    if wersja > 1:
+        oczekiwany_rozmiar = przesuniecie_sum + 4 * liczba_sum + rozmiar_parametrow
+        przesuniecie_stron = oczekiwany_rozmiar + _wyrownanie_stron(oczekiwany_rozmiar)
+        if liczba_stron:
+            oczekiwany_rozmiar = przesuniecie_stron + 8 * liczba_stron
+    if os.path.getsize(nazwa_pliku) < oczekiwany_rozmiar:
+        raise ValueError(f"Plik cache '{nazwa_pliku}' jest urwany "
+                         f"({os.path.getsize(nazwa_pliku):,} < {oczekiwany_rozmiar:,} bajtów)")
+    if wersja > 1:
+        with open(nazwa_pliku, 'rb') as f:
+            f.seek(przesuniecie_sum + 4 * liczba_sum)
+            parametry = f.read(rozmiar_parametrow)
+        if zlib.crc32(parametry) != suma_parametrow:
+            raise ValueError(f"Uszkodzone parametry generatora w pliku cache '{nazwa_pliku}' "
+                             f"(niezgodna suma CRC32)")
+    return {'wersja': wersja, 'kodowanie': kodowanie, 'dtype': dtype,
+            'max_sprawdzone': max_sprawdzone, 'liczba': liczba, 'rozmiar_danych': rozmiar_danych,
+            'male_pierwsze': male_pierwsze, 'przesuniecie': przesuniecie,
+            'najmniejsza': najmniejsza, 'najwieksza': najwieksza, 'utworzono': utworzono,
+            'parametry': json.loads(parametry) if parametry else {},
+            'liczba_sum': liczba_sum, 'rozmiar_bloku_sum': rozmiar_bloku_sum,
+            'przesuniecie_sum': przesuniecie_sum, 'liczba_stron': liczba_stron,
+            'rozmiar_strony': rozmiar_strony, 'suma_stron': suma_stron,
+            'przesuniecie_stron': przesuniecie_stron, **dodatkowe}
+
+
+def _wyrownanie_indeksu(rozmiar_odstepow: int) -> int:
+    """Bajty dopełnienia między odstępami a indeksem bloków (wyrównanie do 8)."""
+    return -rozmiar_odstepow % 8
+
+
+def _wyrownanie_sum(rozmiar_danych: int) -> int:
+    """Bajty dopełnienia między danymi a sumami CRC32 (wyrównanie do 4)."""
+    return -rozmiar_danych % 4
+
+
+def _wyrownanie_stron(pozycja: int) -> int:
+    """Bajty dopełnienia między parametrami a licznikami stron (wyrównanie do 8)."""
+    return -pozycja % 8
+
+
+def _suma_naglowka(naglowek: bytes) -> int:
+    """CRC32 nagłówka bez jego ostatnich 4 bajtów (miejsce na sumę)."""
+    return zlib.crc32(naglowek[:ROZMIAR_NAGLOWKA - STRUKTURA_SUMY_NAGLOWKA.size])
+
+
+def _spakuj_naglowek(
+        typ: str,
+        max_sprawdzone: int,
+        liczba: int,
+        maska_malych: int = 0,
+        rozmiar_odstepow: int = 0,
+        najwieksza: int = 0,
+        liczba_blokow: int = 0,
+        rozmiar_bloku: int = 0,
+        najmniejsza: int = 0,
+        utworzono: float = 0.0,
+        liczba_sum: int = 0,
+        parametry: bytes = b'',
+        strony: bytes = b'') -> bytes:
+    """
+    Nagłówek pliku binarnego (ROZMIAR_NAGLOWKA bajtów) z sumami CRC32 parametrów,
+    liczników stron bitmapy (strony - bajty '<i8', b'' - bez liczników) i samego nagłówka.
+    """
+    naglowek = bytearray(ROZMIAR_NAGLOWKA)
+    STRUKTURA_NAGLOWKA.pack_into(naglowek, 0, MAGIA_FORMATU, WERSJA_FORMATU, maska_malych,
+                                 typ.encode('ascii'), max_sprawdzone, liczba, rozmiar_odstepow,
+                                 najwieksza, liczba_blokow, rozmiar_bloku)
+    STRUKTURA_METADANYCH.pack_into(naglowek, ROZMIAR_NAGLOWKA_V1, najmniejsza, utworzono,
+                                   liczba_sum, ROZMIAR_BLOKU_SUMY, len(parametry),
+                                   zlib.crc32(parametry))
+    if strony:
+        STRUKTURA_STRON.pack_into(naglowek, ROZMIAR_NAGLOWKA_V1 + STRUKTURA_METADANYCH.size,
+                                  len(strony) // 8, ROZMIAR_STRONY_BITMAPY, zlib.crc32(strony))
+    STRUKTURA_SUMY_NAGLOWKA.pack_into(naglowek, ROZMIAR_NAGLOWKA - STRUKTURA_SUMY_NAGLOWKA.size,
+                                      _suma_naglowka(naglowek))
+    return bytes(naglowek)
+
+
+def _mapuj_dane(
+        nazwa_pliku: str,
+        dtype: np.dtype,
+        liczba: int,
+        mmap: bool,
+        przesuniecie: int) -> np.ndarray:
+    """
+    Dane od przesuniecie (za nagłówkiem): np.memmap tylko do odczytu albo (bez mmap)
+    tablica w pamięci.
+    """
+    if not liczba:
+        return np.empty(0, dtype=dtype)
+    if mmap:
+        return np.memmap(nazwa_pliku, dtype=dtype, mode='r', offset=przesuniecie, shape=(liczba,))
+    return np.fromfile(nazwa_pliku, dtype=dtype, count=liczba, offset=przesuniecie)
+
+
+def wczytaj_bitmape(nazwa_pliku: str, mmap: bool = True) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Wczytaj (bitmapa koła 30, nagłówek) z pliku w kodowaniu bitmapy - bez rozpakowywania.
+
+    Bitmapa (np.memmap uint8) służy do czy_pierwsza_w_bitmapie i pierwsze_z_bitmapy
+    z male_pierwsze z nagłówka. Zgłasza ValueError dla innego kodowania.
+    """
+    naglowek = wczytaj_naglowek(nazwa_pliku)
+    if naglowek['kodowanie'] != 'bitmapa':
+        raise ValueError(f"'{nazwa_pliku}' nie jest zapisany jako bitmapa koła")
+    return _mapuj_dane(nazwa_pliku, np.dtype(np.uint8), naglowek['rozmiar_danych'], mmap,
+                       naglowek['przesuniecie']), naglowek
+
+
+def wczytaj_liczniki_stron(
+        nazwa_pliku: str,
+        naglowek: Dict[str, Any],
+        mmap: bool = True) -> Optional[np.ndarray]:
+    """
+    Liczniki stron bitmapy zapisane za parametrami (jak liczniki_stron, np.memmap) albo
+    None, gdy plik ich nie ma (wersja 1, wcześniejsze pliki wersji 2), ma inny rozmiar
+    strony lub niezgodną sumę CRC32 - wtedy liczy się je z bitmapy.
+    """
+    strony = -(-naglowek['rozmiar_danych'] // ROZMIAR_STRONY_BITMAPY)
+    if naglowek['liczba_stron'] != strony + 1 \
+            or naglowek['rozmiar_strony'] != ROZMIAR_STRONY_BITMAPY:
+        return None
+    liczniki = _mapuj_dane(nazwa_pliku, np.dtype('<i8'), strony + 1, mmap,
+                           naglowek['przesuniecie_stron'])
+    return liczniki if zlib.crc32(liczniki) == naglowek['suma_stron'] else None
+
+
+def wczytaj_odstepy(
+        nazwa_pliku: str,
+        mmap: bool = True) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """
+    Wczytaj (indeks bloków, bajty odstępów, nagłówek) z pliku w kodowaniu odstępów.
+
+    Oba np.memmap - do pierwsze_z_odstepow z male_pierwsze z nagłówka. Zgłasza
+    ValueError dla innego kodowania.
+    """
+    naglowek = wczytaj_naglowek(nazwa_pliku)
+    if naglowek['kodowanie'] != 'odstepy':
+        raise ValueError(f"'{nazwa_pliku}' nie jest zapisany jako odstępy")
+    rozmiar = naglowek['rozmiar_odstepow']
+    odstepy = _mapuj_dane(nazwa_pliku, np.dtype(np.uint8), rozmiar, mmap, naglowek['przesuniecie'])
+    indeks = _mapuj_dane(nazwa_pliku, STRUKTURA_INDEKSU, naglowek['liczba_blokow'], mmap,
+                         naglowek['przesuniecie'] + rozmiar + _wyrownanie_indeksu(rozmiar))
+    return indeks, odstepy, naglowek
+
+
+def wczytaj_dane_cache(nazwa_pliku: str, mmap: bool = True) -> Dict[str, Any]:
+    """
+    Wczytaj słownik cache ('pierwsze', 'max_sprawdzone', 'format') z pliku dowolnego formatu.
+
+    Z tablicy w pliku binarnym 'pierwsze' to np.memmap tylko do odczytu (bez mmap -
+    tablica w pamięci). Bitmapa i odstępy są rozpakowywane do tablicy, a same
+    (np.memmap) są pod 'bitmapa' albo 'indeks_odstepow' i 'odstepy'. Ze starego
+    pickle słownik jest zwracany bez zmian, więc 'pierwsze' może być zbiorem - tak
+    jak go zapisano.
+    """
+    if not os.path.exists(nazwa_pliku):
+        raise FileNotFoundError(f"Plik cache '{nazwa_pliku}' nie istnieje")
+
+    if czy_plik_binarny(nazwa_pliku):
+        naglowek = wczytaj_naglowek(nazwa_pliku)
+        dane = {'max_sprawdzone': naglowek['max_sprawdzone'],
+                'format': f"binarny v{naglowek['wersja']}, {naglowek['kodowanie']}"}
+        if naglowek['kodowanie'] == 'bitmapa':
+            bitmapa, _ = wczytaj_bitmape(nazwa_pliku, mmap)
+            dane['bitmapa'] = bitmapa
+            dane['pierwsze'] = pierwsze_z_bitmapy(bitmapa, 0, naglowek['max_sprawdzone'],
+                                                  naglowek['male_pierwsze'], naglowek['dtype'])
+        elif naglowek['kodowanie'] == 'odstepy':
+            indeks, odstepy, _ = wczytaj_odstepy(nazwa_pliku, mmap)
+            dane['indeks_odstepow'], dane['odstepy'] = indeks, odstepy
+            dane['pierwsze'] = pierwsze_z_odstepow(indeks, odstepy, 0, naglowek['najwieksza'],
+                                                   naglowek['male_pierwsze'], naglowek['dtype'])
+        else:
+            dane['pierwsze'] = _mapuj_dane(nazwa_pliku, naglowek['dtype'], naglowek['liczba'], mmap,
+                                           naglowek['przesuniecie'])
+        return dane
+
+    with open(nazwa_pliku, 'rb') as f:
+        dane = pickle.load(f)
+    if not isinstance(dane, dict):
+        raise ValueError("Cache nie zawiera słownika danych")
+    return {**dane, 'format': 'pickle'}
+
+
+def jako_posortowana_tablica(pierwsze: Iterable[int]) -> np.ndarray:
+    """Zamień zbiór liczb ze starego cache na posortowaną tablicę (tablice bez zmian)."""
+    if isinstance(pierwsze, np.ndarray):
+        return pierwsze
+    posortowane = sorted(pierwsze)
+    return np.array(posortowane, dtype=dtype_dla_wartosci(posortowane[-1] if posortowane else 0))
+
+
+def wczytaj_pierwsze(
+        nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH,
+        mmap: bool = True) -> Tuple[np.ndarray, int]:
+    """Wczytaj (posortowana tablica liczb pierwszych, max_sprawdzone) z pliku dowolnego formatu."""
+    dane = wczytaj_dane_cache(znajdz_plik_cache(nazwa_pliku), mmap)
+    return jako_posortowana_tablica(dane.get('pierwsze', [])), dane.get('max_sprawdzone', 0)
+
+
+def pierwsze_z_bitmapy_kola(
+        bitmapa: np.ndarray,
+        liczba: int,
+        dtype: np.dtype,
+        poczatkowe: np.ndarray = None,
+        pierwszy_blok: int = 0,
+        rozmiar_bloku: int = ROZMIAR_BLOKU_BITMAPY) -> np.ndarray:
+    """
+    Rozpakuj bitmapę koła 30 (od bloku pierwszy_blok) do posortowanej tablicy o znanej
+    liczbie elementów.
+
+    Opcjonalne poczatkowe (mniejsze od wszystkiego w bitmapie) trafiają na początek
+    wyniku, dzięki czemu całość powstaje w jednej alokacji, bez łączenia tablic.
+    """
+    if poczatkowe is None:
+        poczatkowe = np.array([], dtype=dtype)
+    wynik = np.empty(len(poczatkowe) + liczba, dtype=dtype)
+    wynik[:len(poczatkowe)] = poczatkowe
+    pozycja = len(poczatkowe)
+    for bajt_start in range(0, len(bitmapa), rozmiar_bloku):
+        # Bity bajtu są w kolejności reszt, więc kolejność flatnonzero jest rosnąca;
+        # widok bool to szybsza ścieżka nonzero, a 8 bitów na bajt - przesunięcia
+        indeksy = np.flatnonzero(np.unpackbits(
+            bitmapa[bajt_start:bajt_start + rozmiar_bloku], bitorder='little').view(bool))
+        liczby = (pierwszy_blok + bajt_start + (indeksy >> 3)) * ROZMIAR_KOLA \
+            + WZORZEC_KOLA[indeksy & 7]
+        wynik[pozycja:pozycja + len(liczby)] = liczby
+        pozycja += len(liczby)
+    return wynik
+
+
+def liczba_w_bitmapie(bitmapa: np.ndarray, rozmiar_bloku: int = ROZMIAR_BLOKU_BITMAPY) -> int:
+    """Liczba ustawionych bitów bitmapy (blokami - bez tablicy indeksów całej bitmapy)."""
+    return sum(int(LICZBA_BITOW[bitmapa[start:start + rozmiar_bloku]].sum(dtype=np.int64))
+               for start in range(0, len(bitmapa), rozmiar_bloku))
+
+
+def liczniki_stron(bitmapa: np.ndarray) -> np.ndarray:
+    """Liczby bitów bitmapy przed każdą stroną (ROZMIAR_STRONY_BITMAPY bajtów) i łącznie."""
+    liczby = [int(LICZBA_BITOW[bitmapa[start:start + ROZMIAR_STRONY_BITMAPY]].sum(dtype=np.int64))
+              for start in range(0, len(bitmapa), ROZMIAR_STRONY_BITMAPY)]
+    return np.concatenate(([0], np.cumsum(liczby, dtype=np.int64)))
+
+
+def bitmapa_z_pierwszych(
+        pierwsze: np.ndarray,
+        max_sprawdzone: int,
+        rozmiar_bloku: int = ROZMIAR_BLOKU_ZAPISU) -> Tuple[np.ndarray, Tuple[int, ...]]:
+    """
+    Zakoduj posortowane liczby pierwsze <= max_sprawdzone jako bitmapę koła 30.
+
+    Zwraca (bitmapa, liczby pierwsze spoza koła obecne w tablicy). Blok liczb
+    ustawia bity w tablicy bool obejmującej jego zakres bajtów, którą np.packbits
+    zwija do bajtów bitmapy - bez pętli po liczbach. Arytmetyka zostaje w typie
+    tablicy (uint32 dla zakresu do 2^32), bez kopii int64.
+    """
+    bitmapa = np.zeros(max_sprawdzone // ROZMIAR_KOLA + 1, dtype=np.uint8)
+    # Klucz w typie tablicy - inaczej searchsorted rzutuje całą tablicę na int64
+    # Pierwsza liczba >= 7
+    poczatek_kola = int(np.searchsorted(pierwsze, pierwsze.dtype.type(WZORZEC_KOLA[1]), 'left'))
+    male_pierwsze = tuple(int(p) for p in pierwsze[:poczatek_kola] if int(p) in PIERWSZE_POZA_KOLEM)
+    for start in range(poczatek_kola, len(pierwsze), rozmiar_bloku):
+        liczby = pierwsze[start:start + rozmiar_bloku]
+        bajty, reszty = np.divmod(liczby, liczby.dtype.type(ROZMIAR_KOLA))
+        pierwszy_bajt, ostatni_bajt = int(bajty[0]), int(bajty[-1])
+        bity = np.zeros((ostatni_bajt - pierwszy_bajt + 1) * len(WZORZEC_KOLA), dtype=bool)
+        bity[((bajty - bajty[0]) << 3) + _NUMER_BITU_RESZTY[reszty]] = True
+        # Bajt na granicy bloków liczb może już mieć bity z poprzedniego bloku
+        bitmapa[pierwszy_bajt:ostatni_bajt + 1] |= np.packbits(bity, bitorder='little')
+    return bitmapa, male_pierwsze
+
+
+def czy_pierwsza_w_bitmapie(
+        bitmapa: np.ndarray,
+        n,
+        male_pierwsze: Tuple[int, ...] = PIERWSZE_POZA_KOLEM):
+    """
+    Sprawdź pierwszość n (liczba albo tablica) odczytem bitu z bitmapy koła 30.
+
+    Liczby spoza zakresu bitmapy dają False - zakres pokrycia sprawdza wywołujący
+    (max_sprawdzone z nagłówka).
+    """
+    tablica = np.asarray(n, dtype=np.int64)
+    bajty = tablica // ROZMIAR_KOLA
+    bity = _BIT_RESZTY[tablica % ROZMIAR_KOLA]
+    w_zakresie = (tablica >= 0) & (bajty < len(bitmapa)) & (bity > 0)
+    wynik = np.zeros(tablica.shape, dtype=bool)
+    wynik[w_zakresie] = (np.asarray(bitmapa)[bajty[w_zakresie]] & bity[w_zakresie]) > 0
+    wynik |= np.isin(tablica, male_pierwsze)
+    return bool(wynik) if wynik.ndim == 0 else wynik
+
+
+def pierwsze_z_bitmapy(
+        bitmapa: np.ndarray,
+        a: int,
+        b: int,
+        male_pierwsze: Tuple[int, ...] = PIERWSZE_POZA_KOLEM,
+        dtype: np.dtype = None) -> np.ndarray:
+    """
+    Liczby pierwsze z [a, b] rozpakowane z bitmapy koła 30 (b przycinane do jej zakresu).
+
+    Rozpakowywane są tylko bajty przedziału; liczność z tablicy LICZBA_BITOW daje
+    rozmiar wyniku z góry, a nadmiarowe liczby skrajnych bajtów odcina wycinek.
+    """
+    b = min(b, len(bitmapa) * ROZMIAR_KOLA - 1)
+    if dtype is None:
+        dtype = dtype_dla_wartosci(max(b, 0))
+    a = max(a, 0)
+    if a > b:
+        return np.array([], dtype=dtype)
+    pierwszy_bajt, ostatni_bajt = a // ROZMIAR_KOLA, b // ROZMIAR_KOLA
+    wycinek = bitmapa[pierwszy_bajt:ostatni_bajt + 1]
+    male = np.array([p for p in male_pierwsze if a <= p <= b], dtype=dtype)
+    wynik = pierwsze_z_bitmapy_kola(wycinek, liczba_w_bitmapie(wycinek), dtype, male, pierwszy_bajt)
+    return wynik[np.searchsorted(wynik, a, 'left'):np.searchsorted(wynik, b, 'right')]
+
+
+def _bez_dwojki(pierwsze: np.ndarray) -> Tuple[np.ndarray, Tuple[int, ...]]:
+    """(liczby nieparzyste od 3 - kodowane odstępami, (2,) albo () - czy 2 jest w tablicy)."""
+    poczatek = int(np.searchsorted(pierwsze, pierwsze.dtype.type(3), 'left'))
+    return pierwsze[poczatek:], tuple(2 for p in pierwsze[:poczatek] if int(p) == 2)
+
+
+def _odstepy_partiami(
+        nieparzyste: np.ndarray,
+        rozmiar_bloku: int = ROZMIAR_BLOKU_ODSTEPOW) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Koduj rosnące liczby nieparzyste odstępami - generator (indeks partii, bajty partii).
+
+    Blok zaczyna się co rozmiar_bloku liczb partii i przy każdym odstępie ponad
+    2*255; jego pierwsza liczba jest tylko w indeksie, a bajty to połowy kolejnych
+    odstępów. Partia ma rozmiar_bloku * BLOKI_NA_PARTIE liczb, przesunięcia
+    i liczby wcześniejszych są liczone od początku kodowania.
+    """
+    przesuniecie = 0
+    for start in range(0, len(nieparzyste), rozmiar_bloku * BLOKI_NA_PARTIE):
+        liczby = nieparzyste[start:start + rozmiar_bloku * BLOKI_NA_PARTIE].astype(np.int64)
+        roznice = np.diff(liczby)
+        if len(roznice) and (roznice.min() <= 0 or (roznice & 1).any()):
+            raise ValueError("Kodowanie odstępów wymaga rosnących liczb nieparzystych (poza 2)")
+        poczatki_blokow = np.union1d(np.arange(0, len(liczby), rozmiar_bloku),
+                                     np.flatnonzero(roznice > 2 * _MAKS_POLOWY_ODSTEPU) + 1)
+        # Odstęp przed blokiem nie jest zapisywany - blok zaczyna liczba z indeksu
+        bajty = (np.delete(roznice, poczatki_blokow[1:] - 1) >> 1).astype(np.uint8)
+        indeks = np.empty(len(poczatki_blokow), dtype=STRUKTURA_INDEKSU)
+        indeks['pierwsza'] = liczby[poczatki_blokow]
+        indeks['przesuniecie'] = przesuniecie + poczatki_blokow - np.arange(len(poczatki_blokow))
+        indeks['liczba_przed'] = start + poczatki_blokow
+        przesuniecie += len(bajty)
+        yield indeks, bajty
+
+
+def odstepy_z_pierwszych(
+        pierwsze: np.ndarray,
+        rozmiar_bloku: int = ROZMIAR_BLOKU_ODSTEPOW
+) -> Tuple[np.ndarray, np.ndarray, Tuple[int, ...]]:
+    """
+    Zakoduj posortowane liczby pierwsze odstępami/2 w bajtach - w pamięci.
+
+    Zwraca (indeks bloków, bajty odstępów, (2,) jeśli 2 jest w tablicy). 2 jest poza
+    kodowaniem (jedyny nieparzysty odstęp), ale liczy się w 'liczba_przed' indeksu.
+    Plik zapisuje zapisz_pierwsze partiami, bez trzymania całości.
+    """
+    nieparzyste, male_pierwsze = _bez_dwojki(pierwsze)
+    czesci = list(_odstepy_partiami(nieparzyste, rozmiar_bloku))
+    indeks = np.concatenate([i for i, _ in czesci]) if czesci \
+        else np.empty(0, dtype=STRUKTURA_INDEKSU)
+    indeks['liczba_przed'] += len(male_pierwsze)
+    odstepy = np.concatenate([b for _, b in czesci]) if czesci else np.empty(0, dtype=np.uint8)
+    return indeks, odstepy, male_pierwsze
+
+
+def _rozpakuj_bloki_odstepow(
+        indeks: np.ndarray,
+        odstepy: np.ndarray,
+        pierwszy: int,
+        ostatni: int) -> np.ndarray:
+    """
+    Liczby bloków [pierwszy, ostatni) jako int64 - jedna suma skumulowana na wszystkie.
+
+    Na początek każdego bloku wstawiany jest krok 0 (jego pierwsza liczba), a po
+    np.cumsum blok dostaje przesunięcie do swojej liczby z indeksu.
+    """
+    poczatki = indeks['przesuniecie'][pierwszy:ostatni].astype(np.int64)
+    koniec = int(indeks['przesuniecie'][ostatni]) if ostatni < len(indeks) else len(odstepy)
+    wstawienia = poczatki - poczatki[0]
+    polowy = np.asarray(odstepy[poczatki[0]:koniec]).astype(np.int64)
+    liczby = np.cumsum(np.insert(polowy << 1, wstawienia, 0))
+    pozycje_blokow = wstawienia + np.arange(len(wstawienia))
+    przesuniecia = indeks['pierwsza'][pierwszy:ostatni].astype(np.int64) - liczby[pozycje_blokow]
+    liczby += np.repeat(przesuniecia, np.diff(pozycje_blokow, append=len(liczby)))
+    return liczby
+
+
+def pierwsze_z_odstepow(
+        indeks: np.ndarray,
+        odstepy: np.ndarray,
+        a: int,
+        b: int,
+        male_pierwsze: Tuple[int, ...] = (2,),
+        dtype: np.dtype = None) -> np.ndarray:
+    """
+    Liczby pierwsze z [a, b] z kodowania odstępów.
+
+    Wyszukiwanie binarne w pierwszych liczbach bloków wskazuje bloki przecinające
+    przedział i tylko one są rozpakowywane (partiami po BLOKI_NA_PARTIE), więc
+    krótki przedział kosztuje dwa bloki niezależnie od rozmiaru pliku.
+    """
+    a = max(a, 0)
+    if dtype is None:
+        dtype = dtype_dla_wartosci(max(b, 0))
+    czesci = [np.array([p for p in male_pierwsze if a <= p <= b], dtype=dtype)]
+    if a <= b and len(indeks):
+        pierwsze_blokow = indeks['pierwsza']
+        pierwszy = max(int(np.searchsorted(pierwsze_blokow, a, 'right')) - 1, 0)
+        ostatni = int(np.searchsorted(pierwsze_blokow, b, 'right'))
+        for poczatek in range(pierwszy, ostatni, BLOKI_NA_PARTIE):
+            liczby = _rozpakuj_bloki_odstepow(indeks, odstepy, poczatek,
+                                              min(poczatek + BLOKI_NA_PARTIE, ostatni))
+            czesci.append(liczby[np.searchsorted(liczby, a, 'left'):
+                                 np.searchsorted(liczby, b, 'right')].astype(dtype))
+    return np.concatenate(czesci)
+
+
+def rozmiar_odstepow(pierwsze: np.ndarray, rozmiar_bloku: int = ROZMIAR_BLOKU_ODSTEPOW) -> int:
+    """Rozmiar danych kodowania odstępów (indeks i bajty) - kodowanie partiami bez zapisu."""
+    return sum(len(indeks) * STRUKTURA_INDEKSU.itemsize + len(bajty)
+               for indeks, bajty in _odstepy_partiami(_bez_dwojki(pierwsze)[0], rozmiar_bloku))
+
+
+def wybierz_kodowanie(pierwsze: np.ndarray, max_sprawdzone: int) -> str:
+    """
+    Kodowanie o najmniejszym pliku: bitmapa (bajt na 30 liczb zakresu), odstępy
+    (bajt na liczbę) albo tablica.
+
+    Bitmapa opisuje liczby do max_sprawdzone, więc nie nadaje się, gdy tablica
+    ma większe liczby. Dla cache pokrywającego cały zakres bitmapa wygrywa aż do
+    ~10^13 (gęstość 1/ln x daje bajt odstępów na każde ln x < 30 liczb); odstępy
+    wygrywają dla rzadkich zbiorów dużych liczb, np. pobranych plików, a tablica
+    dla kilku liczb. Odstępy mają co najmniej bajt na liczbę, więc ich dokładny
+    rozmiar (przebieg kodowania) jest liczony tylko, gdy mogą wygrać.
+    """
+    najwieksza = int(pierwsze[-1]) if len(pierwsze) else 0
+    rozmiary = {'tablica': len(pierwsze) * dtype_dla_wartosci(najwieksza).itemsize}
+    if najwieksza <= max_sprawdzone:
+        rozmiary['bitmapa'] = max_sprawdzone // ROZMIAR_KOLA + 1
+    if len(pierwsze) < min(rozmiary.values()):
+        rozmiary['odstepy'] = rozmiar_odstepow(pierwsze)
+    return min(rozmiary, key=rozmiary.get)
+
+
+def pamiec_zapisu(
+        liczba: int,
+        max_sprawdzone: int,
+        najwieksza: int = None,
+        kodowanie: str = None) -> int:
+    """
+    Oszacuj bufory robocze zapisz_pierwsze (bajty, bez samej tablicy liczb).
+
+    Bitmapa jest budowana w całości (bajt na 30 liczb) z tymczasowymi tablicami
+    bloku ROZMIAR_BLOKU_ZAPISU liczb: divmod w typie tablicy, indeksy bitów intp
+    i tablica bool zakresu bloku (odstęp między liczbami ~ln x). Odstępy mają
+    kopie int64 partii (liczby, różnice, bez odstępów przed blokami, połowy)
+    i indeks wszystkich bloków, a tablica - kopię bloku w typie pliku. Sumy
+    CRC32 są liczone na widoku danych bez kopii. Bez kodowania zwraca maksimum
+    kodowań, które może wybrać wybierz_kodowanie.
+    """
+    if najwieksza is None:
+        najwieksza = max_sprawdzone
+    bajty_liczby = dtype_dla_wartosci(najwieksza).itemsize
+    blok = min(liczba, ROZMIAR_BLOKU_ZAPISU)
+    odstep = max(najwieksza / max(liczba, 1), np.log(max(najwieksza, 2)))
+    bity = int(blok * odstep / ROZMIAR_KOLA * len(WZORZEC_KOLA)) + len(WZORZEC_KOLA)
+    partia = min(liczba, ROZMIAR_BLOKU_ODSTEPOW * BLOKI_NA_PARTIE)
+    rozmiary = {
+        'tablica': blok * bajty_liczby,
+        'bitmapa': (max_sprawdzone // ROZMIAR_KOLA + 1
+                    + blok * 2 * (bajty_liczby + np.dtype(np.intp).itemsize) + bity + bity // 8),
+        'odstepy': (partia * (4 * 8 + 1)
+                    + (liczba // ROZMIAR_BLOKU_ODSTEPOW + 1) * STRUKTURA_INDEKSU.itemsize)}
+    if kodowanie is not None:
+        return int(rozmiary[kodowanie])
+    if najwieksza > max_sprawdzone:
+        del rozmiary['bitmapa']
+    return int(max(rozmiary.values()))
+
+
+class _ZapisZSumami:
+    """Zapis z sumami CRC32 kolejnych bloków ROZMIAR_BLOKU_SUMY bajtów - w jednym przejściu."""
+
+    __slots__ = ('plik', 'sumy', 'suma', 'w_bloku', 'zapisane')
+
+    def __init__(self, plik):
+        self.plik = plik
+        self.sumy = []
+        self.suma = self.w_bloku = self.zapisane = 0
+
+    def zapisz(self, dane):
+        """Dopisz tablicę (bez kopii, o ile jest ciągła) albo bajty i uzupełnij sumy bloków."""
+        if isinstance(dane, np.ndarray):
+            dane = np.ascontiguousarray(dane).reshape(-1).view(np.uint8)
+        bajty = memoryview(dane)
+        self.plik.write(bajty)
+        self.zapisane += len(bajty)
+        while len(bajty):
+            ile = min(len(bajty), ROZMIAR_BLOKU_SUMY - self.w_bloku)
+            self.suma = zlib.crc32(bajty[:ile], self.suma)
+            self.w_bloku += ile
+            bajty = bajty[ile:]
+            if self.w_bloku == ROZMIAR_BLOKU_SUMY:
+                self.sumy.append(self.suma)
+                self.suma = self.w_bloku = 0
+
+    def zakoncz(self) -> np.ndarray:
+        """Sumy wszystkich bloków (ostatni może być niepełny) jako tablica uint32 do zapisu."""
+        if self.w_bloku:
+            self.sumy.append(self.suma)
+            self.suma = self.w_bloku = 0
+        return np.array(self.sumy, dtype='<u4')
+
+
+def zapisz_pierwsze(
+        pierwsze: Iterable[int],
+        max_sprawdzone: int,
+        nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH,
+        kodowanie: str = None,
+        parametry: Dict[str, Any] = None):
+    """
+    Zapisz cache w formacie binarnym (posortowana tablica albo zbiór liczb).
+
+    Kodowanie ('tablica', 'bitmapa' albo 'odstepy') domyślnie wybiera wybierz_kodowanie.
+    Nagłówek dostaje liczność, skrajne liczby, czas zapisu i parametry generatora
+    (słownik zapisywany jako JSON), a dane - sumy CRC32 bloków liczone w trakcie zapisu.
+    Zapis idzie do pliku tymczasowego podmienianego na końcu przez os.replace - przerwany
+    zapis nie psuje starego cache, a czytelnicy z otwartym np.memmap starego pliku
+    nadal widzą jego (niezmienioną) zawartość.
+    """
+    pierwsze = jako_posortowana_tablica(pierwsze)
+    if kodowanie is None:
+        kodowanie = wybierz_kodowanie(pierwsze, max_sprawdzone)
+    if kodowanie not in KODOWANIA:
+        raise ValueError(f"Nieznane kodowanie cache: {kodowanie}")
+    parametry = json.dumps(parametry or {}, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    metadane = {'najmniejsza': int(pierwsze[0]) if len(pierwsze) else 0,
+                'najwieksza': int(pierwsze[-1]) if len(pierwsze) else 0,
+                'utworzono': time.time(), 'parametry': parametry}
+
+    tymczasowy = nazwa_pliku + '.tmp'
+    with open(tymczasowy, 'wb') as f:
+        # Nagłówek z licznościami i sumami jest nadpisywany po zapisaniu danych
+        f.write(b'\0' * ROZMIAR_NAGLOWKA)
+        dane = _ZapisZSumami(f)
+        if kodowanie == 'bitmapa':
+            bitmapa, male_pierwsze = bitmapa_z_pierwszych(pierwsze, max_sprawdzone)
+            maska_malych = sum(1 << i for i, p in enumerate(PIERWSZE_POZA_KOLEM)
+                               if p in male_pierwsze)
+            dane.zapisz(bitmapa)
+            naglowek = {'typ': KODOWANIE_BITMAPY, 'maska_malych': maska_malych,
+                        'strony': liczniki_stron(bitmapa).astype('<i8').tobytes()}
+        elif kodowanie == 'odstepy':
+            # Bajty odstępów idą partiami, a indeks (24 bajty na blok, w pamięci) za nimi
+            nieparzyste, male_pierwsze = _bez_dwojki(pierwsze)
+            czesci_indeksu, rozmiar = [], 0
+            for indeks, bajty in _odstepy_partiami(nieparzyste):
+                dane.zapisz(bajty)
+                czesci_indeksu.append(indeks)
+                rozmiar += len(bajty)
+            dane.zapisz(bytes(_wyrownanie_indeksu(rozmiar)))
+            for indeks in czesci_indeksu:
+                indeks['liczba_przed'] += len(male_pierwsze)
+                dane.zapisz(indeks)
+            naglowek = {'typ': KODOWANIE_ODSTEPOW, 'maska_malych': 1 if male_pierwsze else 0,
+                        'rozmiar_odstepow': rozmiar,
+                        'liczba_blokow': sum(len(indeks) for indeks in czesci_indeksu),
+                        'rozmiar_bloku': ROZMIAR_BLOKU_ODSTEPOW}
+        else:
+            dtype = dtype_dla_wartosci(metadane['najwieksza'])
+            for poczatek in range(0, len(pierwsze), ROZMIAR_BLOKU_ZAPISU):
+                blok = pierwsze[poczatek:poczatek + ROZMIAR_BLOKU_ZAPISU]
+                dane.zapisz(blok.astype(dtype, copy=False))
+            naglowek = {'typ': dtype.str}
+
+        f.write(bytes(_wyrownanie_sum(dane.zapisane)))
+        sumy = dane.zakoncz()
+        f.write(sumy.tobytes())
+        f.write(parametry)
+        if 'strony' in naglowek:
+            f.write(bytes(_wyrownanie_stron(f.tell())))
+            f.write(naglowek['strony'])
+        f.seek(0)
+        f.write(_spakuj_naglowek(max_sprawdzone=max_sprawdzone, liczba=len(pierwsze),
+                                 liczba_sum=len(sumy), **naglowek, **metadane))
+    os.replace(tymczasowy, nazwa_pliku)
+
+
+class CachePierwszych:
+    """
+    Cache liczb pierwszych otwarty przez np.memmap - zapytania bez wczytywania całości.
+
+    czy_pierwsza, liczba_pierwszych_do (π, ranga), n_ta_pierwsza, nastepna_pierwsza,
+    poprzednia_pierwsza i pierwsze_miedzy działają wprost na kodowaniu pliku: tablica
+    - np.searchsorted na mapowanej tablicy, bitmapa - bity koła i liczniki bitów
+    stron (zapisane w pliku, a w starszych plikach liczone przy pierwszym zapytaniu
+    o rangę), odstępy - indeks bloków i jeden
+    rozpakowany blok. System wczytuje tylko strony pliku, których dotyka zapytanie,
+    więc otwarcie to odczyt nagłówka. Odpowiedzi opisują zawartość cache - pełne są
+    do max_sprawdzone, co sprawdza wywołujący. Stary pickle jest wczytywany do pamięci
+    jako tablica. Jako menedżer kontekstu zwalnia mapowania pliku przy wyjściu.
+    """
+
+    __slots__ = ('nazwa_pliku', 'kodowanie', 'max_sprawdzone', 'liczba', 'najwieksza', 'dtype',
+                 '_pierwsze', '_bitmapa', '_indeks', '_odstepy', '_male_pierwsze',
+                 '_liczby_przed_stronami')
+
+    def __init__(self, nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH):
+        self.nazwa_pliku = znajdz_plik_cache(nazwa_pliku)
+        if not os.path.exists(self.nazwa_pliku):
+            raise FileNotFoundError(f"Plik cache '{self.nazwa_pliku}' nie istnieje")
+        self._pierwsze = self._bitmapa = self._indeks = self._odstepy = None
+        self._liczby_przed_stronami = None
+        self._male_pierwsze = ()
+
+        if not czy_plik_binarny(self.nazwa_pliku):
+            dane = wczytaj_dane_cache(self.nazwa_pliku)
+            self._pierwsze = jako_posortowana_tablica(dane.get('pierwsze', []))
+            self.kodowanie, self.max_sprawdzone = 'tablica', dane.get('max_sprawdzone', 0)
+            self.liczba, self.dtype = len(self._pierwsze), self._pierwsze.dtype
+            self.najwieksza = int(self._pierwsze[-1]) if self.liczba else 0
+            return
+
+        naglowek = wczytaj_naglowek(self.nazwa_pliku)
+        self.kodowanie, self.max_sprawdzone = naglowek['kodowanie'], naglowek['max_sprawdzone']
+        self.liczba, self.dtype = naglowek['liczba'], naglowek['dtype']
+        self._male_pierwsze = naglowek['male_pierwsze']
+        # Największa liczba z nagłówka (wersja 2); w wersji 1 bitmapa ma tylko max_sprawdzone
+        self.najwieksza = naglowek['najwieksza']
+        if self.kodowanie == 'bitmapa':
+            self._bitmapa, _ = wczytaj_bitmape(self.nazwa_pliku)
+            self._liczby_przed_stronami = wczytaj_liczniki_stron(self.nazwa_pliku, naglowek)
+            if self.najwieksza is None:
+                self.najwieksza = self.max_sprawdzone
+        elif self.kodowanie == 'odstepy':
+            self._indeks, self._odstepy, _ = wczytaj_odstepy(self.nazwa_pliku)
+        else:
+            self._pierwsze = _mapuj_dane(self.nazwa_pliku, self.dtype, self.liczba, True,
+                                         naglowek['przesuniecie'])
+            if self.najwieksza is None:
+                self.najwieksza = int(self._pierwsze[-1]) if self.liczba else 0
+
+    def __enter__(self) -> 'CachePierwszych':
+        return self
+
+    def __exit__(self, *wyjatek):
+        self.zamknij()
+
+    def __len__(self) -> int:
+        return self.liczba
+
+    def __contains__(self, n: int) -> bool:
+        return self.czy_pierwsza(n)
+
+    def zamknij(self):
+        """Zwolnij mapowania pliku (mapowanie zamyka się z ostatnim odwołaniem)."""
+        self._pierwsze = self._bitmapa = self._indeks = self._odstepy = None
+        self._liczby_przed_stronami = None
+
+    def liczba_pierwszych_do(self, x):
+        """Liczba liczb cache <= x (ranga, π(x) do max_sprawdzone) - dla liczby albo tablicy."""
+        tablica = np.asarray(x, dtype=np.int64)
+        wynik = self._ranga(tablica.ravel()).reshape(tablica.shape)
+        return int(wynik) if wynik.ndim == 0 else wynik
+
+    def czy_pierwsza(self, n):
+        """Czy n (liczba albo tablica) jest w cache; poza nim False - zakres sprawdza wołający."""
+        if self.kodowanie == 'bitmapa':
+            return czy_pierwsza_w_bitmapie(self._bitmapa, n, self._male_pierwsze)
+        tablica = np.asarray(n, dtype=np.int64)
+        wynik = self._ranga(tablica.ravel()) - self._ranga(tablica.ravel() - 1) > 0
+        return bool(wynik[0]) if tablica.ndim == 0 else wynik.reshape(tablica.shape)
+
+    def n_ta_pierwsza(self, k: int) -> int:
+        """k-ta liczba cache (k = 1 to najmniejsza) - wybór bez rozpakowywania wcześniejszych."""
+        if not 1 <= k <= self.liczba:
+            raise ValueError(f"Numer liczby pierwszej spoza cache (1 - {self.liczba:,}): {k}")
+        if self._pierwsze is not None:
+            return int(self._pierwsze[k - 1])
+        if k <= len(self._male_pierwsze):
+            return self._male_pierwsze[k - 1]
+        if self.kodowanie == 'odstepy':
+            # 'liczba_przed' indeksu liczy też 2 - bez przesunięcia o małe liczby
+            blok = int(np.searchsorted(self._indeks['liczba_przed'], k - 1, 'right')) - 1
+            liczby = _rozpakuj_bloki_odstepow(self._indeks, self._odstepy, blok, blok + 1)
+            return int(liczby[k - 1 - int(self._indeks['liczba_przed'][blok])])
+
+        k -= len(self._male_pierwsze)
+        przed_stronami = self._strony()
+        strona = int(np.searchsorted(przed_stronami, k, 'left')) - 1
+        poczatek = strona * ROZMIAR_STRONY_BITMAPY
+        strona_bitmapy = self._bitmapa[poczatek:poczatek + ROZMIAR_STRONY_BITMAPY]
+        w_bajtach = np.cumsum(LICZBA_BITOW[strona_bitmapy])
+        k -= int(przed_stronami[strona])
+        bajt = int(np.searchsorted(w_bajtach, k, 'left'))
+        k -= int(w_bajtach[bajt - 1]) if bajt else 0
+        bity = np.flatnonzero(np.unpackbits(self._bitmapa[poczatek + bajt:poczatek + bajt + 1],
+                                            bitorder='little'))
+        return (poczatek + bajt) * ROZMIAR_KOLA + int(WZORZEC_KOLA[bity[k - 1]])
+
+    def nastepna_pierwsza(self, n: int):
+        """Najmniejsza liczba cache > n albo None."""
+        k = self.liczba_pierwszych_do(n)
+        return self.n_ta_pierwsza(k + 1) if k < self.liczba else None
+
+    def poprzednia_pierwsza(self, n: int):
+        """Największa liczba cache < n albo None."""
+        k = self.liczba_pierwszych_do(n - 1)
+        return self.n_ta_pierwsza(k) if k else None
+
+    def pierwsze_miedzy(self, a: int = 0, b: int = None) -> np.ndarray:
+        """Liczby cache z [a, b] (b = None - do końca); dla tablicy to widok mapowanego pliku."""
+        b = self.najwieksza if b is None else min(b, self.najwieksza)
+        a = max(a, 0)
+        if self._pierwsze is not None:
+            return self._pierwsze[self.liczba_pierwszych_do(a - 1):self.liczba_pierwszych_do(b)]
+        if self.kodowanie == 'bitmapa':
+            return pierwsze_z_bitmapy(self._bitmapa, a, b, self._male_pierwsze, self.dtype)
+        return pierwsze_z_odstepow(self._indeks, self._odstepy, a, b, self._male_pierwsze,
+                                   self.dtype)
+
+    def bloki(self) -> Iterator[np.ndarray]:
+        """Kolejne liczby cache blokami - przejście całości bez rozpakowania jej naraz."""
+        if self._pierwsze is not None:
+            for poczatek in range(0, self.liczba, ROZMIAR_BLOKU_ZAPISU):
+                yield self._pierwsze[poczatek:poczatek + ROZMIAR_BLOKU_ZAPISU]
+            return
+        if self._male_pierwsze:
+            yield np.array(self._male_pierwsze, dtype=self.dtype)
+        if self.kodowanie == 'bitmapa':
+            for bajt_start in range(0, len(self._bitmapa), ROZMIAR_BLOKU_BITMAPY):
+                wycinek = self._bitmapa[bajt_start:bajt_start + ROZMIAR_BLOKU_BITMAPY]
+                yield pierwsze_z_bitmapy_kola(wycinek, liczba_w_bitmapie(wycinek), self.dtype,
+                                              pierwszy_blok=bajt_start)
+        else:
+            for poczatek in range(0, len(self._indeks), BLOKI_NA_PARTIE):
+                ostatni = min(poczatek + BLOKI_NA_PARTIE, len(self._indeks))
+                yield _rozpakuj_bloki_odstepow(self._indeks, self._odstepy, poczatek,
+                                               ostatni).astype(self.dtype)
+
+    def _strony(self) -> np.ndarray:
+        """Liczniki stron bitmapy - z pliku, a bez nich liczone przy pierwszym użyciu."""
+        if self._liczby_przed_stronami is None:
+            self._liczby_przed_stronami = liczniki_stron(self._bitmapa)
+        return self._liczby_przed_stronami
+
+    def _ranga(self, x: np.ndarray) -> np.ndarray:
+        """Liczba liczb cache <= x dla tablicy int64 x."""
+        if self._pierwsze is not None:
+            # Zapytania w typie tablicy - inny typ kopiowałby całą mapowaną tablicę
+            gorna = np.iinfo(self.dtype).max if self.dtype.itemsize < 8 else None
+            return np.searchsorted(self._pierwsze, np.clip(x, 0, gorna).astype(self.dtype), 'right')
+
+        wynik = np.searchsorted(np.array(self._male_pierwsze, dtype=np.int64), x, 'right')
+        if self.kodowanie == 'odstepy':
+            # Z każdej partii rozpakowywane są tylko bloki od pierwszego do ostatniego
+            # trafionego; 'liczba_przed' liczy też 2
+            bloki = np.searchsorted(self._indeks['pierwsza'],
+                                    np.clip(x, 0, None).astype(np.uint64), 'right') - 1
+            w_blokach = np.flatnonzero(bloki >= 0)
+            for grupa in _grupy_zapytan(bloki[w_blokach] // BLOKI_NA_PARTIE):
+                zapytania = w_blokach[grupa]
+                pierwszy, ostatni = int(bloki[zapytania].min()), int(bloki[zapytania].max())
+                liczby = _rozpakuj_bloki_odstepow(self._indeks, self._odstepy, pierwszy,
+                                                  ostatni + 1)
+                wynik[zapytania] = int(self._indeks['liczba_przed'][pierwszy]) + \
+                    np.searchsorted(liczby, x[zapytania], 'right')
+            return wynik
+
+        # Bitmapa: pełne strony z liczników, bajty strony do bajtu x z sumy skumulowanej
+        # (tylko do ostatniego trafionego bajtu), a bity bajtu do x z maski reszt
+        x = np.clip(x, -1, len(self._bitmapa) * ROZMIAR_KOLA - 1)
+        nieujemne = x >= 0
+        bajty = x[nieujemne] // ROZMIAR_KOLA
+        strony = bajty // ROZMIAR_STRONY_BITMAPY
+        liczby = self._strony()[strony] + \
+            LICZBA_BITOW[self._bitmapa[bajty] & _MASKA_DO_RESZTY[x[nieujemne] % ROZMIAR_KOLA]]
+        for grupa in _grupy_zapytan(strony):
+            poczatek = int(strony[grupa[0]]) * ROZMIAR_STRONY_BITMAPY
+            w_bajtach = np.concatenate(([0], np.cumsum(
+                LICZBA_BITOW[self._bitmapa[poczatek:int(bajty[grupa].max())]], dtype=np.int32)))
+            liczby[grupa] += w_bajtach[bajty[grupa] - poczatek]
+        wynik[nieujemne] += liczby
+        return wynik
+
+
+def _grupy_zapytan(klucze: np.ndarray) -> Iterator[np.ndarray]:
+    """Indeksy zapytań pogrupowane według równych kluczy (strony, partii bloków)."""
+    porzadek = np.argsort(klucze, kind='stable')
+    granice = np.flatnonzero(np.diff(klucze[porzadek])) + 1
+    return iter(np.split(porzadek, granice)) if len(porzadek) else iter(())
+
+
+def sprawdz_sumy_kontrolne(nazwa_pliku: str) -> List[int]:
+    """
+    Numery bloków danych (po ROZMIAR_BLOKU_SUMY bajtów), których CRC32 nie zgadza się
+    z zapisaną sumą - pusta lista oznacza nieuszkodzone dane.
+
+    Plik jest czytany blokami, bez rozpakowywania liczb. Uszkodzony nagłówek zgłasza
+    wczytaj_naglowek (ValueError); plik bez sum (wersja 1) też daje ValueError.
+    """
+    naglowek = wczytaj_naglowek(nazwa_pliku)
+    if naglowek['wersja'] < 2:
+        raise ValueError(f"'{nazwa_pliku}' (format v{naglowek['wersja']}) nie ma sum kontrolnych")
+    rozmiar_bloku = naglowek['rozmiar_bloku_sum']
+    sumy = np.fromfile(nazwa_pliku, dtype='<u4', count=naglowek['liczba_sum'],
+                       offset=naglowek['przesuniecie_sum'])
+    uszkodzone = []
+    with open(nazwa_pliku, 'rb') as f:
+        f.seek(naglowek['przesuniecie'])
+        for numer, suma in enumerate(sumy.tolist()):
+            blok = f.read(min(rozmiar_bloku, naglowek['rozmiar_danych'] - numer * rozmiar_bloku))
+            if zlib.crc32(blok) != suma:
+                uszkodzone.append(numer)
+    return uszkodzone
+
+
+def statystyki_cache(nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH) -> Dict[str, Any]:
+    """
+    Statystyki cache: 'liczba', 'najmniejsza', 'najwieksza', 'max_sprawdzone', 'format',
+    'rozmiar_pliku', 'utworzono' i 'parametry' (generatora).
+
+    Dla pliku w wersji 2 to sam odczyt nagłówka; wersja 1 odczytuje skrajne liczby
+    przez CachePierwszych, a stary pickle wczytuje całość. Brak liczb - skrajne None.
+    """
+    nazwa_pliku = znajdz_plik_cache(nazwa_pliku)
+    if not os.path.exists(nazwa_pliku):
+        raise FileNotFoundError(f"Plik cache '{nazwa_pliku}' nie istnieje")
+    statystyki = {'rozmiar_pliku': os.path.getsize(nazwa_pliku), 'utworzono': None, 'parametry': {}}
+    if czy_plik_binarny(nazwa_pliku):
+        naglowek = wczytaj_naglowek(nazwa_pliku)
+        statystyki['format'] = f"binarny v{naglowek['wersja']}, {naglowek['kodowanie']}"
+        if naglowek['wersja'] > 1:
+            brak = naglowek['liczba'] == 0
+            return {**statystyki, 'liczba': naglowek['liczba'],
+                    'max_sprawdzone': naglowek['max_sprawdzone'],
+                    'najmniejsza': None if brak else naglowek['najmniejsza'],
+                    'najwieksza': None if brak else naglowek['najwieksza'],
+                    'utworzono': naglowek['utworzono'], 'parametry': naglowek['parametry']}
+    else:
+        statystyki['format'] = 'pickle'
+    with CachePierwszych(nazwa_pliku) as cache:
+        return {**statystyki, 'liczba': len(cache), 'max_sprawdzone': cache.max_sprawdzone,
+                'najmniejsza': cache.n_ta_pierwsza(1) if len(cache) else None,
+                'najwieksza': cache.n_ta_pierwsza(len(cache)) if len(cache) else None}
+
+
+def migruj_cache(
+        zrodlo: str = PLIK_CACHE_PICKLE,
+        cel: str = PLIK_CACHE_PIERWSZYCH,
+        kodowanie: str = None) -> Dict[str, Any]:
+    """
+    Przepisz cache (stary pickle albo plik binarny) do bieżącej wersji formatu binarnego.
+    Parametry generatora z nagłówka źródła przechodzą do celu. Plik źródłowy zostaje.
+    """
+    start_time = time.time()
+    rozmiar_przed = os.path.getsize(zrodlo)
+    parametry = wczytaj_naglowek(zrodlo)['parametry'] if czy_plik_binarny(zrodlo) else None
+    pierwsze, max_sprawdzone = wczytaj_pierwsze(zrodlo, mmap=False)
+    zapisz_pierwsze(pierwsze, max_sprawdzone, cel, kodowanie, parametry)
+    return {'liczba': len(pierwsze), 'max_sprawdzone': max_sprawdzone,
+            'rozmiar_przed': rozmiar_przed, 'rozmiar_po': os.path.getsize(cel),
+            'czas': time.time() - start_time}
+
+
+def main():
+    """Główna funkcja narzędzia formatu cache."""
+    parser = argparse.ArgumentParser(
+        description="Binarny format cache liczb pierwszych - migracja i informacje o pliku",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+Przykłady użycia:
+  %(prog)s --migruj                       # {PLIK_CACHE_PICKLE} -> {PLIK_CACHE_PIERWSZYCH}
+  %(prog)s --migruj stary.pkl --cel nowy.bin
+  %(prog)s --migruj pierwsze_cache.bin --cel tablica.bin --kodowanie tablica
+  %(prog)s --migruj pobrane.bin --cel archiwum.bin --kodowanie odstepy
+  %(prog)s --migruj stary_v1.bin --cel stary_v1.bin  # Nagłówek v2 z sumami kontrolnymi
+  %(prog)s --info                         # Nagłówek i format pliku cache
+        """
+    )
+    parser.add_argument('--migruj', nargs='?', const=PLIK_CACHE_PICKLE, metavar='PLIK',
+                        help=f'Przepisz cache pickle do formatu binarnego '
+                             f'(domyślnie: {PLIK_CACHE_PICKLE})')
+    parser.add_argument('--cel', default=PLIK_CACHE_PIERWSZYCH,
+                        help='Plik wynikowy migracji (domyślnie: %(default)s)')
+    parser.add_argument('--kodowanie', choices=KODOWANIA,
+                        help='Kodowanie pliku wynikowego (domyślnie: najmniejsze)')
+    parser.add_argument('--info', nargs='?', const=PLIK_CACHE_PIERWSZYCH, metavar='PLIK',
+                        help='Wyświetl format, nagłówek i rozmiar pliku cache')
+    args = parser.parse_args()
+
+    if args.migruj:
+        if not os.path.exists(args.migruj):
+            print(f"Błąd: Plik cache '{args.migruj}' nie istnieje")
+            return
+        if (czy_plik_binarny(args.migruj) and not args.kodowanie
+                and wczytaj_naglowek(args.migruj)['wersja'] == WERSJA_FORMATU):
+            print(f"'{args.migruj}' jest już w formacie binarnym v{WERSJA_FORMATU} "
+                  f"(--kodowanie zmienia kodowanie)")
+            return
+        print(f"Migracja {args.migruj} -> {args.cel}...")
+        wynik = migruj_cache(args.migruj, args.cel, args.kodowanie)
+        print(f"Przepisano {wynik['liczba']:,} liczb pierwszych "
+              f"(max_sprawdzone: {wynik['max_sprawdzone']:,}) w {wynik['czas']:.2f} s")
+        print(f"Rozmiar: {wynik['rozmiar_przed']:,} -> {wynik['rozmiar_po']:,} bajtów")
+        if os.path.abspath(args.migruj) != os.path.abspath(args.cel):
+            print(f"Stary plik '{args.migruj}' pozostawiono - usuń go po sprawdzeniu nowego")
+    elif args.info:
+        plik = znajdz_plik_cache(args.info)
+        if czy_plik_binarny(plik):
+            naglowek = wczytaj_naglowek(plik)
+            opis = f"binarny v{naglowek['wersja']}, {naglowek['kodowanie']}"
+            max_sprawdzone = naglowek['max_sprawdzone']
+            liczba, dtype = naglowek['liczba'], naglowek['dtype']
+        else:
+            dane = wczytaj_dane_cache(plik)
+            pierwsze = jako_posortowana_tablica(dane.get('pierwsze', []))
+            opis, max_sprawdzone = dane['format'], dane.get('max_sprawdzone', 0)
+            liczba, dtype = len(pierwsze), pierwsze.dtype
+        print(f"Plik: {plik} ({os.path.getsize(plik):,} bajtów)")
+        print(f"Format: {opis}, typ liczb: {dtype}")
+        print(f"Maksymalna sprawdzona liczba: {max_sprawdzone:,}")
+        print(f"Liczb pierwszych: {liczba:,}")
+        statystyki = statystyki_cache(plik)
+        if statystyki['liczba']:
+            print(f"Zakres: {statystyki['najmniejsza']:,} - {statystyki['najwieksza']:,}")
+        if statystyki['utworzono'] is not None:
+            utworzono = time.localtime(statystyki['utworzono'])
+            print(f"Utworzono: {time.strftime('%Y-%m-%d %H:%M:%S', utworzono)}")
+        if statystyki['parametry']:
+            parametry = json.dumps(statystyki['parametry'], ensure_ascii=False, sort_keys=True)
+            print(f"Parametry generatora: {parametry}")
+        if czy_plik_binarny(plik) and naglowek['kodowanie'] == 'odstepy':
+            print(f"Bloki odstępów: {naglowek['liczba_blokow']:,} "
+                  f"po {naglowek['rozmiar_bloku']:,} liczb, "
+                  f"{naglowek['rozmiar_odstepow']:,} bajtów odstępów")
+        if czy_plik_binarny(plik) and naglowek['liczba_sum']:
+            print(f"Sumy kontrolne CRC32: {naglowek['liczba_sum']:,} "
+                  f"(bloki po {naglowek['rozmiar_bloku_sum']:,} bajtów)")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nOperacja przerwana przez użytkownika.")
+    except Exception as e:
+        print(f"Błąd: {e}")
+        sys.exit(1)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Funkcje Liczb Pierwszych
+Zliczanie liczb pierwszych π(x) bez ich wyliczania (metoda Lucy'ego-Hedgehoga),
+z tablicami NumPy i pamięcią O(√x), oraz n-ta liczba pierwsza bez cache do p_n.
+"""
+
+import math
+
+import numpy as np
+
+# Stała Eulera-Mascheroniego (szereg Ramanujana dla li(x))
+STALA_EULERA = 0.5772156649015329
+
+
+def liczba_pierwszych_do(x: int) -> int:
+    """
+    π(x) - liczba liczb pierwszych nie większych od x, w czasie O(x^(3/4)) i pamięci O(√x).
+
+    S(v) to liczba n w [2, v] bez dzielnika pierwszego < p. Potrzebne są tylko
+    wartości v = x // i, czyli v <= √x (tablica male, indeks v) i x // i dla
+    i <= √x (tablica duze, indeks i). Dla każdej liczby pierwszej p <= √x
+    S(v) -= S(v // p) - S(p - 1) dla v >= p*p; po ostatniej S(x) = π(x).
+    Prawe strony liczone są przed przypisaniem, więc korzystają ze starych
+    wartości S, jak w wersji skalarnej przechodzącej v malejąco.
+    """
+    if x < 2:
+        return 0
+    r = math.isqrt(x)
+    male = np.arange(-1, r, dtype=np.int64)  # male[v] = v - 1
+    duze = np.zeros(r + 1, dtype=np.int64)
+    duze[1:] = x // np.arange(1, r + 1, dtype=np.int64) - 1
+
+    # Liczby pierwsze do √x - proste sito, O(√x) pamięci
+    sito = np.ones(r + 1, dtype=bool)
+    sito[:2] = False
+    for p in range(2, math.isqrt(r) + 1):
+        if sito[p]:
+            sito[p * p::p] = False
+
+    for p in np.flatnonzero(sito).tolist():
+        sp = int(male[p - 1])
+        p2 = p * p
+
+        # duze[i] dla x // i >= p*p; x // (i*p) to duze[i*p] albo male[x // (i*p)]
+        i_max = min(r, x // p2)
+        i_duze = min(i_max, r // p)
+        duze[1:i_duze + 1] -= duze[p:i_duze * p + 1:p] - sp
+        if i_max > i_duze:
+            i = np.arange(i_duze + 1, i_max + 1, dtype=np.int64)
+            duze[i_duze + 1:i_max + 1] -= male[x // (i * p)] - sp
+
+        if p2 <= r:
+            male[p2:] -= male[np.arange(p2, r + 1, dtype=np.int64) // p] - sp
+
+    return int(duze[1])
+
+
+def _logarytm_calkowy(x: float) -> float:
+    """li(x) z szeregu Ramanujana (x > 1) - względny błąd rzędu precyzji float."""
+    ln_x = math.log(x)
+    suma = 0.0
+    wyraz = 1.0  # (ln x)^n / (n! 2^(n-1)) ze znakiem (-1)^(n-1)
+    suma_odwrotnosci = 0.0  # suma 1/(2k+1) dla k <= (n-1)/2
+    for n in range(1, 1000):
+        wyraz *= ln_x / n if n == 1 else -ln_x / (2 * n)
+        if n % 2:
+            suma_odwrotnosci += 1 / n
+        suma += wyraz * suma_odwrotnosci
+        if abs(wyraz) * suma_odwrotnosci < 1e-17 * abs(suma):
+            break
+    return STALA_EULERA + math.log(ln_x) + math.sqrt(x) * suma
+
+
+def _mobius(n: int) -> int:
+    """Funkcja Möbiusa dla małych n (dzielenie próbne)."""
+    wynik = 1
+    p = 2
+    while p * p <= n:
+        if n % p == 0:
+            n //= p
+            if n % p == 0:
+                return 0
+            wynik = -wynik
+        p += 1
+    return -wynik if n > 1 else wynik
+
+
+def oszacuj_liczbe_pierwszych(x: float) -> float:
+    """Funkcja Riemanna R(x) = Σ μ(n)/n · li(x^(1/n)) - przybliża π(x) z błędem rzędu √x/ln(x)."""
+    wynik = 0.0
+    n = 1
+    while x ** (1 / n) >= 2:
+        mu = _mobius(n)
+        if mu:
+            wynik += mu / n * _logarytm_calkowy(x ** (1 / n))
+        n += 1
+    return wynik
+
+
+def oszacuj_n_ta_pierwsza(n: int) -> int:
+    """Przybliżenie p_n: rozwiązanie R(x) = n metodą Newtona (R'(x) ≈ 1/ln(x))."""
+    if n < 6:
+        return (2, 3, 5, 7, 11)[n - 1]
+    x = n * (math.log(n) + math.log(math.log(n)) - 1)  # Cipolla - punkt startowy
+    for _ in range(100):
+        krok = (oszacuj_liczbe_pierwszych(x) - n) * math.log(x)
+        x -= krok
+        if abs(krok) < 1:
+            break
+    return int(x)
+
+
+def n_ta_pierwsza(
+        n: int,
+        pierwsze_istniejace: np.ndarray = None,
+        max_sprawdzone: int = 0) -> int:
+    """
+    n-ta liczba pierwsza (p_1 = 2), bez przesiewania wszystkiego do p_n.
+
+    Jeśli posortowany cache (sprawdzony do max_sprawdzone) ma co najmniej n liczb,
+    wynikiem jest jego n-ty element. W przeciwnym razie x = R^(-1)(n) szacuje p_n,
+    π(x) liczy liczba_pierwszych_do (albo cache, jeśli sięga x), a brakujące
+    |n - π(x)| liczb pierwszych znajduje sito okna przy x - szerokiego na kilka
+    odstępów ln(x) na brakującą liczbę; za wąskie okno jest podwajane.
+    """
+    # Import lokalny - generuj_cache_pierwszych sam importuje ten moduł
+    from generuj_cache_pierwszych import pierwsze_w_przedziale
+
+    if n < 1:
+        raise ValueError(f"Numer liczby pierwszej musi być dodatni: {n}")
+    if pierwsze_istniejace is not None and len(pierwsze_istniejace) >= n:
+        return int(pierwsze_istniejace[n - 1])
+
+    x = oszacuj_n_ta_pierwsza(n)
+    if pierwsze_istniejace is not None and max_sprawdzone >= x:
+        liczba_do_x = int(np.searchsorted(pierwsze_istniejace, x, 'right'))
+    else:
+        liczba_do_x = liczba_pierwszych_do(x)
+
+    # p_n <= x: szukana jest (π(x) - n + 1)-tą liczbą pierwszą licząc w dół od x
+    w_dol = liczba_do_x >= n
+    brakujace = liczba_do_x - n + 1 if w_dol else n - liczba_do_x
+    szerokosc = int((brakujace + 2 * math.isqrt(brakujace) + 32) * math.log(x))
+    while True:
+        if w_dol:
+            okno = pierwsze_w_przedziale(max(x - szerokosc + 1, 2), x, None,
+                                         pierwsze_istniejace, max_sprawdzone)
+            if len(okno) >= brakujace:
+                return int(okno[len(okno) - brakujace])
+        else:
+            okno = pierwsze_w_przedziale(x + 1, x + szerokosc, None,
+                                         pierwsze_istniejace, max_sprawdzone)
+            if len(okno) >= brakujace:
+                return int(okno[brakujace - 1])
+        szerokosc *= 2
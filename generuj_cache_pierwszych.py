@@ -1,29 +1,169 @@
 #!/usr/bin/env python3
 """
 Generator Cache Liczb Pierwszych
-Generuje i zapisuje cache liczb pierwszych do pliku pierwsze_cache.pkl
+Generuje i zapisuje cache liczb pierwszych do pliku pierwsze_cache.bin
 dla przyspieszenia działania generatora spirali Ulama.
 """
 
 import argparse
+import glob
 import math
 import os
 import pickle
 import sys
+import threading
 import time
 import psutil
 import numpy as np
-from multiprocessing import Pool, cpu_count
-from typing import Set, Tuple, Dict
-
-
-# Nazwa pliku cache (taka sama jak w głównym skrypcie)
-PLIK_CACHE_PIERWSZYCH = "pierwsze_cache.pkl"
+try:
+    import resource  # Szczytowe RSS (tylko systemy uniksowe)
+except ImportError:
+    resource = None
+from functools import partial
+from multiprocessing import Pool, cpu_count, shared_memory
+from multiprocessing.pool import ThreadPool
+from typing import Tuple, Dict, Iterable, Iterator, List, Optional
+
+from pierwszosc import czy_pierwsza, czy_pierwsza_wsadowo, ROZMIAR_BLOKU_WSADOWEGO
+from funkcje_pierwszych import liczba_pierwszych_do, n_ta_pierwsza, oszacuj_liczbe_pierwszych, \
+    oszacuj_n_ta_pierwsza
+from format_cache import PLIK_CACHE_PIERWSZYCH, jako_posortowana_tablica, wczytaj_pierwsze, \
+    zapisz_pierwsze, znajdz_plik_cache, statystyki_cache, CachePierwszych, WZORZEC_KOLA, \
+    ROZMIAR_KOLA, LICZBA_BITOW, pierwsze_z_bitmapy_kola, pamiec_zapisu
+
+# Plik punktu kontrolnego (obok cache): nagłówek i kolejne przesiane etapy, dopisywane
+# na bieżąco - pozwala wznowić przerwane generowanie (--wznow)
+ROZSZERZENIE_PUNKTU_KONTROLNEGO = ".postep"
+# Długość etapu (w liczbach) zapisywanego w punkcie kontrolnym
+ROZMIAR_ETAPU = 10**9
+# Z budżetem czasu pierwszy etap jest krótki (mierzy tempo sita), a kolejne zajmują
+# połowę pozostałego budżetu (tempo jest poprawiane przed końcem); krótszych od
+# etapu próbnego etapów już się nie zaczyna
+ETAP_PROBNY = 10**7
 
 # Globalny callback dla progress updates (używany przez web app)
 # Jeśli ustawiony, będzie wywoływany zamiast printowania do stdout
 PROGRESS_CALLBACK = None
 
+# Wzorzec koła 30 (WZORZEC_KOLA z format_cache): liczby nie podzielne przez 2, 3, 5
+# W każdym bloku 30 są to pozycje: 1, 7, 11, 13, 17, 19, 23, 29
+_RESZTY_KOLA = tuple(WZORZEC_KOLA.tolist())
+_POZYCJA_RESZTY = {reszta: pozycja for pozycja, reszta in enumerate(_RESZTY_KOLA)}
+# Wiersz segmentu koła dla reszty mod 30 (-1 dla reszt spoza koła) - wersja wektorowa
+_WIERSZ_RESZTY = np.full(ROZMIAR_KOLA, -1, dtype=np.int8)
+_WIERSZ_RESZTY[WZORZEC_KOLA] = np.arange(len(WZORZEC_KOLA))
+
+# Liczby pierwsze usunięte z góry ze wzorca, którym inicjalizowany jest segment koła;
+# okres wzorca to ich iloczyn (w blokach 30 liczb)
+PIERWSZE_WZORCA_SEGMENTU = (7, 11, 13, 17)
+# Wzorzec budowany przy pierwszym użyciu (osobno w każdym procesie roboczym)
+_WZORZEC_SEGMENTU = None
+
+# Rozmiar bloku bitowego sita (w bitach) - blok bool 2 MB mieści się w L2/L3
+ROZMIAR_BLOKU_BITOWEGO = 1 << 21
+
+# Algorytmy obsługiwane przez sito_eratostenesa_dla_cache
+ALGORYTMY = ('standardowy', 'segmentowany', 'rownolegle_segmentowany', 'kubelkowy')
+
+# Wykonawcy sita równoległego: procesy (Pool, pamięć współdzielona) albo wątki
+# (ThreadPool - przypisania do wycinków numpy zwalniają GIL, dane bez IPC)
+BACKENDY = ('procesy', 'watki')
+
+# Pamięć podręczna CPU - odczyt z sysfs i wartości domyślne, gdy nie jest dostępny
+KATALOG_CPU = "/sys/devices/system/cpu"
+DOMYSLNA_PAMIEC_PODRECZNA = {'l1d': 32 * 1024, 'l2': 256 * 1024}
+
+# Segment sita koła to 8 bajtów na 30 liczb; segment ma WIELOKROTNOSC_L2_SEGMENTU
+# rozmiarów L2 (nie więcej niż MAKS_BAJTOW_SEGMENTU), a małe liczby pierwsze znakują
+# go podblokami wielkości pamięci podręcznej
+WIELOKROTNOSC_L2_SEGMENTU = 16
+MAKS_BAJTOW_SEGMENTU = 64 * 1024**2
+# Liczba pierwsza jest "mała", gdy trafia w podblok co najmniej tyle razy
+MIN_TRAFIEN_W_PODBLOKU = 256
+# Zadanie puli to ciąg przylegających segmentów - najwyżej tyle, żeby tablice
+# odsyłane przez procesy nie rosły z limitem
+MAKS_SEGMENTOW_NA_ZADANIE = 16
+
+# Model pamięci planera --limit-pamieci (zmierzony: interpreter z numpy i psutil to
+# ~31 MB RSS, segment koła w trakcie przesiewania ~1 bajt na liczbę zakresu)
+NARZUT_PROCESU = 64 * 1024**2
+NARZUT_WORKERA = 32 * 1024**2
+BAJTY_NA_LICZBE_SEGMENTU = 1.0
+MIN_PAMIECI_ROBOCZEJ = 16 * 1024**2
+
+# Dane widziane przez proces roboczy puli (ustawiane w _inicjalizuj_worker)
+_PAMIEC_WORKERA = None
+_PIERWSZE_PODSTAWOWE_WORKERA = None
+_PAMIEC_BITMAPY_WORKERA = None
+_BITMAPA_WORKERA = None
+_PIERWSZY_BLOK_BITMAPY_WORKERA = 0
+_BLOK_PODRECZNY_WORKERA = 0
+_ROZMIAR_SEGMENTU_WORKERA = 0
+
+
+def _rozmiar_z_sysfs(tekst: str) -> int:
+    """Zamień rozmiar pamięci podręcznej z sysfs (np. '48K', '2M') na bajty."""
+    tekst = tekst.strip().upper()
+    mnozniki = {'K': 1024, 'M': 1024**2, 'G': 1024**3}
+    if tekst and tekst[-1] in mnozniki:
+        return int(tekst[:-1]) * mnozniki[tekst[-1]]
+    return int(tekst)
+
+
+def wykryj_pamiec_podreczna(katalog: str = KATALOG_CPU) -> Dict[str, int]:
+    """
+    Odczytaj rozmiary L1d i L2 z /sys/devices/system/cpu/cpu*/cache.
+
+    Dla procesorów z różnymi rdzeniami bierze najmniejszą wartość (bezpieczną dla
+    każdego rdzenia); brakujące poziomy uzupełnia DOMYSLNA_PAMIEC_PODRECZNA.
+    """
+    wykryte = {}
+    for indeks in glob.glob(os.path.join(katalog, 'cpu[0-9]*', 'cache', 'index[0-9]*')):
+        try:
+            with open(os.path.join(indeks, 'level')) as f:
+                poziom = int(f.read())
+            with open(os.path.join(indeks, 'type')) as f:
+                typ = f.read().strip()
+            with open(os.path.join(indeks, 'size')) as f:
+                rozmiar = _rozmiar_z_sysfs(f.read())
+        except (OSError, ValueError):
+            continue
+
+        if poziom == 1 and typ == 'Data':
+            klucz = 'l1d'
+        elif poziom == 2 and typ in ('Unified', 'Data'):
+            klucz = 'l2'
+        else:
+            continue
+        if rozmiar > 0:
+            wykryte[klucz] = min(rozmiar, wykryte.get(klucz, rozmiar))
+
+    return {**DOMYSLNA_PAMIEC_PODRECZNA, **wykryte}
+
+
+def rozmiar_segmentu_dla_pamieci_podrecznej(
+        limit: int,
+        procesy: int,
+        pamiec_podreczna: Dict[str, int]) -> int:
+    """
+    Rozmiar segmentu koła (w liczbach, wielokrotność 30) dopasowany do L2.
+
+    Segment to WIELOKROTNOSC_L2_SEGMENTU rozmiarów L2, żeby koszt wywołań numpy na
+    każdą liczbę bazową rozłożył się na dużo liczb, ale co najwyżej tyle, by każdy
+    proces dostał kilka segmentów (równowaga obciążenia i postęp) - nigdy mniej niż L2.
+    """
+    liczby_na_bajt = ROZMIAR_KOLA / len(WZORZEC_KOLA)
+    liczby_l2 = int(pamiec_podreczna['l2'] * liczby_na_bajt)
+    rozmiar = int(min(WIELOKROTNOSC_L2_SEGMENTU * pamiec_podreczna['l2'], MAKS_BAJTOW_SEGMENTU)
+                  * liczby_na_bajt)
+    rozmiar = min(rozmiar, max(liczby_l2, limit // (4 * max(1, procesy))))
+    return max(ROZMIAR_KOLA, rozmiar - rozmiar % ROZMIAR_KOLA)
+
+
+def blok_podreczny_dla_bajtow(bajty: int) -> int:
+    """Liczba kolumn (bloków 30 liczb) segmentu koła mieszcząca się w podanej pamięci."""
+    return bajty // len(WZORZEC_KOLA)
+
 
 def wykryj_zasoby_systemu() -> Dict[str, int]:
     """Wykryj dostępne zasoby systemowe."""
@@ -38,48 +178,71 @@ def wykryj_zasoby_systemu() -> Dict[str, int]:
         return {
             'cpu_logiczne': cpu_rdzenie,
             'cpu_fizyczne': cpu_fizyczne,
-            'pamiec_gb': pamiec_gb
+            'pamiec_gb': pamiec_gb,
+            'pamiec_podreczna': wykryj_pamiec_podreczna()
         }
     except Exception:
         # Wartości domyślne w przypadku błędu
         return {
             'cpu_logiczne': cpu_count(),
             'cpu_fizyczne': cpu_count(),
-            'pamiec_gb': 4
+            'pamiec_gb': 4,
+            'pamiec_podreczna': dict(DOMYSLNA_PAMIEC_PODRECZNA)
         }
 
 
 def oblicz_optymalne_parametry(limit: int, zasoby: Dict[str, int] = None) -> Dict[str, int]:
-    """Oblicz optymalne parametry dla generowania liczb pierwszych."""
+    """
+    Oblicz optymalne parametry dla generowania liczb pierwszych.
+
+    Rozmiar segmentu i podbloku małych liczb pierwszych wynikają z rozmiaru L2
+    (zasoby['pamiec_podreczna']), a nie z ilości wolnej pamięci RAM.
+    """
     if zasoby is None:
         zasoby = wykryj_zasoby_systemu()
 
     cpu_logiczne = zasoby['cpu_logiczne']
     cpu_fizyczne = zasoby['cpu_fizyczne']
     pamiec_gb = zasoby['pamiec_gb']
+    pamiec_podreczna = zasoby.get('pamiec_podreczna') or DOMYSLNA_PAMIEC_PODRECZNA
+    blok_podreczny = blok_podreczny_dla_bajtow(pamiec_podreczna['l2'])
 
     # Ogólne wytyczne optymalizacji
-    if limit <= 1 * 10**6:
-        # Małe liczby - standardowe sito, jeden proces
+    if limit <= 10 * 10**6 or (cpu_logiczne == 1 and limit // 16 <= pamiec_gb * 1024**3 // 4):
+        # Małe i średnie liczby (albo brak równoległości) - bitowe sito, jeden proces.
+        # Bufor zajmuje limit/16 bajtów, więc mieści się w pamięci także dla 10^9-10^10.
         return {
             'algorytm': 'standardowy',
             'procesy': 1,
             'rozmiar_segmentu': 0,
-            'opis': 'Standardowe sito numpy'
+            'blok_podreczny': 0,
+            'opis': 'Bitowe sito numpy (tylko liczby nieparzyste)'
         }
 
-    elif limit <= 10 * 10**6:
-        # Średnie liczby - segmentowane sito, jeden proces
-        rozmiar_segmentu = min(limit // 10, 2 * 10**6)
+    elif cpu_logiczne == 1:
+        # Jeden rdzeń i bufor bitowy za duży na pamięć - segmentowane sito; gdy część
+        # liczb bazowych jest szersza niż segment, sito kubełkowe
+        rozmiar_segmentu = rozmiar_segmentu_dla_pamieci_podrecznej(limit, 1, pamiec_podreczna)
+        if math.isqrt(limit) > rozmiar_segmentu // ROZMIAR_KOLA:
+            return {
+                'algorytm': 'kubelkowy',
+                'procesy': 1,
+                'rozmiar_segmentu': rozmiar_segmentu,
+                'blok_podreczny': blok_podreczny,
+                'opis': f'Sito kubełkowe (segmenty: {rozmiar_segmentu:,})'
+            }
         return {
             'algorytm': 'segmentowany',
             'procesy': 1,
             'rozmiar_segmentu': rozmiar_segmentu,
+            'blok_podreczny': blok_podreczny,
             'opis': f'Segmentowane sito (segmenty: {rozmiar_segmentu:,})'
         }
 
     elif limit <= 100 * 10**6:
-        # Duże liczby - równoległe segmentowane sito
+        # Duże liczby - równoległe segmentowane sito na procesach. Wątki (--backend watki)
+        # oszczędzają start puli, ale jądro trzyma GIL między wywołaniami numpy, a ich
+        # przewagi na wielu rdzeniach nie zmierzono - zostają opcją
         # Optymalna liczba procesów: 2-4 dla CPU z hyperthreading, inaczej wszystkie rdzenie
         if cpu_logiczne > cpu_fizyczne:
             # Hyperthreading - użyj 75% rdzeni logicznych
@@ -88,18 +251,14 @@ def oblicz_optymalne_parametry(limit: int, zasoby: Dict[str, int] = None) -> Dic
             # Bez hyperthreading - użyj wszystkie rdzenie minus jeden
             procesy = max(2, cpu_fizyczne - 1)
 
-        # Rozmiar segmentu zależny od pamięci
-        if pamiec_gb >= 16:
-            rozmiar_segmentu = 5 * 10**6
-        elif pamiec_gb >= 8:
-            rozmiar_segmentu = 2 * 10**6
-        else:
-            rozmiar_segmentu = 1 * 10**6
+        rozmiar_segmentu = rozmiar_segmentu_dla_pamieci_podrecznej(limit, procesy, pamiec_podreczna)
 
         return {
             'algorytm': 'rownolegle_segmentowany',
             'procesy': procesy,
+            'backend': 'procesy',
             'rozmiar_segmentu': rozmiar_segmentu,
+            'blok_podreczny': blok_podreczny,
             'opis': f'Równoległe segmentowane sito ({procesy} procesów, segmenty: {rozmiar_segmentu:,})'}
 
     else:
@@ -112,39 +271,180 @@ def oblicz_optymalne_parametry(limit: int, zasoby: Dict[str, int] = None) -> Dic
         else:
             procesy = cpu_logiczne
 
-        # Większe segmenty dla lepszej wydajności
-        if pamiec_gb >= 32:
-            rozmiar_segmentu = 20 * 10**6
-        elif pamiec_gb >= 16:
-            rozmiar_segmentu = 10 * 10**6
-        elif pamiec_gb >= 8:
-            rozmiar_segmentu = 5 * 10**6
-        else:
-            rozmiar_segmentu = 2 * 10**6
+        rozmiar_segmentu = rozmiar_segmentu_dla_pamieci_podrecznej(limit, procesy, pamiec_podreczna)
 
         return {
             'algorytm': 'rownolegle_segmentowany',
             'procesy': procesy,
+            'backend': 'procesy',
             'rozmiar_segmentu': rozmiar_segmentu,
+            'blok_podreczny': blok_podreczny,
             'opis': f'Zoptymalizowane równoległe sito ({procesy} procesów, segmenty: {rozmiar_segmentu:,})'}
 
 
-def wyswietl_konfiguracje_systemu(limit: int, parametry: Dict[str, int], zasoby: Dict[str, int]):
-    """Wyświetl informacje o konfiguracji systemu i wybranych parametrach."""
+def rozmiar_pamieci_z_tekstu(tekst: str) -> int:
+    """Zamień rozmiar pamięci z wiersza poleceń (np. '4G', '512M', '1.5GB', '1000') na bajty."""
+    tekst = tekst.strip().upper().rstrip('B')
+    mnozniki = {'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+    if tekst and tekst[-1] in mnozniki:
+        return int(float(tekst[:-1]) * mnozniki[tekst[-1]])
+    return int(tekst)
+
+
+def zaplanuj_pamiec(
+        limit: int,
+        limit_pamieci: int,
+        parametry: Dict[str, int],
+        liczba_istniejacych: int = 0,
+        zasoby: Dict[str, int] = None) -> Dict[str, int]:
+    """
+    Dopasuj parametry sita do budżetu pamięci - zwraca parametry z planem.
+
+    Wynik (cache do limit, liczność szacowana funkcją R Riemanna) trzymany w pamięci
+    kosztuje dwa razy swój rozmiar (etapy i ich złączenie); gdy to się nie mieści,
+    etapy są zrzucane na dysk i składane do jednej tablicy ('w_pamieci' False).
+    Z reszty budżetu połowę dostaje etap (wynik etapu z kopią i bitmapa koła), a
+    połowę procesy (segment ~1 bajt na liczbę i narzut procesu roboczego) - ich
+    liczba i rozmiar segmentu są zmniejszane, aż się zmieszczą. Po przesiewaniu
+    zapis cache trzyma wynik razem z buforami kodera (format_cache.pamiec_zapisu,
+    np. cała bitmapa). Gdy wynik z buforami zapisu przekracza budżet, zgłasza
+    ValueError. 'szczyt_pamieci' to oszacowanie planu - większa z obu faz.
+    """
+    if zasoby is None:
+        zasoby = wykryj_zasoby_systemu()
+    pamiec_podreczna = zasoby.get('pamiec_podreczna') or DOMYSLNA_PAMIEC_PODRECZNA
+    bajty_liczby = dtype_dla_limitu(limit).itemsize
+    liczba_wyniku = int(oszacuj_liczbe_pierwszych(limit)) if limit >= 2 else 0
+    bajty_wyniku = liczba_wyniku * bajty_liczby
+    stale = NARZUT_PROCESU + liczba_istniejacych * bajty_liczby
+    szczyt_zapisu = stale + bajty_wyniku + pamiec_zapisu(liczba_wyniku, limit)
+
+    if szczyt_zapisu > limit_pamieci:
+        raise ValueError(
+            f"Cache do {limit:,} (~{bajty_wyniku / 1024**3:.2f} GB liczb i "
+            f"~{(szczyt_zapisu - stale - bajty_wyniku) / 1024**3:.2f} GB buforów zapisu) "
+            f"nie zmieści się w limicie pamięci {limit_pamieci / 1024**3:.2f} GB")
+    if limit_pamieci - stale - 2 * bajty_wyniku >= MIN_PAMIECI_ROBOCZEJ:
+        w_pamieci, kopie_wyniku = True, 2
+    elif limit_pamieci - stale - bajty_wyniku >= MIN_PAMIECI_ROBOCZEJ:
+        w_pamieci, kopie_wyniku = False, 1
+    else:
+        raise ValueError(
+            f"Cache do {limit:,} (~{bajty_wyniku / 1024**3:.2f} GB liczb) nie zmieści się "
+            f"w limicie pamięci {limit_pamieci / 1024**3:.2f} GB")
+    wolne = limit_pamieci - stale - kopie_wyniku * bajty_wyniku
+
+    # Etap: liczby pierwsze z kopią przy łączeniu i bitmapa koła; gęstość jak w
+    # najgęstszym (pierwszym) etapie
+    pierwszy_etap = max(min(limit, ROZMIAR_ETAPU), 2)
+    gestosc = oszacuj_liczbe_pierwszych(pierwszy_etap) / pierwszy_etap
+    bajty_na_liczbe_etapu = 2 * gestosc * bajty_liczby + 1 / ROZMIAR_KOLA
+    rozmiar_etapu = max(ROZMIAR_KOLA, min(ROZMIAR_ETAPU, int(wolne / 2 / bajty_na_liczbe_etapu)))
+    robocza = wolne - rozmiar_etapu * bajty_na_liczbe_etapu
+
+    procesy = max(1, parametry.get('procesy', 1))
+    backend = parametry.get('backend', 'procesy')
+    min_segment = int(pamiec_podreczna['l2'] * ROZMIAR_KOLA / len(WZORZEC_KOLA))
+    while procesy > 1:
+        narzut = NARZUT_WORKERA if backend == 'procesy' else 0
+        if procesy * (narzut + min_segment * BAJTY_NA_LICZBE_SEGMENTU) <= robocza:
+            break
+        procesy -= 1
+    narzut = NARZUT_WORKERA if procesy > 1 and backend == 'procesy' else 0
+
+    rozmiar_segmentu = parametry.get('rozmiar_segmentu') or \
+        rozmiar_segmentu_dla_pamieci_podrecznej(limit, procesy, pamiec_podreczna)
+    rozmiar_segmentu = int(min(rozmiar_segmentu,
+                               (robocza / procesy - narzut) / BAJTY_NA_LICZBE_SEGMENTU))
+    rozmiar_segmentu = max(ROZMIAR_KOLA, rozmiar_segmentu - rozmiar_segmentu % ROZMIAR_KOLA)
+    rozmiar_etapu = max(rozmiar_etapu, rozmiar_segmentu)
+
+    algorytm = parametry['algorytm']
+    if algorytm == 'standardowy' or (algorytm == 'rownolegle_segmentowany' and procesy == 1):
+        # Sito bitowe trzyma bufor całego zakresu - przy budżecie przesiewane są etapy
+        algorytm = 'segmentowany'
+    szczyt = (stale + kopie_wyniku * bajty_wyniku + rozmiar_etapu * bajty_na_liczbe_etapu
+              + procesy * (narzut + rozmiar_segmentu * BAJTY_NA_LICZBE_SEGMENTU))
+    szczyt = max(szczyt, szczyt_zapisu)
+
+    opis = parametry['opis']
+    if algorytm != parametry['algorytm'] or procesy != parametry.get('procesy', 1):
+        wykonawcy = f"{procesy} {_nazwa_wykonawcow(backend)}, " if procesy > 1 else ""
+        opis = f"Sito '{algorytm}' ({wykonawcy}dopasowane do limitu pamięci)"
+    return {**parametry, 'algorytm': algorytm, 'procesy': procesy,
+            'rozmiar_segmentu': rozmiar_segmentu, 'rozmiar_etapu': rozmiar_etapu,
+            'w_pamieci': w_pamieci, 'szczyt_pamieci': int(szczyt), 'opis': opis}
+
+
+def szczytowe_zuzycie_pamieci() -> Tuple[int, int]:
+    """
+    Szczytowe RSS (bajty) tego procesu i największego zakończonego procesu potomnego.
+
+    Zwraca (0, 0), gdy moduł resource jest niedostępny (Windows).
+    """
+    if resource is None:
+        return 0, 0
+    # ru_maxrss jest w KB na Linuksie i w bajtach na macOS
+    jednostka = 1 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * jednostka,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * jednostka)
+
+
+def wyswietl_zuzycie_pamieci(
+        limit_pamieci: int = None,
+        szacowany_szczyt: int = None,
+        procesy_robocze: int = 0):
+    """
+    Wyświetl szczytowe RSS procesu (i procesów roboczych) na tle budżetu i planu.
+
+    Łączny szczyt to szczyt procesu głównego plus procesy_robocze razy największy
+    proces roboczy - górne oszacowanie, bo strony współdzielone liczone są wielokrotnie.
+    """
+    wlasne, potomne = szczytowe_zuzycie_pamieci()
+    if not wlasne:
+        print("Szczytowe zużycie pamięci: niedostępne na tym systemie")
+        return
+    print(f"Szczytowe zużycie pamięci (RSS): {wlasne / 1024**2:,.0f} MB"
+          + (f", największy proces roboczy: {potomne / 1024**2:,.0f} MB" if potomne else ""))
+    if limit_pamieci:
+        lacznie = wlasne + procesy_robocze * potomne
+        zgodnosc = "w limicie" if lacznie <= limit_pamieci else "PONAD LIMIT"
+        print(f"Limit pamięci: {limit_pamieci / 1024**2:,.0f} MB, "
+              f"plan: {szacowany_szczyt / 1024**2:,.0f} MB, "
+              f"łącznie: {lacznie / 1024**2:,.0f} MB - {zgodnosc}")
+
+
+def wyswietl_konfiguracje_systemu(
+        limit: int,
+        parametry: Dict[str, int],
+        zasoby: Dict[str, int],
+        start: int = 1):
+    """Wyświetl informacje o konfiguracji systemu i wybranych parametrach (dla [start, limit])."""
     print(f"\n=== KONFIGURACJA SYSTEMU ===")
     print(f"CPU: {zasoby['cpu_fizyczne']} fizycznych, {zasoby['cpu_logiczne']} logicznych rdzeni")
     print(f"Dostępna pamięć: {zasoby['pamiec_gb']} GB")
-    print(f"Limit generowania: {limit:,} liczb")
+    if 'pamiec_podreczna' in zasoby:
+        print(f"Pamięć podręczna: L1d {zasoby['pamiec_podreczna']['l1d'] // 1024} KB, "
+              f"L2 {zasoby['pamiec_podreczna']['l2'] // 1024} KB")
+    if start > 1:
+        print(f"Przedział: {start:,} - {limit:,} ({limit - start + 1:,} liczb)")
+    else:
+        print(f"Limit generowania: {limit:,} liczb")
 
     print(f"\n=== WYBRANE PARAMETRY OPTYMALIZACJI ===")
     print(f"Algorytm: {parametry['opis']}")
     if parametry['procesy'] > 1:
-        print(f"Procesy równoległe: {parametry['procesy']}")
+        backend = parametry.get('backend', 'procesy')
+        wykonawcy = 'Wątki' if backend == 'watki' else 'Procesy'
+        print(f"{wykonawcy} równoległe: {parametry['procesy']}")
     if parametry['rozmiar_segmentu'] > 0:
         print(f"Rozmiar segmentu: {parametry['rozmiar_segmentu']:,}")
         szacowana_liczba_segmentow = (
-            limit + parametry['rozmiar_segmentu'] - 1) // parametry['rozmiar_segmentu']
+            limit - start + parametry['rozmiar_segmentu']) // parametry['rozmiar_segmentu']
         print(f"Szacowana liczba segmentów: {szacowana_liczba_segmentow:,}")
+    if parametry.get('blok_podreczny', 0) > 0:
+        print(f"Podblok małych liczb pierwszych: "
+              f"{parametry['blok_podreczny'] * len(WZORZEC_KOLA):,} bajtów")
 
 
 def wyswietl_postep(aktualny, calkowity, prefix="Postęp", dlugosc=50):
@@ -165,48 +465,91 @@ def wyswietl_postep(aktualny, calkowity, prefix="Postęp", dlugosc=50):
         sys.stdout.flush()
 
 
-def czy_pierwsza(n: int) -> bool:
-    """Wysoce zoptymalizowane sprawdzanie pierwszości z faktoryzacją kołową."""
-    if n < 2:
-        return False
-    if n == 2 or n == 3:
-        return True
-    if n % 2 == 0 or n % 3 == 0:
-        return False
-
-    # Użyj faktoryzacji kołowej 6k±1 - sprawdzaj tylko liczby postaci 6k±1
-    i = 5
-    sqrt_n = int(math.sqrt(n)) + 1
-    while i < sqrt_n:
-        if n % i == 0 or n % (i + 2) == 0:
-            return False
-        i += 6
-    return True
+def wczytaj_istniejacy_cache() -> Tuple[np.ndarray, int]:
+    """
+    Wczytaj istniejący cache liczb pierwszych jako posortowaną tablicę.
 
+    Plik binarny jest mapowany (np.memmap, bez kopiowania), ale bitmapa i odstępy
+    są rozpakowywane w całości - tylko, gdy potrzebna jest tablica; generator
+    korzysta z otworz_istniejacy_cache. Stary pickle jest czytany, dopóki nie ma
+    pliku binarnego.
+    """
+    try:
+        pierwsze, max_sprawdzone = wczytaj_pierwsze(PLIK_CACHE_PIERWSZYCH)
+        return pierwsze, max(max_sprawdzone, 1)
+    except (FileNotFoundError, pickle.UnpicklingError, KeyError, ValueError):
+        return np.array([], dtype=np.uint32), 1
 
-def wczytaj_istniejacy_cache() -> Tuple[Set[int], int]:
-    """Wczytaj istniejący cache liczb pierwszych z pliku."""
-    if not os.path.exists(PLIK_CACHE_PIERWSZYCH):
-        return set(), 1
 
+def otworz_istniejacy_cache() -> Optional[CachePierwszych]:
+    """Otwórz istniejący cache jako CachePierwszych (zapytania bez rozpakowania) albo None."""
     try:
-        with open(PLIK_CACHE_PIERWSZYCH, 'rb') as f:
-            dane = pickle.load(f)
-            pierwsze = dane.get('pierwsze', set())
-            max_sprawdzone = dane.get('max_sprawdzone', 1)
-            return pierwsze, max_sprawdzone
-    except (FileNotFoundError, pickle.UnpicklingError, KeyError):
-        return set(), 1
+        return CachePierwszych(PLIK_CACHE_PIERWSZYCH)
+    except (FileNotFoundError, pickle.UnpicklingError, KeyError, ValueError):
+        return None
+
+
+def _istniejace_miedzy(pierwsze_istniejace, a: int, b: int) -> np.ndarray:
+    """Liczby z [a, b] z tablicy albo CachePierwszych - z cache rozpakowywany jest tylko [a, b]."""
+    if isinstance(pierwsze_istniejace, CachePierwszych):
+        if not len(pierwsze_istniejace):
+            return np.array([], dtype=pierwsze_istniejace.dtype)
+        return pierwsze_istniejace.pierwsze_miedzy(a, b)
+    pierwsze_istniejace = jako_posortowana_tablica(pierwsze_istniejace)
+    return pierwsze_istniejace[np.searchsorted(pierwsze_istniejace, a):
+                               np.searchsorted(pierwsze_istniejace, b, 'right')]
+
+
+def _zloz_wynik(
+        pierwsze_istniejace,
+        start: int,
+        czesci: Iterable[np.ndarray],
+        liczba_nowych: int,
+        dtype: np.dtype) -> np.ndarray:
+    """
+    Złóż w jednej alokacji istniejące liczby < start i rosnące nowe części.
+
+    Z CachePierwszych liczby przechodzą blokami (bloki()), bez rozpakowania
+    całego cache do osobnej tablicy; czesci może być generatorem.
+    """
+    if isinstance(pierwsze_istniejace, CachePierwszych):
+        liczba_istniejacych = pierwsze_istniejace.liczba_pierwszych_do(start - 1) \
+            if len(pierwsze_istniejace) else 0
+        bloki = pierwsze_istniejace.bloki()
+    else:
+        pierwsze_istniejace = jako_posortowana_tablica(pierwsze_istniejace)
+        bloki = [pierwsze_istniejace[pierwsze_istniejace < start]]
+        liczba_istniejacych = len(bloki[0])
+    wynik = np.empty(liczba_istniejacych + liczba_nowych, dtype=dtype)
+    pozycja = 0
+    for blok in bloki:
+        if pozycja == liczba_istniejacych:
+            break
+        blok = blok[:liczba_istniejacych - pozycja]
+        wynik[pozycja:pozycja + len(blok)] = blok
+        pozycja += len(blok)
+    for czesc in czesci:
+        wynik[pozycja:pozycja + len(czesc)] = czesc
+        pozycja += len(czesc)
+    return wynik
+
+
+# Parametry sita zapisywane w nagłówku cache (bez opisów i planu pamięci)
+KLUCZE_PARAMETROW_CACHE = ('algorytm', 'procesy', 'backend', 'rozmiar_segmentu')
+
 
+def zapisz_cache(pierwsze: np.ndarray, max_sprawdzone: int, parametry: Dict = None):
+    """Zapisz cache liczb pierwszych (posortowana tablica) do pliku binarnego.
 
-def zapisz_cache(pierwsze: Set[int], max_sprawdzone: int):
-    """Zapisz cache liczb pierwszych do pliku."""
-    dane = {
-        'pierwsze': pierwsze,
-        'max_sprawdzone': max_sprawdzone
-    }
-    with open(PLIK_CACHE_PIERWSZYCH, 'wb') as f:
-        pickle.dump(dane, f)
+    parametry - ustawienia sita; do nagłówka trafiają tylko KLUCZE_PARAMETROW_CACHE.
+    """
+    metadane = {'generator': os.path.basename(sys.argv[0]) or 'generuj_cache_pierwszych.py'}
+    for klucz in KLUCZE_PARAMETROW_CACHE:
+        if parametry and parametry.get(klucz) is not None:
+            wartosc = parametry[klucz]
+            metadane[klucz] = wartosc if isinstance(wartosc, str) else int(wartosc)
+    zapisz_pierwsze(jako_posortowana_tablica(pierwsze), max_sprawdzone, PLIK_CACHE_PIERWSZYCH,
+                    parametry=metadane)
 
 
 def generuj_podstawowe_pierwsze(limit: int) -> np.ndarray:
@@ -232,175 +575,867 @@ def generuj_podstawowe_pierwsze(limit: int) -> np.ndarray:
     return np.where(sito)[0]
 
 
-def segmentowane_sito_z_kolem(start: int, koniec: int, pierwsze_podstawowe: np.ndarray) -> Set[int]:
-    """Segmentowane sito z optymalizacją koła 2*3*5 = 30."""
-    if start > koniec:
-        return set()
-
-    # Wzorzec koła 30: liczby nie podzielne przez 2, 3, 5
-    # W każdym bloku 30 są to pozycje: 1, 7, 11, 13, 17, 19, 23, 29
-    wzorzec_kola = np.array([1, 7, 11, 13, 17, 19, 23, 29])
-    rozmiar_kola = 30
-
-    # Oblicz rozmiar segmentu (tylko dla liczb w wzorcu koła)
-    bloki_start = start // rozmiar_kola
-    bloki_koniec = koniec // rozmiar_kola
-    rozmiar_segmentu = (bloki_koniec - bloki_start + 1) * len(wzorzec_kola)
-
-    # Inicjalizuj segment jako wszystkie liczby pierwsze
-    segment = np.ones(rozmiar_segmentu, dtype=bool)
-
-    # Mapowanie indeksów do rzeczywistych liczb
-    def indeks_do_liczby(idx):
-        blok = idx // len(wzorzec_kola)
-        pos_w_bloku = idx % len(wzorzec_kola)
-        return (bloki_start + blok) * rozmiar_kola + wzorzec_kola[pos_w_bloku]
-
-    def liczba_do_indeksu(liczba):
-        blok = liczba // rozmiar_kola - bloki_start
-        reszta = liczba % rozmiar_kola
-        try:
-            pos_w_bloku = np.where(wzorzec_kola == reszta)[0][0]
-            return blok * len(wzorzec_kola) + pos_w_bloku
-        except IndexError:
-            return -1  # Liczba nie jest w wzorcu koła
-
-    # Przesiej segment używając podstawowych liczb pierwszych
-    for p in pierwsze_podstawowe:
-        if p <= 5:  # Pomin liczby użyte w kole
-            continue
-        if p * p > koniec:
-            break
+def dtype_dla_limitu(limit: int) -> np.dtype:
+    """Najmniejszy typ całkowity bez znaku mieszczący liczby do limitu."""
+    return np.dtype(np.uint32) if limit < 2**32 else np.dtype(np.uint64)
 
-        # Znajdź pierwszą liczbę w segmencie podzielna przez p
-        pierwsza_wielokrotnosc = ((start + p - 1) // p) * p
-        if pierwsza_wielokrotnosc < p * p:
-            pierwsza_wielokrotnosc = p * p
 
-        # Oznacz wielokrotności p w segmencie
-        for wielokrotnosc in range(pierwsza_wielokrotnosc, koniec + 1, p):
-            idx = liczba_do_indeksu(wielokrotnosc)
-            if 0 <= idx < len(segment):
-                segment[idx] = False
+def sito_bitowe_nieparzyste(limit: int, rozmiar_bloku: int = ROZMIAR_BLOKU_BITOWEGO) -> np.ndarray:
+    """
+    Sito Eratostenesa tylko dla liczb nieparzystych, spakowane bitowo.
 
-    # Zbierz liczby pierwsze z segmentu
-    pierwsze_w_segmencie = set()
-    for i in range(len(segment)):
-        if segment[i]:
-            liczba = indeks_do_liczby(i)
-            if start <= liczba <= koniec:
-                pierwsze_w_segmencie.add(liczba)
+    Bit i bufora (kolejność bitów 'little') odpowiada liczbie 2*i + 1, więc cały
+    zakres zajmuje limit/16 bajtów. Sito pracuje blokami po rozmiar_bloku bitów:
+    blok jest przesiewany jako tablica bool i od razu pakowany do bufora.
+    """
+    if rozmiar_bloku % 8:
+        raise ValueError("Rozmiar bloku sita bitowego musi być wielokrotnością 8")
 
-    return pierwsze_w_segmencie
+    liczba_bitow = (limit + 1) // 2
+    bufor = np.zeros((liczba_bitow + 7) // 8, dtype=np.uint8)
 
+    pierwsze_podstawowe = generuj_podstawowe_pierwsze(limit)
+    nieparzyste_podstawowe = [p for p in pierwsze_podstawowe.tolist() if p > 2 and p * p <= limit]
 
-def segmentowane_sito_duze_liczby(limit: int, rozmiar_segmentu: int = 10**6) -> Set[int]:
-    """Segmentowane sito zoptymalizowane dla bardzo dużych liczb."""
-    if limit < 2:
-        return set()
+    liczba_blokow = (liczba_bitow + rozmiar_bloku - 1) // rozmiar_bloku
+    for nr_bloku, blok_start in enumerate(range(0, liczba_bitow, rozmiar_bloku)):
+        blok_koniec = min(blok_start + rozmiar_bloku, liczba_bitow)
+        blok = np.ones(blok_koniec - blok_start, dtype=bool)
+
+        for p in nieparzyste_podstawowe:
+            # Indeks p*p; kolejne nieparzyste wielokrotności są co p indeksów
+            indeks = p * p // 2
+            if indeks >= blok_koniec:
+                break
+            if indeks < blok_start:
+                indeks = blok_start + (indeks - blok_start) % p
+            blok[indeks - blok_start::p] = False
+
+        if blok_start == 0:
+            blok[0] = False  # 1 nie jest liczbą pierwszą
+
+        bufor[blok_start // 8:(blok_koniec + 7) // 8] = np.packbits(blok, bitorder='little')
+
+        if (nr_bloku + 1) % max(1, liczba_blokow // 50) == 0 or nr_bloku + 1 == liczba_blokow:
+            wyswietl_postep(nr_bloku + 1, liczba_blokow, "  Przesiewanie")
+
+    return bufor
+
+
+def pierwsze_z_sita_bitowego(
+        bufor: np.ndarray,
+        limit: int,
+        rozmiar_bloku: int = ROZMIAR_BLOKU_BITOWEGO) -> np.ndarray:
+    """Rozpakuj bitowe sito nieparzystych do posortowanej tablicy liczb pierwszych."""
+    dtype = dtype_dla_limitu(limit)
+    czesci = [np.array([2], dtype=dtype)] if limit >= 2 else []
+
+    bajty_bloku = rozmiar_bloku // 8
+    for bajt_start in range(0, len(bufor), bajty_bloku):
+        bity = np.unpackbits(bufor[bajt_start:bajt_start + bajty_bloku], bitorder='little')
+        indeksy = np.flatnonzero(bity) + bajt_start * 8
+        czesci.append((2 * indeksy + 1).astype(dtype))
+
+    if not czesci:
+        return np.array([], dtype=dtype)
+    return np.concatenate(czesci)
+
+
+def _wzorzec_segmentu_kola() -> np.ndarray:
+    """
+    Zwróć segment koła z usuniętymi wielokrotnościami PIERWSZE_WZORCA_SEGMENTU.
+
+    Wzorzec ma dwa okresy długości, więc okno dowolnej fazy o długości do jednego
+    okresu jest zwykłym wycinkiem. Same liczby z PIERWSZE_WZORCA_SEGMENTU też są
+    w nim wykreślone - przywraca je _przesiej_segment_kola.
+    """
+    global _WZORZEC_SEGMENTU
+    if _WZORZEC_SEGMENTU is None:
+        okres = math.prod(PIERWSZE_WZORCA_SEGMENTU)
+        wzorzec = np.ones((len(WZORZEC_KOLA), 2 * okres), dtype=bool)
+        for p in PIERWSZE_WZORCA_SEGMENTU:
+            for reszta in _RESZTY_KOLA:
+                wielokrotnosc = p * reszta
+                wzorzec[_POZYCJA_RESZTY[wielokrotnosc % ROZMIAR_KOLA],
+                        wielokrotnosc // ROZMIAR_KOLA::p] = False
+        _WZORZEC_SEGMENTU = wzorzec
+    return _WZORZEC_SEGMENTU
+
+
+def _segment_z_wzorca(bloki_start: int, liczba_blokow: int) -> np.ndarray:
+    """Nowy segment koła skopiowany z wzorca w fazie odpowiadającej bloki_start."""
+    wzorzec = _wzorzec_segmentu_kola()
+    okres = wzorzec.shape[1] // 2
+    faza = bloki_start % okres
+    segment = np.empty((len(WZORZEC_KOLA), liczba_blokow), dtype=bool)
+    for kolumna in range(0, liczba_blokow, okres):
+        dlugosc = min(okres, liczba_blokow - kolumna)
+        segment[:, kolumna:kolumna + dlugosc] = wzorzec[:, faza:faza + dlugosc]
+
+    if bloki_start == 0 and liczba_blokow:
+        for p in PIERWSZE_WZORCA_SEGMENTU:
+            segment[_POZYCJA_RESZTY[p], 0] = True
+    return segment
+
+
+def _liczby_bazowe_kola(pierwsze_podstawowe: np.ndarray, koniec: int) -> np.ndarray:
+    """Liczby bazowe, które trzeba przesiać do koniec - bez usuniętych przez koło i wzorzec."""
+    od = np.searchsorted(pierwsze_podstawowe, PIERWSZE_WZORCA_SEGMENTU[-1], 'right')
+    do = np.searchsorted(pierwsze_podstawowe, math.isqrt(max(koniec, 0)), 'right')
+    return pierwsze_podstawowe[od:max(od, do)].astype(np.int64)
+
+
+def _znakuj_segment_kola(
+        segment: np.ndarray,
+        pierwsze: np.ndarray,
+        wiersze: np.ndarray,
+        kolumny: np.ndarray,
+        blok_podreczny: int = 0):
+    """
+    Wykreśl z segmentu koła wielokrotności posortowanych liczb pierwszych.
+
+    wiersze i kolumny (kształt (len(pierwsze), 8)) to położenie pierwszej wielokrotności
+    każdej pary (p, reszta) w segmencie. Wielokrotności p*k z k ≡ r (mod 30) leżą zawsze
+    w tym samym wierszu i co p kolumn, więc każda para to jedno przypisanie do wycinka
+    z krokiem p. Liczba nie mniejsza od długości segmentu trafia w wiersz najwyżej raz -
+    takie pary wykreśla jedno przypisanie indeksowane.
+
+    Przy blok_podreczny > 0 (w kolumnach) małe liczby pierwsze - trafiające w podblok
+    co najmniej MIN_TRAFIEN_W_PODBLOKU razy - znakują segment podblok po podbloku,
+    więc znakowany fragment zostaje w pamięci podręcznej; pozostałe znakują cały
+    segment jednym przypisaniem.
+    """
+    liczba_blokow = segment.shape[1]
+
+    rzadkie = int(np.searchsorted(pierwsze, liczba_blokow))
+    if rzadkie < len(pierwsze):
+        trafione = kolumny[rzadkie:] < liczba_blokow
+        segment[wiersze[rzadkie:][trafione], kolumny[rzadkie:][trafione]] = False
+
+    # Podbloki mają sens tylko wtedy, gdy segment jest większy od podbloku
+    prog_malych = blok_podreczny // MIN_TRAFIEN_W_PODBLOKU \
+        if 0 < blok_podreczny < liczba_blokow else 0
+    liczba_malych = int(np.searchsorted(pierwsze[:rzadkie], prog_malych))
+
+    for p, wiersze_p, kolumny_p in zip(pierwsze[liczba_malych:rzadkie].tolist(),
+                                       wiersze[liczba_malych:rzadkie].tolist(),
+                                       kolumny[liczba_malych:rzadkie].tolist()):
+        for wiersz, kolumna in zip(wiersze_p, kolumny_p):
+            segment[wiersz, kolumna::p] = False
+
+    male = list(zip(pierwsze[:liczba_malych].tolist(), wiersze[:liczba_malych].tolist(),
+                    kolumny[:liczba_malych].tolist()))
+    for kolumna_start in range(0, liczba_blokow, blok_podreczny) if male else ():
+        kolumna_koniec = min(kolumna_start + blok_podreczny, liczba_blokow)
+        podblok = segment[:, kolumna_start:kolumna_koniec]
+        for p, wiersze_p, kolumny_p in male:
+            for i, (wiersz, kolumna) in enumerate(zip(wiersze_p, kolumny_p)):
+                if kolumna < kolumna_koniec:
+                    podblok[wiersz, kolumna - kolumna_start::p] = False
+                    # Pierwsza wielokrotność w następnym podbloku
+                    kolumny_p[i] = kolumna + (kolumna_koniec - kolumna + p - 1) // p * p
+
+
+def _przesiej_segment_kola(
+        bloki_start: int,
+        liczba_blokow: int,
+        koniec: int,
+        pierwsze_podstawowe: np.ndarray,
+        blok_podreczny: int = 0) -> np.ndarray:
+    """
+    Przesiej segment koła 30 klasami reszt.
+
+    Segment ma kształt (8, liczba_blokow): wiersz odpowiada reszcie z WZORZEC_KOLA,
+    kolumna - blokowi 30 liczb. Startuje od kopii wzorca bez wielokrotności
+    PIERWSZE_WZORCA_SEGMENTU, więc przesiewanie zaczyna się od następnej liczby
+    pierwszej (znakowanie i blok_podreczny - patrz _znakuj_segment_kola).
+    """
+    segment = _segment_z_wzorca(bloki_start, liczba_blokow)
+    pierwsze = _liczby_bazowe_kola(pierwsze_podstawowe, koniec)
+    wiersze, kolumny = _pierwsze_wielokrotnosci_kola(pierwsze, bloki_start)
+    _znakuj_segment_kola(segment, pierwsze, wiersze, kolumny, blok_podreczny)
+    return segment
+
+
+def przesiewaj_segmenty_kola(
+        granice: Iterable[Tuple[int, int]],
+        pierwsze_podstawowe: np.ndarray,
+        limit: int,
+        blok_podreczny: int = 0) -> Iterator[Tuple[int, int, int, np.ndarray]]:
+    """
+    Przesiewaj kolejne segmenty koła, przenosząc wielokrotności liczb bazowych między nimi.
+
+    Generuje (start, koniec, bloki_start, segment) dla każdej pary (start, koniec)
+    z granice. Położenie następnej wielokrotności każdej pary (p, reszta) jest liczone
+    raz i przesuwane z segmentu na segment, więc przesiewanie nie zaczyna się od
+    dzielenia przez każdą liczbę bazową. Segmenty powinny przylegać do siebie
+    (jak z _granice_segmentow_kola) - po przerwie wielokrotności liczone są od nowa.
+    limit (ostatni koniec) ogranicza liczby bazowe do sqrt(limit).
+    """
+    pierwsze = _liczby_bazowe_kola(pierwsze_podstawowe, limit)
+    kroki = pierwsze[:, None]
+    wiersze = kolumny = None
+    nastepny_blok = None
+
+    for segment_start, segment_koniec in granice:
+        bloki_start = segment_start // ROZMIAR_KOLA
+        liczba_blokow = segment_koniec // ROZMIAR_KOLA - bloki_start + 1
+        if bloki_start != nastepny_blok:
+            wiersze, kolumny = _pierwsze_wielokrotnosci_kola(pierwsze, bloki_start)
+
+        # Pierwsze wielokrotności leżą od p*p, ale pętlę znakowania skracamy i tak
+        aktywne = int(np.searchsorted(pierwsze, math.isqrt(segment_koniec), 'right'))
+        segment = _segment_z_wzorca(bloki_start, liczba_blokow)
+        _znakuj_segment_kola(segment, pierwsze[:aktywne], wiersze[:aktywne], kolumny[:aktywne],
+                             blok_podreczny)
+
+        # Pierwsza wielokrotność za segmentem, liczona od początku następnego segmentu
+        kolumny = kolumny + np.maximum(0, -((kolumny - liczba_blokow) // kroki)) * kroki \
+            - liczba_blokow
+        nastepny_blok = bloki_start + liczba_blokow
+        yield segment_start, segment_koniec, bloki_start, segment
+
+
+def _liczby_z_segmentu_kola(
+        segment: np.ndarray,
+        bloki_start: int,
+        start: int,
+        koniec: int) -> np.ndarray:
+    """Zamień kandydatów segmentu koła na posortowane liczby z zakresu [start, koniec]."""
+    # Transpozycja daje kolejność blok po bloku, czyli rosnące liczby
+    indeksy = np.flatnonzero(segment.T)
+    liczby = (bloki_start + indeksy // len(WZORZEC_KOLA)) * ROZMIAR_KOLA + \
+        WZORZEC_KOLA[indeksy % len(WZORZEC_KOLA)]
+    liczby = liczby[(liczby >= max(start, 2)) & (liczby <= koniec)]
+    return liczby.astype(dtype_dla_limitu(koniec))
+
+
+def segmentowane_sito_z_kolem(
+        start: int,
+        koniec: int,
+        pierwsze_podstawowe: np.ndarray,
+        blok_podreczny: int = 0) -> np.ndarray:
+    """Segmentowane sito z optymalizacją koła 2*3*5 = 30 - zwraca posortowaną tablicę."""
+    if start > koniec:
+        return np.array([], dtype=dtype_dla_limitu(max(koniec, 0)))
+
+    # Segment obejmuje pełne bloki koła zawierające [start, koniec]
+    bloki_start = start // ROZMIAR_KOLA
+    bloki_koniec = koniec // ROZMIAR_KOLA
+
+    segment = _przesiej_segment_kola(
+        bloki_start, bloki_koniec - bloki_start + 1, koniec, pierwsze_podstawowe, blok_podreczny)
+    return _liczby_z_segmentu_kola(segment, bloki_start, start, koniec)
+
+
+def _przygotuj_segmentacje(
+        limit: int,
+        start: int = 2,
+        pierwsze_podstawowe: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Przygotuj dane wspólne dla sit segmentowanych zakresu [start, limit].
+
+    Zwraca (liczby_bazowe, male_pierwsze, start_segmentow). Dla pełnego zakresu liczby
+    bazowe pokrywają zarówno sqrt(limit), jak i cały zakres poniżej początku segmentów,
+    więc male_pierwsze to komplet liczb pierwszych < start_segmentow (i <= limit).
+    Dla zakresu od start > 2 (albo podanych liczb bazowych, np. z istniejącego cache)
+    segmenty zaczynają się od start, a male_pierwsze to tylko 2, 3, 5 z zakresu -
+    jedyne liczby pierwsze pomijane przez koło 30.
+    """
+    if start > 2 or pierwsze_podstawowe is not None:
+        if pierwsze_podstawowe is None:
+            print(f"Generowanie podstawowych liczb pierwszych...")
+            pierwsze_podstawowe = generuj_podstawowe_pierwsze(limit)
+            print(f"Wygenerowano {len(pierwsze_podstawowe):,} podstawowych liczb pierwszych")
+        male_pierwsze = np.array([p for p in (2, 3, 5) if start <= p <= limit],
+                                 dtype=dtype_dla_limitu(limit))
+        return pierwsze_podstawowe, male_pierwsze, max(start, 2)
+
+    start_segmentow = max(math.isqrt(limit) + 1, 1000)
 
     print(f"Generowanie podstawowych liczb pierwszych...")
-    pierwsze_podstawowe = generuj_podstawowe_pierwsze(limit)
+    pierwsze_podstawowe = generuj_podstawowe_pierwsze(max(limit, start_segmentow ** 2))
     print(f"Wygenerowano {len(pierwsze_podstawowe):,} podstawowych liczb pierwszych")
 
-    # Rozpocznij od małych liczb pierwszych
-    wszystkie_pierwsze = set(
-        pierwsze_podstawowe[pierwsze_podstawowe <= int(math.sqrt(limit)) + 100])
+    male_pierwsze = pierwsze_podstawowe[
+        (pierwsze_podstawowe < start_segmentow) & (pierwsze_podstawowe <= limit)]
+    return pierwsze_podstawowe, male_pierwsze.astype(dtype_dla_limitu(limit)), start_segmentow
 
-    # Dodaj małe liczby pierwsze które są poniżej pierwszego segmentu
-    start_segmentow = max(int(math.sqrt(limit)) + 1, 1000)
-    for p in pierwsze_podstawowe:
-        if p < start_segmentow:
-            wszystkie_pierwsze.add(p)
 
-    if limit <= start_segmentow:
-        return {p for p in wszystkie_pierwsze if p <= limit}
+def segmentowane_sito_duze_liczby(
+        limit: int,
+        rozmiar_segmentu: int = 10**6,
+        start: int = 2,
+        pierwsze_podstawowe: np.ndarray = None,
+        blok_podreczny: int = 0) -> np.ndarray:
+    """
+    Segmentowane sito zoptymalizowane dla bardzo dużych liczb.
+
+    Zwraca liczby pierwsze z [start, limit]; pierwsze_podstawowe (wszystkie liczby
+    pierwsze do sqrt(limit)) można podać, np. z istniejącego cache. blok_podreczny
+    to rozmiar podbloku małych liczb pierwszych (patrz _przesiej_segment_kola).
+    """
+    if limit < max(start, 2):
+        return np.array([], dtype=dtype_dla_limitu(max(limit, 0)))
+
+    pierwsze_podstawowe, male_pierwsze, start_segmentow = _przygotuj_segmentacje(
+        limit, start, pierwsze_podstawowe)
+    if limit < start_segmentow:
+        return male_pierwsze
 
     print(f"Segmentowane przesiewanie od {start_segmentow:,} do {limit:,}...")
 
-    # Przetwarzaj w segmentach
-    liczba_segmentow = (limit - start_segmentow + rozmiar_segmentu - 1) // rozmiar_segmentu
-    przetworzone_segmenty = 0
-
-    for segment_start in range(start_segmentow, limit + 1, rozmiar_segmentu):
-        segment_koniec = min(segment_start + rozmiar_segmentu - 1, limit)
+    # Segmenty przylegają do siebie, więc wielokrotności liczb bazowych przechodzą
+    # z segmentu na segment
+    liczba_segmentow, granice = _granice_segmentow_kola(start_segmentow, limit, rozmiar_segmentu)
+    czesci = [male_pierwsze]
 
-        # Przetwarzaj segment
-        pierwsze_w_segmencie = segmentowane_sito_z_kolem(
-            segment_start, segment_koniec, pierwsze_podstawowe)
-        wszystkie_pierwsze.update(pierwsze_w_segmencie)
+    for segment_start, segment_koniec, bloki_start, segment in przesiewaj_segmenty_kola(
+            granice, pierwsze_podstawowe, limit, blok_podreczny):
+        czesci.append(_liczby_z_segmentu_kola(segment, bloki_start, segment_start, segment_koniec))
+        wyswietl_postep(len(czesci) - 1, liczba_segmentow, "Segmenty")
 
-        przetworzone_segmenty += 1
-        wyswietl_postep(przetworzone_segmenty, liczba_segmentow, "Segmenty")
+    # Segmenty są rozłączne i uporządkowane, więc wystarczy jedno łączenie
+    wszystkie_pierwsze = np.concatenate(czesci).astype(dtype_dla_limitu(limit), copy=False)
 
     print(f"Segmentowane sito zakończone - znaleziono {len(wszystkie_pierwsze):,} liczb pierwszych")
     return wszystkie_pierwsze
 
 
+def _pierwsze_wielokrotnosci_kola(
+        pierwsze: np.ndarray,
+        bloki_start: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pierwsze wielokrotności p*k >= max(p*p, 30*bloki_start) z k ≡ r (mod 30) dla każdej
+    reszty r.
+
+    Zwraca (wiersze, kolumny) kształtu (len(pierwsze), 8) - położenie tych wielokrotności
+    w segmencie koła, z kolumnami liczonymi od bloku bloki_start.
+    """
+    p = pierwsze.astype(np.int64)[:, None]
+    k_min = np.maximum(p, -(-(bloki_start * ROZMIAR_KOLA) // p))
+    wielokrotnosci = p * (k_min + (WZORZEC_KOLA - k_min) % ROZMIAR_KOLA)
+    return _WIERSZ_RESZTY[wielokrotnosci % ROZMIAR_KOLA], \
+        wielokrotnosci // ROZMIAR_KOLA - bloki_start
+
+
+def _rozloz_do_kubelkow(
+        kubelki: Dict[int, list],
+        wiersze: np.ndarray,
+        kolumny: np.ndarray,
+        kroki: np.ndarray,
+        kolumny_segmentu: int,
+        liczba_segmentow: int):
+    """Dopisz pary (p, reszta) do kubełków segmentów, w które trafią następnym razem."""
+    cele = kolumny // kolumny_segmentu
+    w_zakresie = cele < liczba_segmentow
+    kolejnosc = np.argsort(cele[w_zakresie], kind='stable')
+    cele = cele[w_zakresie][kolejnosc]
+    wiersze = wiersze[w_zakresie][kolejnosc]
+    kolumny = kolumny[w_zakresie][kolejnosc]
+    kroki = kroki[w_zakresie][kolejnosc]
+
+    unikalne, poczatki = np.unique(cele, return_index=True)
+    konce = np.append(poczatki[1:], len(cele))
+    for cel, poczatek, koniec in zip(unikalne.tolist(), poczatki.tolist(), konce.tolist()):
+        kubelki.setdefault(cel, []).append(
+            (wiersze[poczatek:koniec], kolumny[poczatek:koniec], kroki[poczatek:koniec]))
+
+
+def sito_kubelkowe(
+        limit: int,
+        rozmiar_segmentu: int = 10**6,
+        start: int = 2,
+        pierwsze_podstawowe: np.ndarray = None,
+        blok_podreczny: int = 0) -> np.ndarray:
+    """
+    Segmentowane sito kubełkowe dla bardzo dużych limitów (10^10 i więcej).
+
+    Liczby bazowe węższe niż segment (w blokach koła) przesiewa zwykłe jądro
+    _przesiej_segment_kola. Każda większa trafia w segment najwyżej raz na resztę koła,
+    więc jej pary (p, reszta) czekają w kubełku segmentu, w który trafią następnym
+    razem. Segment obsługuje tylko swój kubełek i przenosi trafione pary dalej, więc
+    koszt segmentu zależy od liczby trafień, a nie od π(√limit). Zakres, liczby bazowe
+    i blok_podreczny jak w segmentowane_sito_duze_liczby.
+    """
+    if limit < max(start, 2):
+        return np.array([], dtype=dtype_dla_limitu(max(limit, 0)))
+
+    pierwsze_podstawowe, male_pierwsze, start_segmentow = _przygotuj_segmentacje(
+        limit, start, pierwsze_podstawowe)
+    if limit < start_segmentow:
+        return male_pierwsze
+
+    liczba_segmentow, granice = _granice_segmentow_kola(start_segmentow, limit, rozmiar_segmentu)
+    kolumny_segmentu = max(ROZMIAR_KOLA,
+                           rozmiar_segmentu - rozmiar_segmentu % ROZMIAR_KOLA) // ROZMIAR_KOLA
+    pierwszy_blok = start_segmentow // ROZMIAR_KOLA
+
+    # Mniejsze liczby usuwa samo koło i wzorzec segmentu
+    pierwsze_podstawowe = pierwsze_podstawowe[
+        (pierwsze_podstawowe > PIERWSZE_WZORCA_SEGMENTU[-1])
+        & (pierwsze_podstawowe <= math.isqrt(limit))]
+    podzial = np.searchsorted(pierwsze_podstawowe, kolumny_segmentu, 'right')
+    male_bazowe, duze_bazowe = pierwsze_podstawowe[:podzial], pierwsze_podstawowe[podzial:]
+
+    print(f"Sito kubełkowe od {start_segmentow:,} do {limit:,} "
+          f"({len(duze_bazowe):,} liczb bazowych w kubełkach)...")
+
+    kubelki = {}
+    if len(duze_bazowe):
+        wiersze, kolumny = _pierwsze_wielokrotnosci_kola(duze_bazowe, pierwszy_blok)
+        _rozloz_do_kubelkow(kubelki, wiersze.ravel(), kolumny.ravel(),
+                            np.repeat(duze_bazowe.astype(np.int64), len(WZORZEC_KOLA)),
+                            kolumny_segmentu, liczba_segmentow)
+
+    czesci = [male_pierwsze]
+    for nr_segmentu, (segment_start, segment_koniec, bloki_start, segment) in enumerate(
+            przesiewaj_segmenty_kola(granice, male_bazowe, limit, blok_podreczny)):
+        liczba_blokow = segment.shape[1]
+
+        kubelek = kubelki.pop(nr_segmentu, None)
+        if kubelek:
+            wiersze, kolumny, kroki = (np.concatenate(czesc) for czesc in zip(*kubelek))
+            przesuniecie = bloki_start - pierwszy_blok
+            w_segmencie = kolumny - przesuniecie < liczba_blokow  # Ostatni segment bywa krótszy
+            segment[wiersze[w_segmencie], kolumny[w_segmencie] - przesuniecie] = False
+            # Kolejna wielokrotność w tym samym wierszu jest p kolumn dalej
+            _rozloz_do_kubelkow(kubelki, wiersze, kolumny + kroki, kroki,
+                                kolumny_segmentu, liczba_segmentow)
+
+        czesci.append(_liczby_z_segmentu_kola(segment, bloki_start, segment_start, segment_koniec))
+        wyswietl_postep(nr_segmentu + 1, liczba_segmentow, "Segmenty")
+
+    wszystkie_pierwsze = np.concatenate(czesci).astype(dtype_dla_limitu(limit), copy=False)
+    print(f"Sito kubełkowe zakończone - znaleziono {len(wszystkie_pierwsze):,} liczb pierwszych")
+    return wszystkie_pierwsze
+
+
+def opublikuj_w_pamieci_wspoldzielonej(tablica: np.ndarray) -> shared_memory.SharedMemory:
+    """Skopiuj tablicę do nowego bloku pamięci współdzielonej (wywołujący go zwalnia)."""
+    pamiec = shared_memory.SharedMemory(create=True, size=max(1, tablica.nbytes))
+    widok = np.ndarray(tablica.shape, dtype=tablica.dtype, buffer=pamiec.buf)
+    widok[:] = tablica
+    del widok  # Bez żywych widoków blok można później zamknąć
+    return pamiec
+
+
+def _inicjalizuj_worker(
+        nazwa_pamieci: str,
+        liczba: int,
+        dtype: str,
+        nazwa_bitmapy: str = None,
+        rozmiar_bitmapy: int = 0,
+        pierwszy_blok_bitmapy: int = 0,
+        blok_podreczny: int = 0,
+        rozmiar_segmentu: int = 0):
+    """
+    Inicjalizator puli - podłącz liczby bazowe (i bitmapę wyniku) z pamięci współdzielonej.
+
+    Przy rozmiar_segmentu > 0 zadanie (start, koniec) jest dzielone przez proces na
+    segmenty tego rozmiaru; przy 0 całe zadanie to jeden segment.
+    """
+    global _PAMIEC_WORKERA, _PIERWSZE_PODSTAWOWE_WORKERA, _PAMIEC_BITMAPY_WORKERA, _BITMAPA_WORKERA
+    global _PIERWSZY_BLOK_BITMAPY_WORKERA, _BLOK_PODRECZNY_WORKERA, _ROZMIAR_SEGMENTU_WORKERA
+    _BLOK_PODRECZNY_WORKERA = blok_podreczny
+    _ROZMIAR_SEGMENTU_WORKERA = rozmiar_segmentu
+    _PAMIEC_WORKERA = shared_memory.SharedMemory(name=nazwa_pamieci)
+    _PIERWSZE_PODSTAWOWE_WORKERA = np.ndarray(
+        (liczba,), dtype=np.dtype(dtype), buffer=_PAMIEC_WORKERA.buf)
+
+    if nazwa_bitmapy is not None:
+        _PAMIEC_BITMAPY_WORKERA = shared_memory.SharedMemory(name=nazwa_bitmapy)
+        _BITMAPA_WORKERA = np.ndarray(
+            (rozmiar_bitmapy,), dtype=np.uint8, buffer=_PAMIEC_BITMAPY_WORKERA.buf)
+        _PIERWSZY_BLOK_BITMAPY_WORKERA = pierwszy_blok_bitmapy
+
+
+def _segmenty_zadania(
+        zadanie_start: int,
+        zadanie_koniec: int,
+        pierwsze_podstawowe: np.ndarray,
+        rozmiar_segmentu: int = 0,
+        blok_podreczny: int = 0) -> Iterator[Tuple[int, int, int, np.ndarray]]:
+    """
+    Przesiej segmenty zadania puli jeden po drugim (patrz przesiewaj_segmenty_kola).
+
+    Przy rozmiar_segmentu > 0 zadanie jest dzielone na segmenty tego rozmiaru;
+    przy 0 całe zadanie to jeden segment.
+    """
+    if rozmiar_segmentu:
+        _, granice = _granice_segmentow_kola(zadanie_start, zadanie_koniec, rozmiar_segmentu)
+    else:
+        granice = [(zadanie_start, zadanie_koniec)]
+    return przesiewaj_segmenty_kola(granice, pierwsze_podstawowe, zadanie_koniec, blok_podreczny)
+
+
+def _liczby_zadania(
+        zadanie: Tuple[int, int],
+        pierwsze_podstawowe: np.ndarray,
+        rozmiar_segmentu: int = 0,
+        blok_podreczny: int = 0) -> np.ndarray:
+    """Posortowane liczby pierwsze zadania (start, koniec) - wspólne dla procesów i wątków."""
+    zadanie_start, zadanie_koniec = zadanie
+    if zadanie_start > zadanie_koniec:
+        return np.array([], dtype=dtype_dla_limitu(max(zadanie_koniec, 0)))
+    czesci = [_liczby_z_segmentu_kola(segment, bloki_start, segment_start, segment_koniec)
+              for segment_start, segment_koniec, bloki_start, segment
+              in _segmenty_zadania(zadanie_start, zadanie_koniec, pierwsze_podstawowe,
+                                   rozmiar_segmentu, blok_podreczny)]
+    return np.concatenate(czesci) if len(czesci) > 1 else czesci[0]
+
+
 def przetwarzaj_segment_rownolegle(args):
-    """Funkcja pomocnicza do równoległego przetwarzania segmentów."""
-    segment_start, segment_koniec, pierwsze_podstawowe = args
-    return segmentowane_sito_z_kolem(segment_start, segment_koniec, pierwsze_podstawowe)
+    """Funkcja pomocnicza puli procesów - liczby pierwsze zadania z danych workera."""
+    return _liczby_zadania(
+        args, _PIERWSZE_PODSTAWOWE_WORKERA, _ROZMIAR_SEGMENTU_WORKERA, _BLOK_PODRECZNY_WORKERA)
 
 
-def segmentowane_sito_rownolegle(
+def przesiej_segment_do_bitmapy(
+        start: int,
+        koniec: int,
+        pierwsze_podstawowe: np.ndarray,
+        bitmapa: np.ndarray,
+        pierwszy_blok: int = 0,
+        blok_podreczny: int = 0) -> int:
+    """
+    Przesiej [start, koniec] i zapisz wynik w bitmapie koła 30 - zwraca liczbę pierwszych.
+
+    Bajt i bitmapy opisuje blok liczb [30*b, 30*b + 29] dla b = pierwszy_blok + i, a bit j
+    (kolejność 'little') liczbę 30*b + WZORZEC_KOLA[j]. Segment zapisuje tylko bajty swoich
+    bloków, więc segmenty zaczynające się na wielokrotnościach 30 nie nachodzą na siebie.
+    """
+    if start > koniec:
+        return 0
+
+    bloki_start = start // ROZMIAR_KOLA
+    liczba_blokow = koniec // ROZMIAR_KOLA - bloki_start + 1
+    segment = _przesiej_segment_kola(
+        bloki_start, liczba_blokow, koniec, pierwsze_podstawowe, blok_podreczny)
+    return _zapisz_segment_do_bitmapy(segment, bloki_start, start, koniec, bitmapa, pierwszy_blok)
+
+
+def _zapisz_segment_do_bitmapy(
+        segment: np.ndarray,
+        bloki_start: int,
+        start: int,
+        koniec: int,
+        bitmapa: np.ndarray,
+        pierwszy_blok: int = 0) -> int:
+    """Zapisz przesiany segment koła do bitmapy (patrz przesiej_segment_do_bitmapy)."""
+    liczba_blokow = segment.shape[1]
+
+    # Wytnij kandydatów spoza [start, koniec] w skrajnych blokach segmentu
+    segment[:, 0] &= bloki_start * ROZMIAR_KOLA + WZORZEC_KOLA >= max(start, 2)
+    segment[:, -1] &= (bloki_start + liczba_blokow - 1) * ROZMIAR_KOLA + WZORZEC_KOLA <= koniec
+
+    bajty = np.packbits(segment.T, axis=1, bitorder='little').ravel()
+    bitmapa[bloki_start - pierwszy_blok:bloki_start - pierwszy_blok + liczba_blokow] = bajty
+    return int(LICZBA_BITOW[bajty].sum(dtype=np.int64))
+
+
+def _zadanie_do_bitmapy(
+        zadanie: Tuple[int, int],
+        pierwsze_podstawowe: np.ndarray,
+        bitmapa: np.ndarray,
+        pierwszy_blok: int = 0,
+        rozmiar_segmentu: int = 0,
+        blok_podreczny: int = 0) -> int:
+    """Przesiej segmenty zadania do bitmapy koła - zwraca liczbę pierwszych (procesy i wątki)."""
+    zadanie_start, zadanie_koniec = zadanie
+    if zadanie_start > zadanie_koniec:
+        return 0
+    return sum(_zapisz_segment_do_bitmapy(
+        segment, bloki_start, segment_start, segment_koniec, bitmapa, pierwszy_blok)
+        for segment_start, segment_koniec, bloki_start, segment
+        in _segmenty_zadania(zadanie_start, zadanie_koniec, pierwsze_podstawowe,
+                             rozmiar_segmentu, blok_podreczny))
+
+
+def przetwarzaj_segment_do_bitmapy(args):
+    """Funkcja pomocnicza puli procesów - przesiewa segmenty zadania do wspólnej bitmapy."""
+    return _zadanie_do_bitmapy(
+        args, _PIERWSZE_PODSTAWOWE_WORKERA, _BITMAPA_WORKERA, _PIERWSZY_BLOK_BITMAPY_WORKERA,
+        _ROZMIAR_SEGMENTU_WORKERA, _BLOK_PODRECZNY_WORKERA)
+
+
+def _granice_segmentow_kola(
+        start_segmentow: int,
         limit: int,
-        rozmiar_segmentu: int = 10**6,
-        procesy: int = None) -> Set[int]:
-    """Segmentowane sito z przetwarzaniem równoległym."""
-    if limit < 2:
-        return set()
+        rozmiar_segmentu: int) -> Tuple[int, Iterator[Tuple[int, int]]]:
+    """
+    Leniwie wyznacz granice segmentów - zwraca (liczba_segmentow, iterator (start, koniec)).
+
+    Granice leżą na wielokrotnościach 30 (rozmiar segmentu jest zaokrąglany w dół),
+    więc segmenty nie dzielą bloków koła ani bajtów bitmapy.
+    """
+    rozmiar_segmentu = max(ROZMIAR_KOLA, rozmiar_segmentu - rozmiar_segmentu % ROZMIAR_KOLA)
+    pierwszy = start_segmentow - start_segmentow % ROZMIAR_KOLA
+    liczba_segmentow = (limit - pierwszy) // rozmiar_segmentu + 1
+
+    def granice():
+        for segment_start in range(pierwszy, limit + 1, rozmiar_segmentu):
+            yield max(segment_start, start_segmentow), \
+                min(segment_start + rozmiar_segmentu - 1, limit)
+
+    return liczba_segmentow, granice()
+
+
+def _zadania_z_segmentow(
+        granice: Iterable[Tuple[int, int]],
+        segmenty_na_zadanie: int) -> Iterator[Tuple[int, int]]:
+    """Połącz kolejne segmenty w zadania (start pierwszego, koniec ostatniego)."""
+    iterator = iter(granice)
+    while True:
+        paczka = [para for _, para in zip(range(segmenty_na_zadanie), iterator)]
+        if not paczka:
+            return
+        yield paczka[0][0], paczka[-1][1]
 
-    if procesy is None:
-        procesy = min(cpu_count(), 8)  # Ogranicz do 8 procesów
 
-    print(f"Generowanie podstawowych liczb pierwszych...")
-    pierwsze_podstawowe = generuj_podstawowe_pierwsze(limit)
-    print(f"Wygenerowano {len(pierwsze_podstawowe):,} podstawowych liczb pierwszych")
+def _domyslne_segmenty_na_zadanie(liczba_segmentow: int, procesy: int) -> int:
+    """Po kilka zadań na proces, ale najwyżej MAKS_SEGMENTOW_NA_ZADANIE segmentów w zadaniu."""
+    return max(1, min(MAKS_SEGMENTOW_NA_ZADANIE, liczba_segmentow // (4 * procesy)))
 
-    # Małe liczby pierwsze
-    wszystkie_pierwsze = set(
-        pierwsze_podstawowe[pierwsze_podstawowe <= int(math.sqrt(limit)) + 100])
 
-    start_segmentow = max(int(math.sqrt(limit)) + 1, 1000)
-    for p in pierwsze_podstawowe:
-        if p < start_segmentow:
-            wszystkie_pierwsze.add(p)
+def _imap_ograniczone(pool: Pool, funkcja, argumenty: Iterable, maks_w_locie: int) -> Iterator:
+    """
+    pool.imap z co najwyżej maks_w_locie zadaniami wysłanymi, a jeszcze nieodebranymi.
 
-    if limit <= start_segmentow:
-        return {p for p in wszystkie_pierwsze if p <= limit}
+    Wyniki przychodzą w kolejności zadań. Semafor zatrzymuje wątek wysyłający zadania
+    puli, więc także wyniki czekające na wcześniejszy segment nie rosną ponad limit.
+    """
+    semafor = threading.Semaphore(maks_w_locie)
+    zatrzymaj = threading.Event()
 
-    print(
-        f"Segmentowane przesiewanie równoległe ({procesy} procesów) od {start_segmentow:,} do {limit:,}...")
+    def zadania():
+        iterator = iter(argumenty)
+        while True:
+            # Najpierw miejsce w locie, dopiero potem pobranie kolejnego argumentu
+            semafor.acquire()
+            if zatrzymaj.is_set():
+                return
+            argument = next(iterator, None)
+            if argument is None:
+                return
+            yield argument
 
-    # Przygotuj argumenty dla równoległego przetwarzania
-    argumenty_segmentow = []
-    for segment_start in range(start_segmentow, limit + 1, rozmiar_segmentu):
-        segment_koniec = min(segment_start + rozmiar_segmentu - 1, limit)
-        argumenty_segmentow.append((segment_start, segment_koniec, pierwsze_podstawowe))
+    try:
+        for wynik in pool.imap(funkcja, zadania()):
+            semafor.release()
+            yield wynik
+    finally:
+        # Odblokuj wątek wysyłający, żeby pula mogła się zamknąć po przerwaniu
+        zatrzymaj.set()
+        semafor.release()
+
+
+def _nazwa_wykonawcow(backend: str) -> str:
+    """Nazwa wykonawców sita równoległego do komunikatów."""
+    return 'wątków' if backend == 'watki' else 'procesów'
+
+
+def _pula_segmentow(
+        pierwsze_podstawowe: np.ndarray,
+        procesy: int,
+        pamiec_bitmapy: shared_memory.SharedMemory = None,
+        rozmiar_bitmapy: int = 0,
+        pierwszy_blok_bitmapy: int = 0,
+        blok_podreczny: int = 0,
+        rozmiar_segmentu: int = 0) -> Tuple[Pool, shared_memory.SharedMemory]:
+    """Utwórz pulę z liczbami bazowymi (i opcjonalnie bitmapą) w pamięci współdzielonej."""
+    pamiec = opublikuj_w_pamieci_wspoldzielonej(pierwsze_podstawowe)
+    initargs = (pamiec.name, len(pierwsze_podstawowe), pierwsze_podstawowe.dtype.str,
+                pamiec_bitmapy.name if pamiec_bitmapy is not None else None,
+                rozmiar_bitmapy, pierwszy_blok_bitmapy, blok_podreczny, rozmiar_segmentu)
+    try:
+        pool = Pool(processes=procesy, initializer=_inicjalizuj_worker, initargs=initargs)
+    except Exception:
+        pamiec.close()
+        pamiec.unlink()
+        raise
+    return pool, pamiec
 
-    # Przetwarzaj segmenty równoległe z paskiem postępu
-    print(f"Przetwarzanie {len(argumenty_segmentow):,} segmentów...")
 
-    with Pool(processes=procesy) as pool:
-        wyniki = pool.map(przetwarzaj_segment_rownolegle, argumenty_segmentow)
+def strumien_segmentow_rownoleglych(
+        limit: int,
+        rozmiar_segmentu: int = 10**6,
+        procesy: int = None,
+        maks_w_locie: int = None,
+        start: int = 2,
+        pierwsze_podstawowe: np.ndarray = None,
+        blok_podreczny: int = 0,
+        segmenty_na_zadanie: int = None,
+        backend: str = 'procesy') -> Iterator[np.ndarray]:
+    """
+    Strumieniowe sito równoległe - generuje kolejne posortowane tablice liczb pierwszych.
+
+    Obejmuje zakres [start, limit] (liczby bazowe można podać, jak w
+    segmentowane_sito_duze_liczby). Pierwsza tablica to małe liczby pierwsze,
+    dalej wyniki zadań w rosnącej kolejności. Zadanie to segmenty_na_zadanie
+    przylegających segmentów, które proces przesiewa po kolei, przenosząc
+    wielokrotności liczb bazowych (patrz przesiewaj_segmenty_kola).
+    W locie jest najwyżej maks_w_locie zadań (domyślnie 2 na proces), więc pamięć
+    potrzebna na przesiewanie nie zależy od limitu; postęp raportowany jest po
+    każdym odebranym zadaniu. Z backend 'watki' zadania wykonuje pula wątków na
+    tych samych liczbach bazowych - bez pamięci współdzielonej i przesyłania wyników.
+    """
+    if limit < max(start, 2):
+        return
 
-    # Połącz wyniki z paskiem postępu
-    print(f"Łączenie wyników z {len(wyniki):,} segmentów...")
-    for idx, pierwsze_w_segmencie in enumerate(wyniki):
-        if idx % max(1, len(wyniki) // 20) == 0 or idx == len(wyniki) - 1:
-            wyswietl_postep(idx + 1, len(wyniki), "  Łączenie")
-        wszystkie_pierwsze.update(pierwsze_w_segmencie)
+    if procesy is None:
+        procesy = min(cpu_count(), 8)  # Ogranicz do 8 procesów
+    if maks_w_locie is None:
+        maks_w_locie = 2 * procesy
+
+    pierwsze_podstawowe, male_pierwsze, start_segmentow = _przygotuj_segmentacje(
+        limit, start, pierwsze_podstawowe)
+    yield male_pierwsze
+    if limit < start_segmentow:
+        return
+
+    print(f"Segmentowane przesiewanie równoległe ({procesy} {_nazwa_wykonawcow(backend)}) "
+          f"od {start_segmentow:,} do {limit:,}...")
+    liczba_segmentow, granice = _granice_segmentow_kola(start_segmentow, limit, rozmiar_segmentu)
+    if segmenty_na_zadanie is None:
+        segmenty_na_zadanie = _domyslne_segmenty_na_zadanie(liczba_segmentow, procesy)
+    print(f"Przetwarzanie {liczba_segmentow:,} segmentów po {segmenty_na_zadanie} na zadanie "
+          f"(w locie najwyżej {maks_w_locie} zadań)...")
+
+    dtype = dtype_dla_limitu(limit)
+    if backend == 'watki':
+        pool, pamiec = ThreadPool(procesy), None
+        funkcja = partial(_liczby_zadania, pierwsze_podstawowe=pierwsze_podstawowe,
+                          rozmiar_segmentu=rozmiar_segmentu, blok_podreczny=blok_podreczny)
+    else:
+        pool, pamiec = _pula_segmentow(pierwsze_podstawowe, procesy, blok_podreczny=blok_podreczny,
+                                       rozmiar_segmentu=rozmiar_segmentu)
+        funkcja = przetwarzaj_segment_rownolegle
+    try:
+        with pool:
+            zadania = _zadania_z_segmentow(granice, segmenty_na_zadanie)
+            for nr_zadania, wynik in enumerate(
+                    _imap_ograniczone(pool, funkcja, zadania, maks_w_locie), 1):
+                wyswietl_postep(min(nr_zadania * segmenty_na_zadanie, liczba_segmentow),
+                                liczba_segmentow, "Segmenty")
+                yield wynik.astype(dtype, copy=False)
+    finally:
+        if pamiec is not None:
+            pamiec.close()
+            pamiec.unlink()
+
+
+def segmentowane_sito_rownolegle(
+        limit: int,
+        rozmiar_segmentu: int = 10**6,
+        procesy: int = None,
+        bez_kopiowania: bool = True,
+        maks_w_locie: int = None,
+        start: int = 2,
+        pierwsze_podstawowe: np.ndarray = None,
+        blok_podreczny: int = 0,
+        segmenty_na_zadanie: int = None,
+        backend: str = 'procesy') -> np.ndarray:
+    """
+    Segmentowane sito z przetwarzaniem równoległym.
+
+    Liczby bazowe trafiają raz do pamięci współdzielonej i są podłączane przez
+    inicjalizator puli, więc zadania przesyłane do procesów to tylko (start, koniec).
+    W trybie bez_kopiowania procesy zapisują wynik bezpośrednio do współdzielonej
+    bitmapy koła 30 i odsyłają tylko liczbę znalezionych pierwszych; bez niego
+    segmenty przychodzą strumieniowo ze strumien_segmentow_rownoleglych. W obu
+    trybach zadanie to segmenty_na_zadanie przylegających segmentów, a w locie jest
+    najwyżej maks_w_locie zadań. Zakres i liczby bazowe jak w
+    segmentowane_sito_duze_liczby. Backend 'watki' zastępuje pulę procesów pulą
+    wątków: bitmapa i liczby bazowe to zwykłe tablice tego procesu, bez startu
+    procesów, pamięci współdzielonej i przesyłania argumentów.
+    """
+    if limit < max(start, 2):
+        return np.array([], dtype=dtype_dla_limitu(max(limit, 0)))
+
+    if procesy is None:
+        procesy = min(cpu_count(), 8)  # Ogranicz do 8 procesów
+    if maks_w_locie is None:
+        maks_w_locie = 2 * procesy
+
+    dtype = dtype_dla_limitu(limit)
+    if not bez_kopiowania:
+        # Segmenty są rozłączne i uporządkowane - wyniki łączymy jednym concatenate
+        wszystkie_pierwsze = np.concatenate(list(strumien_segmentow_rownoleglych(
+            limit, rozmiar_segmentu, procesy, maks_w_locie, start, pierwsze_podstawowe,
+            blok_podreczny, segmenty_na_zadanie, backend))).astype(dtype, copy=False)
+        print(f"Segmentowane sito równoległe zakończone - "
+              f"znaleziono {len(wszystkie_pierwsze):,} liczb pierwszych")
+        return wszystkie_pierwsze
+
+    pierwsze_podstawowe, male_pierwsze, start_segmentow = _przygotuj_segmentacje(
+        limit, start, pierwsze_podstawowe)
+    if limit < start_segmentow:
+        return male_pierwsze
+
+    print(f"Segmentowane przesiewanie równoległe ({procesy} {_nazwa_wykonawcow(backend)}) "
+          f"od {start_segmentow:,} do {limit:,}...")
+    liczba_segmentow, granice = _granice_segmentow_kola(start_segmentow, limit, rozmiar_segmentu)
+    if segmenty_na_zadanie is None:
+        segmenty_na_zadanie = _domyslne_segmenty_na_zadanie(liczba_segmentow, procesy)
+    print(f"Przetwarzanie {liczba_segmentow:,} segmentów po {segmenty_na_zadanie} na zadanie "
+          f"(w locie najwyżej {maks_w_locie} zadań)...")
+
+    # Nowy blok pamięci współdzielonej (i np.zeros) jest wyzerowany - niezapisane bloki
+    # są puste. Bitmapa zaczyna się od bloku koła zawierającego start_segmentow.
+    pierwszy_blok = start_segmentow // ROZMIAR_KOLA
+    rozmiar_bitmapy = limit // ROZMIAR_KOLA - pierwszy_blok + 1
+    if backend == 'watki':
+        pamiec_bitmapy = None
+        bitmapa = np.zeros(rozmiar_bitmapy, dtype=np.uint8)
+    else:
+        pamiec_bitmapy = shared_memory.SharedMemory(create=True, size=rozmiar_bitmapy)
+        bitmapa = np.ndarray((rozmiar_bitmapy,), dtype=np.uint8, buffer=pamiec_bitmapy.buf)
+    try:
+        if backend == 'watki':
+            pool, pamiec = ThreadPool(procesy), None
+            funkcja = partial(_zadanie_do_bitmapy, pierwsze_podstawowe=pierwsze_podstawowe,
+                              bitmapa=bitmapa, pierwszy_blok=pierwszy_blok,
+                              rozmiar_segmentu=rozmiar_segmentu, blok_podreczny=blok_podreczny)
+        else:
+            pool, pamiec = _pula_segmentow(
+                pierwsze_podstawowe, procesy, pamiec_bitmapy, rozmiar_bitmapy, pierwszy_blok,
+                blok_podreczny, rozmiar_segmentu)
+            funkcja = przetwarzaj_segment_do_bitmapy
+        try:
+            liczba_nowych = 0
+            with pool:
+                zadania = _zadania_z_segmentow(granice, segmenty_na_zadanie)
+                for nr_zadania, liczba in enumerate(
+                        _imap_ograniczone(pool, funkcja, zadania, maks_w_locie), 1):
+                    liczba_nowych += liczba
+                    wyswietl_postep(min(nr_zadania * segmenty_na_zadanie, liczba_segmentow),
+                                    liczba_segmentow, "Segmenty")
+        finally:
+            if pamiec is not None:
+                pamiec.close()
+                pamiec.unlink()
+
+        # Zadania zwróciły tylko liczności - wynik ma znany rozmiar od razu
+        print(f"Rozpakowywanie bitmapy ({rozmiar_bitmapy:,} bajtów)...")
+        wszystkie_pierwsze = pierwsze_z_bitmapy_kola(
+            bitmapa, liczba_nowych, dtype, male_pierwsze, pierwszy_blok)
+    finally:
+        # Bez żywych widoków blok pamięci współdzielonej można zamknąć
+        del bitmapa
+        if pamiec_bitmapy is not None:
+            pamiec_bitmapy.close()
+            pamiec_bitmapy.unlink()
 
     print(
         f"Segmentowane sito równoległe zakończone - znaleziono {len(wszystkie_pierwsze):,} liczb pierwszych")
     return wszystkie_pierwsze
 
 
-def sito_eratostenesa_dla_cache(limit: int, parametry: Dict[str, int] = None) -> Set[int]:
+def sito_eratostenesa_dla_cache(limit: int, parametry: Dict[str, int] = None) -> np.ndarray:
     """Zoptymalizowane Sito Eratostenesa z automatycznym wyborem algorytmu."""
     if limit < 2:
-        return set()
+        return np.array([], dtype=np.uint32)
 
     # Użyj przekazanych parametrów lub oblicz automatycznie
     if parametry is None:
@@ -408,55 +1443,37 @@ def sito_eratostenesa_dla_cache(limit: int, parametry: Dict[str, int] = None) ->
 
     algorytm = parametry['algorytm']
 
-    # Standardowe sito
+    # Standardowe sito (bitowe, tylko liczby nieparzyste)
     if algorytm == 'standardowy':
-        print(f"Inicjalizacja standardowego sita dla {limit:,} liczb...")
-
-        # Użyj numpy boolean array dla lepszej wydajności
-        sito = np.ones(limit + 1, dtype=bool)
-        sito[0] = sito[1] = False
-
-        print(f"Uruchamianie algorytmu sita...")
-        sqrt_limit = int(math.sqrt(limit))
-
-        # Optymalizuj poprzez osobne obsłużenie 2 a potem tylko liczby nieparzyste
-        if limit >= 2:
-            sito[4::2] = False
-
-        # Liczba nieparzystych liczb do sprawdzenia
-        liczby_nieparzyste = (sqrt_limit - 1) // 2
-        aktualna_pozycja = 0
-
-        for i in range(3, sqrt_limit + 1, 2):
-            aktualna_pozycja += 1
-            if aktualna_pozycja % max(1, liczby_nieparzyste // 50) == 0 or i == sqrt_limit:
-                wyswietl_postep(aktualna_pozycja, liczby_nieparzyste, "  Przesiewanie")
-            if sito[i]:
-                sito[i * i::2 * i] = False
-
-        if liczby_nieparzyste > 0:
-            wyswietl_postep(liczby_nieparzyste, liczby_nieparzyste, "  Przesiewanie")
+        print(f"Inicjalizacja bitowego sita dla {limit:,} liczb "
+              f"({((limit + 1) // 2 + 7) // 8:,} bajtów)...")
+        bufor = sito_bitowe_nieparzyste(limit)
 
         print(f"  Zbieranie liczb pierwszych...")
-        # Użyj numpy where do szybkiego zbierania z paskiem postępu
-        indices = np.where(sito)[0]
-        pierwsze = set()
-        for idx, p in enumerate(indices):
-            if idx % max(1, len(indices) // 20) == 0 or idx == len(indices) - 1:
-                wyswietl_postep(idx + 1, len(indices), "  Zbieranie")
-            pierwsze.add(p)
+        pierwsze = pierwsze_z_sita_bitowego(bufor, limit)
 
         print(f"Standardowe sito zakończone - znaleziono {len(pierwsze):,} liczb pierwszych")
         return pierwsze
 
     # Segmentowane sito
     elif algorytm == 'segmentowany':
-        return segmentowane_sito_duze_liczby(limit, parametry['rozmiar_segmentu'])
+        return segmentowane_sito_duze_liczby(
+            limit, parametry['rozmiar_segmentu'],
+            blok_podreczny=parametry.get('blok_podreczny', 0))
+
+    # Sito kubełkowe dla bardzo dużych limitów
+    elif algorytm == 'kubelkowy':
+        return sito_kubelkowe(
+            limit, parametry['rozmiar_segmentu'],
+            blok_podreczny=parametry.get('blok_podreczny', 0))
 
     # Równoległe segmentowane sito
     elif algorytm == 'rownolegle_segmentowany':
         return segmentowane_sito_rownolegle(
-            limit, parametry['rozmiar_segmentu'], parametry['procesy'])
+            limit, parametry['rozmiar_segmentu'], parametry['procesy'],
+            parametry.get('bez_kopiowania', True),
+            blok_podreczny=parametry.get('blok_podreczny', 0),
+            backend=parametry.get('backend', 'procesy'))
 
     else:
         # Fallback - użyj standardowego algorytmu
@@ -468,65 +1485,399 @@ def sito_eratostenesa_dla_cache(limit: int, parametry: Dict[str, int] = None) ->
 def sprawdzanie_indywidualne_dla_cache(
         start: int,
         koniec: int,
-        pierwsze_istniejace: Set[int]) -> Set[int]:
-    """Sprawdzanie pierwszości metodą indywidualną dla zakresu."""
-    nowe_pierwsze = set(pierwsze_istniejace)
-
+        pierwsze_istniejace: np.ndarray) -> np.ndarray:
+    """Sprawdzanie indywidualne dla zakresu (cache - tablica albo CachePierwszych)."""
     # Dodaj małe liczby pierwsze ręcznie dla wydajności
-    if koniec >= 2 and 2 not in nowe_pierwsze:
-        nowe_pierwsze.add(2)
-    if koniec >= 3 and 3 not in nowe_pierwsze:
-        nowe_pierwsze.add(3)
+    nowe_pierwsze = [np.array([p for p in (2, 3) if start <= p <= koniec], dtype=np.int64)]
 
     # Sprawdzaj tylko liczby nieparzyste zaczynając od 5
     start_nieparz = max(start, 5)
     if start_nieparz % 2 == 0:
         start_nieparz += 1
 
-    if start_nieparz > koniec:
-        return nowe_pierwsze
+    liczby_do_sprawdzenia = max(0, (koniec - start_nieparz) // 2 + 1)
+    krok_bloku = 2 * ROZMIAR_BLOKU_WSADOWEGO
+
+    # Liczby nieparzyste sprawdzane są blokami testem wsadowym
+    for blok_start in range(start_nieparz, koniec + 1, krok_bloku):
+        liczby = np.arange(blok_start, min(blok_start + krok_bloku, koniec + 1), 2, dtype=np.int64)
+        nowe_pierwsze.append(liczby[czy_pierwsza_wsadowo(liczby)])
+        wyswietl_postep((blok_start - start_nieparz) // 2 + len(liczby), liczby_do_sprawdzenia,
+                        "  Sprawdzanie")
+
+    # Istniejące liczby leżą poniżej start, nowe są rosnące - wynik pozostaje posortowany
+    return _zloz_wynik(pierwsze_istniejace, start, nowe_pierwsze,
+                       sum(len(czesc) for czesc in nowe_pierwsze), dtype_dla_limitu(koniec))
+
+
+def pierwsze_w_przedziale(
+        a: int,
+        b: int,
+        parametry: Dict[str, int] = None,
+        pierwsze_istniejace: np.ndarray = None,
+        max_sprawdzone: int = 0,
+        pierwsze_podstawowe: np.ndarray = None,
+        parametry_uzyte: Dict = None) -> np.ndarray:
+    """
+    Liczby pierwsze z przedziału [a, b] - przesiewa tylko ten przedział.
+
+    Liczby bazowe (do sqrt(b)) to pierwsze_podstawowe, jeśli podane (np. wspólne dla
+    etapów przebiegu), albo pochodzą z pierwsze_istniejace (posortowana tablica
+    albo CachePierwszych sprawdzony do max_sprawdzone), jeśli ten sięga dostatecznie
+    wysoko, a w przeciwnym razie są generowane. Przedział w całości pokryty przez
+    cache jest z niego wycinany - z CachePierwszych rozpakowywany jest tylko on.
+    Bez parametrów sito dobierane jest do zasobów: równoległe dzieli przedział na
+    podprzedziały między procesy, a na jednym procesorze sito kubełkowe przejmuje
+    przedziały, w których liczby bazowe są szersze od segmentu. parametry_uzyte
+    (słownik) dostaje sito, które faktycznie przesiało przedział - do nagłówka cache.
+    """
+    a = max(a, 2)
+    if b < a:
+        return np.array([], dtype=dtype_dla_limitu(max(b, 0)))
+
+    if pierwsze_istniejace is not None and max_sprawdzone >= b:
+        return _istniejace_miedzy(pierwsze_istniejace, a, b)
+
+    granica = math.isqrt(b)
+    if pierwsze_podstawowe is None and pierwsze_istniejace is not None \
+            and max_sprawdzone >= granica:
+        pierwsze_podstawowe = _istniejace_miedzy(pierwsze_istniejace, 0, granica)
+        print(f"Liczby bazowe z istniejącego cache: {len(pierwsze_podstawowe):,}")
+
+    automatyczne = parametry is None
+    if automatyczne:
+        parametry = dict(oblicz_optymalne_parametry(b - a + 1))
+        if parametry['algorytm'] == 'standardowy':
+            # Sito bitowe nie przesiewa od a - segmenty i podbloki dobierane są niżej
+            parametry['rozmiar_segmentu'] = 0
+            del parametry['blok_podreczny']
+
+    blok_podreczny = parametry.get('blok_podreczny', 0)
+    rozmiar_segmentu = parametry['rozmiar_segmentu']
+    if not rozmiar_segmentu:
+        # Parametry sita bitowego nie mają segmentów - dobierz je do pamięci podręcznej
+        pamiec_podreczna = wykryj_pamiec_podreczna()
+        rozmiar_segmentu = rozmiar_segmentu_dla_pamieci_podrecznej(
+            b - a + 1, parametry['procesy'], pamiec_podreczna)
+        if 'blok_podreczny' not in parametry:
+            blok_podreczny = blok_podreczny_dla_bajtow(pamiec_podreczna['l2'])
 
-    liczby_do_sprawdzenia = (koniec - start_nieparz) // 2 + 1
-    przetworzone = 0
+    algorytm = parametry['algorytm']
+    if automatyczne and algorytm != 'rownolegle_segmentowany':
+        # W wysokich przedziałach o wyborze decyduje sqrt(b), a nie długość przedziału
+        algorytm = 'kubelkowy' if granica > rozmiar_segmentu // ROZMIAR_KOLA else 'segmentowany'
+
+    if algorytm not in ('rownolegle_segmentowany', 'kubelkowy'):
+        # Pozostałe (w tym sito bitowe z parametrów) przesiewają przedział segmentami
+        algorytm = 'segmentowany'
+    if parametry_uzyte is not None:
+        rownolegle = algorytm == 'rownolegle_segmentowany'
+        parametry_uzyte.update({
+            'algorytm': algorytm, 'rozmiar_segmentu': rozmiar_segmentu,
+            'procesy': parametry['procesy'] if rownolegle else 1,
+            'backend': parametry.get('backend', 'procesy') if rownolegle else None})
+
+    print(f"Przesiewanie przedziału {a:,} - {b:,}...")
+    if algorytm == 'rownolegle_segmentowany':
+        return segmentowane_sito_rownolegle(
+            b, rozmiar_segmentu, parametry['procesy'], parametry.get('bez_kopiowania', True),
+            start=a, pierwsze_podstawowe=pierwsze_podstawowe, blok_podreczny=blok_podreczny,
+            backend=parametry.get('backend', 'procesy'))
+    if algorytm == 'kubelkowy':
+        return sito_kubelkowe(
+            b, rozmiar_segmentu, start=a, pierwsze_podstawowe=pierwsze_podstawowe,
+            blok_podreczny=blok_podreczny)
+    return segmentowane_sito_duze_liczby(
+        b, rozmiar_segmentu, start=a, pierwsze_podstawowe=pierwsze_podstawowe,
+        blok_podreczny=blok_podreczny)
+
+
+def rozszerz_cache_segmentowo(
+        pierwsze_istniejace: np.ndarray,
+        max_sprawdzone: int,
+        limit: int,
+        parametry: Dict[str, int] = None,
+        parametry_uzyte: Dict = None) -> np.ndarray:
+    """
+    Rozszerz cache przesiewając tylko zakres [max_sprawdzone+1, limit].
+
+    Liczby bazowe (do sqrt(limit)) pochodzą z istniejącego cache, jeśli ten sięga
+    dostatecznie wysoko - wtedy koszt jest proporcjonalny do długości nowego zakresu.
+    Zakres przesiewa pierwsze_w_przedziale (jego sito trafia do parametry_uzyte);
+    cache (tablica albo CachePierwszych) trafia do wyniku blokami.
+    """
+    start = max_sprawdzone + 1
+    nowe_pierwsze = pierwsze_w_przedziale(
+        start, limit, parametry, pierwsze_istniejace, max_sprawdzone,
+        parametry_uzyte=parametry_uzyte)
+
+    # Istniejące liczby leżą poniżej start, nowe są rosnące - wynik pozostaje posortowany
+    return _zloz_wynik(pierwsze_istniejace, start, [nowe_pierwsze], len(nowe_pierwsze),
+                       dtype_dla_limitu(limit))
+
+
+def _plik_punktu_kontrolnego() -> str:
+    """Ścieżka pliku punktu kontrolnego dla bieżącego PLIK_CACHE_PIERWSZYCH."""
+    return PLIK_CACHE_PIERWSZYCH + ROZSZERZENIE_PUNKTU_KONTROLNEGO
+
+
+def wczytaj_punkt_kontrolny(
+        max_sprawdzone: int,
+        limit: int,
+        tylko_liczby: bool = False) -> Tuple[List[np.ndarray], int, int]:
+    """
+    Wczytaj etapy z pliku punktu kontrolnego, które ciągną zakres od max_sprawdzone+1.
+
+    Zwraca (tablice etapów, ostatnia pokryta liczba, długość poprawnej części pliku);
+    z tylko_liczby zamiast tablic są ich długości (w pamięci jest jeden etap naraz).
+    Plik zaczęty od innego stanu cache jest pomijany (długość 0), a urwany ostatni
+    rekord (przerwany zapis) - odcinany; etapy wykraczające poza limit są pomijane.
+    """
+    tablice = []
+    pokryte = max_sprawdzone
+    plik = _plik_punktu_kontrolnego()
+    if not os.path.exists(plik):
+        return tablice, pokryte, 0
+
+    with open(plik, 'rb') as f:
+        try:
+            naglowek = pickle.load(f)
+        except (EOFError, pickle.UnpicklingError):
+            return tablice, pokryte, 0
+        if naglowek.get('max_sprawdzone') != max_sprawdzone:
+            return tablice, pokryte, 0
+        dlugosc = f.tell()
+        while True:
+            try:
+                poczatek, koniec, pierwsze = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError, ValueError):
+                break
+            if poczatek != pokryte + 1 or koniec > limit:
+                break
+            tablice.append(len(pierwsze) if tylko_liczby else pierwsze)
+            pokryte = koniec
+            dlugosc = f.tell()
+    return tablice, pokryte, dlugosc
+
+
+def _etapy_z_punktu_kontrolnego(dlugosci: List[int]) -> Iterator[np.ndarray]:
+    """Kolejne etapy z pliku punktu kontrolnego - wczytywane po jednym przy składaniu wyniku."""
+    with open(_plik_punktu_kontrolnego(), 'rb') as f:
+        pickle.load(f)  # nagłówek
+        for _ in dlugosci:
+            _, _, pierwsze = pickle.load(f)
+            yield pierwsze
+
+
+def generuj_z_punktami_kontrolnymi(
+        pierwsze_istniejace: np.ndarray,
+        max_sprawdzone: int,
+        limit: int,
+        parametry: Dict[str, int] = None,
+        wznow: bool = False,
+        budzet_czasu: float = None,
+        rozmiar_etapu: int = ROZMIAR_ETAPU,
+        w_pamieci: bool = True,
+        parametry_uzyte: Dict = None) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Przesiewaj [max_sprawdzone+1, limit] etapami po rozmiar_etapu liczb, dopisując
+    każdy ukończony etap do pliku punktu kontrolnego.
+
+    Z wznow etapy zapisane przez przerwany przebieg (od tego samego stanu cache)
+    są pomijane. Z budzet_czasu (sekundy) pierwszy etap ma ETAP_PROBNY liczb, a
+    kolejne tyle, ile według dotychczasowego tempa mieści się w połowie pozostałego
+    budżetu - budżet jest przybliżony (tempo zmienia się z wysokością przedziału).
+    Zwraca (liczby pierwsze, ostatnia pokryta liczba) - mniej niż limit oznacza
+    przerwanie z powodu budżetu; wynik jest wtedy None (nie jest składany), a plik
+    punktu kontrolnego zachowany. Po ukończeniu plik jest usuwany (wywołujący
+    zapisuje cache). Bez w_pamieci ukończone etapy zostają tylko na dysku, a wynik
+    jest z nich składany na końcu - szczyt pamięci to jedna kopia wyniku zamiast
+    dwóch (etapy i ich złączenie). Cache (tablica albo CachePierwszych) daje liczby
+    bazowe i trafia do wyniku blokami. parametry_uzyte dostaje sito ostatniego
+    przesianego etapu (jak w pierwsze_w_przedziale).
+    """
+    start_time = time.time()
+    plik = _plik_punktu_kontrolnego()
 
-    for i in range(start_nieparz, koniec + 1, 2):
-        przetworzone += 1
-        if przetworzone % max(1, liczby_do_sprawdzenia // 100) == 0 or i == koniec:
-            wyswietl_postep(przetworzone, liczby_do_sprawdzenia, "  Sprawdzanie")
-        if czy_pierwsza(i):
-            nowe_pierwsze.add(i)
+    if wznow:
+        etapy, pokryte, dlugosc = wczytaj_punkt_kontrolny(max_sprawdzone, limit, not w_pamieci)
+        if etapy:
+            print(f"Wznawianie od {pokryte + 1:,} ({len(etapy)} etapów z punktu kontrolnego)")
+        else:
+            print("Brak punktu kontrolnego pasującego do stanu cache - przesiewanie od początku")
+    else:
+        etapy, pokryte, dlugosc = [], max_sprawdzone, 0
 
-    return nowe_pierwsze
+    # Liczby bazowe do sqrt(limit) raz na cały przebieg - każdy etap bierze je z nich
+    granica = math.isqrt(limit)
+    if max_sprawdzone >= granica:
+        pierwsze_podstawowe = _istniejace_miedzy(pierwsze_istniejace, 0, granica)
+        print(f"Liczby bazowe z istniejącego cache: {len(pierwsze_podstawowe):,}")
+    else:
+        pierwsze_podstawowe = generuj_podstawowe_pierwsze(limit)
 
+    with open(plik, 'r+b' if dlugosc else 'wb') as f:
+        if dlugosc:
+            f.truncate(dlugosc)
+            f.seek(dlugosc)
+        else:
+            pickle.dump({'max_sprawdzone': max_sprawdzone, 'limit': limit}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+        przesiane, czas_przesiewania = 0, 0.0
+        while pokryte < limit:
+            koniec = min((pokryte // rozmiar_etapu + 1) * rozmiar_etapu, limit)
+            if budzet_czasu is not None:
+                pozostalo = budzet_czasu - (time.time() - start_time)
+                dlugosc = int(pozostalo / 2 * przesiane / czas_przesiewania) if czas_przesiewania \
+                    else ETAP_PROBNY
+                if pozostalo <= 0 or dlugosc < min(ETAP_PROBNY, koniec - pokryte):
+                    print(f"Budżet czasu wyczerpany - pokryto zakres do {pokryte:,}")
+                    break
+                koniec = min(koniec, pokryte + dlugosc)
+            poczatek_etapu = time.time()
+            pierwsze = pierwsze_w_przedziale(pokryte + 1, koniec, parametry,
+                                            pierwsze_podstawowe=pierwsze_podstawowe,
+                                            parametry_uzyte=parametry_uzyte)
+            pickle.dump((pokryte + 1, koniec, pierwsze), f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+            etapy.append(pierwsze if w_pamieci else len(pierwsze))
+            del pierwsze
+            przesiane += koniec - pokryte
+            czas_przesiewania += time.time() - poczatek_etapu
+            pokryte = koniec
+            print(f"Punkt kontrolny: pokryto do {pokryte:,} ({pokryte * 100 / limit:.1f}%)")
+
+    if pokryte < limit:
+        # Przerwanie - etapy są w punkcie kontrolnym, wyniku nikt nie zapisze
+        return None, pokryte
+
+    dtype = dtype_dla_limitu(pokryte)
+    if w_pamieci:
+        pierwsze = _zloz_wynik(pierwsze_istniejace, max_sprawdzone + 1, etapy,
+                               sum(len(etap) for etap in etapy), dtype)
+    else:
+        pierwsze = _zloz_wynik(pierwsze_istniejace, max_sprawdzone + 1,
+                               _etapy_z_punktu_kontrolnego(etapy), sum(etapy), dtype)
+    os.remove(plik)
+    return pierwsze, pokryte
+
+
+def wyswietl_statystyki_cache(sprawdz_pi: bool = False):
+    """
+    Wyświetl statystyki istniejącego cache - z nagłówka (v2 - sprawdzonego sumą CRC32).
 
-def wyswietl_statystyki_cache():
-    """Wyświetl statystyki istniejącego cache."""
-    if not os.path.exists(PLIK_CACHE_PIERWSZYCH):
+    sprawdz_pi porównuje liczność z nagłówka z π(max_sprawdzone) liczonym niezależnie
+    (O(x^¾) - dla 10^12 to sekundy, więc tylko na życzenie).
+    """
+    plik = znajdz_plik_cache(PLIK_CACHE_PIERWSZYCH)
+    if not os.path.exists(plik):
         print("Plik cache nie istnieje.")
         return
 
     try:
-        pierwsze, max_sprawdzone = wczytaj_istniejacy_cache()
-        rozmiar_pliku = os.path.getsize(PLIK_CACHE_PIERWSZYCH)
+        # Liczby z nagłówka (v2) - bez wczytywania samych liczb pierwszych
+        statystyki = statystyki_cache(plik)
+        liczba = statystyki['liczba']
+        max_sprawdzone = statystyki['max_sprawdzone']
+        rozmiar_pliku = statystyki['rozmiar_pliku']
 
         print(f"\n=== STATYSTYKI CACHE ===")
-        print(f"Plik cache: {PLIK_CACHE_PIERWSZYCH}")
+        print(f"Plik cache: {plik} (format {statystyki['format']})")
         print(f"Rozmiar pliku: {rozmiar_pliku:,} bajtów ({rozmiar_pliku/1024/1024:.2f} MB)")
+        if statystyki['utworzono'] is not None:
+            utworzono = time.localtime(statystyki['utworzono'])
+            print(f"Utworzono: {time.strftime('%Y-%m-%d %H:%M:%S', utworzono)}")
+        if statystyki['parametry']:
+            parametry = ', '.join(f'{k}={v}' for k, v in statystyki['parametry'].items())
+            print(f"Parametry generatora: {parametry}")
         print(f"Maksymalna sprawdzona liczba: {max_sprawdzone:,}")
-        print(f"Liczba liczb pierwszych w cache: {len(pierwsze):,}")
+        print(f"Liczba liczb pierwszych w cache: {liczba:,}")
+        if liczba:
+            print(f"Zakres: {statystyki['najmniejsza']:,} - {statystyki['najwieksza']:,}")
         if max_sprawdzone > 1:
-            gestosc = len(pierwsze) / max_sprawdzone * 100
+            gestosc = liczba / max_sprawdzone * 100
             print(f"Gęstość liczb pierwszych: {gestosc:.3f}%")
-
-        # Wyświetl kilka największych liczb pierwszych
-        if pierwsze:
-            posortowane = sorted(pierwsze, reverse=True)[:5]
-            print(f"Największe liczby pierwsze w cache: {', '.join(map(str, posortowane))}")
+            if sprawdz_pi:
+                # π(x) liczone niezależnie od zawartości cache - wykrywa braki i nadmiary
+                oczekiwane = liczba_pierwszych_do(max_sprawdzone)
+                zgodnosc = "zgodne" if oczekiwane == liczba else "NIEZGODNE"
+                print(f"π({max_sprawdzone:,}) = {oczekiwane:,} - {zgodnosc} z cache")
+
+        # Wyświetl kilka największych liczb pierwszych (dekodowane tylko ostatnie bloki)
+        if liczba:
+            with CachePierwszych(plik) as cache:
+                najwieksze = [cache.n_ta_pierwsza(n) for n in range(liczba, max(liczba - 5, 0), -1)]
+            print(f"Największe liczby pierwsze w cache: {', '.join(map(str, najwieksze))}")
 
     except Exception as e:
         print(f"Błąd przy odczytywaniu cache: {e}")
 
 
+def wyswietl_przedzial(a: int, b: int, pierwsze: np.ndarray, czas: float):
+    """Wyświetl podsumowanie liczb pierwszych znalezionych w przedziale [a, b]."""
+    print(f"\n=== LICZBY PIERWSZE W PRZEDZIALE [{a:,}, {b:,}] ===")
+    print(f"Czas wykonania: {czas:.2f} sekund")
+    print(f"Znaleziono {len(pierwsze):,} liczb pierwszych")
+    if len(pierwsze):
+        # Twierdzenie o liczbach pierwszych: gęstość w okolicy x to około 1/ln(x)
+        srodek = (max(a, 2) + b) / 2
+        oczekiwane = (b - max(a, 2) + 1) / math.log(max(srodek, 3))
+        print(f"Oczekiwane z 1/ln(x): {oczekiwane:,.0f} "
+              f"(stosunek {len(pierwsze) / oczekiwane:.4f})")
+        print(f"Najmniejsze: {', '.join(map(str, pierwsze[:5].tolist()))}")
+        print(f"Największe: {', '.join(map(str, pierwsze[-5:].tolist()))}")
+
+
+def wyswietl_liczbe_pierwszych(x: int):
+    """Wyświetl π(x) policzone metodą Lucy'ego-Hedgehoga, z porównaniem do x/ln(x)."""
+    print(f"=== LICZBA LICZB PIERWSZYCH π({x:,}) ===")
+    start_time = time.time()
+    wynik = liczba_pierwszych_do(x)
+    print(f"π({x:,}) = {wynik:,}")
+    print(f"Czas obliczeń: {time.time() - start_time:.2f} sekund")
+    if x > 2:
+        print(f"x/ln(x) = {x / math.log(x):,.0f} "
+              f"(stosunek π(x) do niego: {wynik / (x / math.log(x)):.4f})")
+
+
+def wyswietl_n_ta_pierwsza(n: int):
+    """
+    Wyświetl n-tą liczbę pierwszą - wybór z cache, jeśli ma co najmniej n liczb.
+
+    Cache nie jest wczytywany: dla tablicy to odczyt jednego elementu, dla bitmapy
+    i odstępów - jednej strony. Dalej liczy n_ta_pierwsza, biorąc z cache tylko
+    liczby bazowe (do sqrt szacowanego p_n).
+    """
+    print(f"=== {n:,}. LICZBA PIERWSZA ===")
+    start_time = time.time()
+    plik = znajdz_plik_cache(PLIK_CACHE_PIERWSZYCH)
+    if not os.path.exists(plik):
+        wynik = n_ta_pierwsza(n)
+    else:
+        with CachePierwszych(plik) as cache:
+            if n <= len(cache):
+                print(f"Odczyt z cache ({len(cache):,} liczb)")
+                wynik = cache.n_ta_pierwsza(n)
+            elif len(cache):
+                granica = min(cache.max_sprawdzone, 2 * math.isqrt(oszacuj_n_ta_pierwsza(n)) + 1)
+                wynik = n_ta_pierwsza(n, cache.pierwsze_miedzy(0, granica), granica)
+            else:
+                wynik = n_ta_pierwsza(n)
+    print(f"p({n:,}) = {wynik:,}")
+    print(f"Czas obliczeń: {time.time() - start_time:.2f} sekund")
+
+
+def zapisz_przedzial(pierwsze: np.ndarray, nazwa_pliku: str):
+    """Zapisz liczby pierwsze z przedziału jako .npy albo tekst (jedna liczba na linię)."""
+    if nazwa_pliku.endswith('.npy'):
+        np.save(nazwa_pliku, pierwsze)
+    else:
+        np.savetxt(nazwa_pliku, pierwsze, fmt='%d')
+    print(f"Zapisano {len(pierwsze):,} liczb do {nazwa_pliku}")
+
+
 def main():
     """Główna funkcja generatora cache."""
     parser = argparse.ArgumentParser(
@@ -537,8 +1888,18 @@ Przykłady użycia:
   %(prog)s 1000000          # Generuj cache do 1 miliona (auto-optymalizacja)
   %(prog)s 100000000        # Duże liczby z automatyczną optymalizacją
   %(prog)s --statystyki     # Pokaż statystyki istniejącego cache
+  %(prog)s --statystyki --sprawdz-pi  # ... i porównaj liczność z π(max_sprawdzone)
   %(prog)s 50000000 --procesy 4  # Wymuś 4 procesy
   %(prog)s 25000000 --segment 2000000  # Ustaw rozmiar segmentu
+  %(prog)s 1000000000 --algorytm kubelkowy --segment 1000000  # Sito kubełkowe
+  %(prog)s 25000000 --blok-podreczny 49152  # Podbloki wielkości L1d zamiast L2
+  %(prog)s 50000000 --algorytm rownolegle_segmentowany --backend watki  # Wątki zamiast procesów
+  %(prog)s --przedzial 1000000000000000 1000000100000000  # Tylko przedział [a, b]
+  %(prog)s --liczba-pierwszych 1000000000000  # π(10^12) bez wyliczania liczb
+  %(prog)s 10000000000 --budzet-czasu 3600  # Najwyżej godzina, potem punkt kontrolny
+  %(prog)s 10000000000 --wznow  # Kontynuuj od ostatniego punktu kontrolnego
+  %(prog)s 10000000000 --limit-pamieci 4G  # Zmieść się w 4 GB pamięci
+  %(prog)s --n-ta-pierwsza 10000000000  # 10^10-ta liczba pierwsza bez cache do niej
         """
     )
 
@@ -555,22 +1916,68 @@ Przykłady użycia:
                         help='Rozszerz istniejący cache do podanej liczby')
     parser.add_argument('--statystyki', action='store_true',
                         help='Wyświetl statystyki istniejącego cache')
+    parser.add_argument('--sprawdz-pi', action='store_true',
+                        help='Ze statystykami porównaj liczność cache z π(max_sprawdzone) '
+                             '(O(x^¾))')
     parser.add_argument('--nadpisz', action='store_true',
                         help='Nadpisz istniejący cache zamiast go rozszerzać')
+    parser.add_argument('--algorytm', choices=ALGORYTMY,
+                        help='Wymuś algorytm sita (domyślnie: dobrany do limitu i zasobów)')
     parser.add_argument('--procesy', type=int,
                         help='Liczba procesów do przetwarzania równoległego (domyślnie: auto)')
-    parser.add_argument('--segment', type=int, default=1000000,
-                        help='Rozmiar segmentu dla dużych liczb (domyślnie: 1000000)')
+    parser.add_argument('--backend', choices=BACKENDY,
+                        help='Wykonawcy sita równoległego: procesy (Pool) albo wątki (bez IPC)')
+    parser.add_argument('--segment', type=int,
+                        help='Rozmiar segmentu dla dużych liczb '
+                             '(domyślnie: dobrany do pamięci L2)')
+    parser.add_argument('--blok-podreczny', type=int, metavar='BAJTY',
+                        help='Podblok dla małych liczb pierwszych w bajtach, np. rozmiar L1d '
+                             '(0 = wyłącz; domyślnie: rozmiar L2 z /sys/devices/system/cpu)')
+    parser.add_argument('--przedzial', type=int, nargs=2, metavar=('A', 'B'),
+                        help='Znajdź liczby pierwsze tylko w przedziale [A, B] (cache bez zmian)')
+    parser.add_argument('--liczba-pierwszych', type=int, metavar='X',
+                        help='Policz liczby pierwsze <= X (π(X)) bez ich wyliczania i bez cache')
+    parser.add_argument('--n-ta-pierwsza', type=int, metavar='N',
+                        help='Wyświetl N-tą liczbę pierwszą '
+                             '(szacunek π(x) i sito krótkiego okna)')
+    parser.add_argument('--wznow', action='store_true',
+                        help='Wznów przerwane generowanie od ostatniego punktu kontrolnego')
+    parser.add_argument('--budzet-czasu', type=float, metavar='SEKUNDY',
+                        help='Zakończ po około tym czasie z punktem kontrolnym (do --wznow); '
+                             'budżet jest przybliżony - etapy dobierane są do zmierzonego '
+                             'tempa sita')
+    parser.add_argument('--limit-pamieci', type=rozmiar_pamieci_z_tekstu, metavar='ROZMIAR',
+                        help='Dopasuj procesy, segmenty i etapy do budżetu pamięci '
+                             '(np. 4G, 512M)')
+    parser.add_argument('--wyjscie', metavar='PLIK',
+                        help='Zapisz liczby z --przedzial do pliku '
+                             '(.npy albo tekst, jedna na linię)')
 
     args = parser.parse_args()
 
     # Wyświetl statystyki i zakończ
     if args.statystyki:
-        wyswietl_statystyki_cache()
+        wyswietl_statystyki_cache(args.sprawdz_pi)
+        return
+
+    if args.liczba_pierwszych is not None:
+        wyswietl_liczbe_pierwszych(args.liczba_pierwszych)
+        return
+
+    if args.n_ta_pierwsza is not None:
+        if args.n_ta_pierwsza < 1:
+            print("Błąd: N musi być dodatnie")
+            return
+        wyswietl_n_ta_pierwsza(args.n_ta_pierwsza)
         return
 
     # Określ limit
-    if args.rozszerz:
+    if args.przedzial:
+        limit = args.przedzial[1]
+        if limit < args.przedzial[0]:
+            print("Błąd: Koniec przedziału musi być nie mniejszy niż początek")
+            return
+    elif args.rozszerz:
         limit = args.rozszerz
     elif args.limit:
         limit = args.limit
@@ -584,7 +1991,10 @@ Przykłady użycia:
         return
 
     print(f"=== GENERATOR CACHE LICZB PIERWSZYCH ===")
-    print(f"Cel: generowanie cache do {limit:,}")
+    if args.przedzial:
+        print(f"Cel: liczby pierwsze w przedziale [{args.przedzial[0]:,}, {limit:,}]")
+    else:
+        print(f"Cel: generowanie cache do {limit:,}")
 
     # Wykryj zasoby systemu i oblicz optymalne parametry
     zasoby = wykryj_zasoby_systemu()
@@ -592,30 +2002,84 @@ Przykłady użycia:
 
     # Użyj parametrów użytkownika jeśli podane, inaczej automatyczne
     parametry_finalne = {
-        'algorytm': parametry_auto['algorytm'],
+        'algorytm': args.algorytm or parametry_auto['algorytm'],
         'procesy': args.procesy or parametry_auto['procesy'],
-        'rozmiar_segmentu': args.segment if args.segment != 1000000 else parametry_auto['rozmiar_segmentu'],
+        'backend': args.backend or parametry_auto.get('backend', 'procesy'),
+        'rozmiar_segmentu': args.segment or parametry_auto['rozmiar_segmentu'],
+        'blok_podreczny': (parametry_auto['blok_podreczny'] if args.blok_podreczny is None
+                           else blok_podreczny_dla_bajtow(args.blok_podreczny)),
         'opis': parametry_auto['opis']}
 
+    if args.backend and args.backend != parametry_auto.get('backend', 'procesy'):
+        parametry_finalne['opis'] += f" - backend '{args.backend}' (wybrany ręcznie)"
+    if args.algorytm and args.algorytm != parametry_auto['algorytm']:
+        parametry_finalne['opis'] = f"Sito '{args.algorytm}' (wybrane ręcznie)"
+        if args.algorytm != 'standardowy' and not parametry_finalne['rozmiar_segmentu']:
+            # Automatycznie wybrane sito bitowe nie ma segmentów - dobierz je do L2
+            pamiec_podreczna = zasoby.get('pamiec_podreczna') or DOMYSLNA_PAMIEC_PODRECZNA
+            parametry_finalne['rozmiar_segmentu'] = rozmiar_segmentu_dla_pamieci_podrecznej(
+                limit, parametry_finalne['procesy'], pamiec_podreczna)
+            if args.blok_podreczny is None:
+                parametry_finalne['blok_podreczny'] = \
+                    blok_podreczny_dla_bajtow(pamiec_podreczna['l2'])
+
     # Wyświetl informacje o konfiguracji
-    wyswietl_konfiguracje_systemu(limit, parametry_finalne, zasoby)
+    wyswietl_konfiguracje_systemu(
+        limit, parametry_finalne, zasoby, args.przedzial[0] if args.przedzial else 1)
 
     start_time = time.time()
 
+    if args.przedzial:
+        # Z cache rozpakowywany jest tylko przedział albo liczby bazowe do sqrt(b)
+        cache = otworz_istniejacy_cache()
+        try:
+            pierwsze = pierwsze_w_przedziale(
+                args.przedzial[0], limit, parametry_finalne,
+                cache, cache.max_sprawdzone if cache is not None else 0)
+        finally:
+            if cache is not None:
+                cache.zamknij()
+        wyswietl_przedzial(args.przedzial[0], limit, pierwsze, time.time() - start_time)
+        if args.wyjscie:
+            zapisz_przedzial(pierwsze, args.wyjscie)
+        return
+
     # Sprawdź istniejący cache
-    if not args.nadpisz:
-        pierwsze_istniejace, max_sprawdzone = wczytaj_istniejacy_cache()
+    # Istniejący cache jest otwarty (CachePierwszych) - sito bierze z niego liczby bazowe,
+    # a wynik istniejące liczby blokami, bez rozpakowania całego pliku
+    cache = None if args.nadpisz else otworz_istniejacy_cache()
+    if cache is not None:
+        pierwsze_istniejace, max_sprawdzone = cache, max(cache.max_sprawdzone, 1)
         if max_sprawdzone >= limit:
+            cache.zamknij()
             print(f"Cache już zawiera liczby do {max_sprawdzone:,} (>= {limit:,})")
             print("Użyj --nadpisz aby wymusić regenerację cache")
             wyswietl_statystyki_cache()
             return
-        elif pierwsze_istniejace:
+        elif len(pierwsze_istniejace):
             print(f"Znaleziono istniejący cache z liczbami do {max_sprawdzone:,}")
             print(f"Rozszerzanie cache do {limit:,}...")
     else:
-        pierwsze_istniejace, max_sprawdzone = set(), 1
-        print("Generowanie nowego cache (nadpisywanie istniejącego)...")
+        pierwsze_istniejace, max_sprawdzone = np.array([], dtype=np.uint32), 1
+        if args.nadpisz:
+            print("Generowanie nowego cache (nadpisywanie istniejącego)...")
+
+    if args.limit_pamieci:
+        try:
+            parametry_finalne = zaplanuj_pamiec(
+                limit, args.limit_pamieci, parametry_finalne, len(pierwsze_istniejace), zasoby)
+        except ValueError as e:
+            print(f"Błąd: {e}")
+            return
+        tryb = 'wynik w pamięci' if parametry_finalne['w_pamieci'] else 'etapy zrzucane na dysk'
+        print(f"Plan pamięci: {parametry_finalne['opis']}, "
+              f"segment {parametry_finalne['rozmiar_segmentu']:,}, "
+              f"etap {parametry_finalne['rozmiar_etapu']:,}, {tryb} - "
+              f"szacowany szczyt {parametry_finalne['szczyt_pamieci'] / 1024**2:,.0f} MB")
+
+    # Sito przedziałów (etapy, rozszerzanie) dobiera się do przedziału - nagłówek
+    # dostaje to, które faktycznie przesiewało, a nie parametry automatyczne
+    parametry_uzyte = {}
 
     # Wybierz metodę - teraz z automatyczną optymalizacją
     if args.indywidualne:
@@ -623,19 +2087,44 @@ Przykłady użycia:
         print(f"Używanie wymuszonego sprawdzania indywidualnego...")
         start_range = 1 if args.nadpisz else max_sprawdzone + 1
         pierwsze = sprawdzanie_indywidualne_dla_cache(start_range, limit, pierwsze_istniejace)
-    elif not args.nadpisz and pierwsze_istniejace and max_sprawdzone > limit * 0.7:
-        # Dla rozszerzania małego zakresu użyj metody indywidualnej
-        print("Dla rozszerzania małego zakresu używam metody indywidualnej...")
-        pierwsze = sprawdzanie_indywidualne_dla_cache(
-            max_sprawdzone + 1, limit, pierwsze_istniejace)
+    elif args.wznow or args.budzet_czasu is not None or args.limit_pamieci or (
+            not args.sito and limit - max_sprawdzone > ROZMIAR_ETAPU):
+        # Długi przebieg: etapy zapisywane w punkcie kontrolnym, wznawialne po przerwaniu
+        if os.path.exists(_plik_punktu_kontrolnego()) and not args.wznow:
+            print("Znaleziono punkt kontrolny przerwanego przebiegu - zostanie nadpisany "
+                  "(użyj --wznow, aby go kontynuować)")
+        print(f"Przesiewanie etapami z punktami kontrolnymi ({_plik_punktu_kontrolnego()})...")
+        pierwsze, pokryte = generuj_z_punktami_kontrolnymi(
+            pierwsze_istniejace, max_sprawdzone, limit, parametry_finalne,
+            args.wznow, args.budzet_czasu,
+            parametry_finalne.get('rozmiar_etapu', ROZMIAR_ETAPU),
+            parametry_finalne.get('w_pamieci', True), parametry_uzyte)
+        if pokryte < limit:
+            print(f"\nPrzerwano po {time.time() - start_time:.2f} sekundach - "
+                  f"pokryty zakres: do {pokryte:,}")
+            print(f"Uruchom ponownie z --wznow, aby kontynuować do {limit:,}")
+            if args.limit_pamieci:
+                wyswietl_zuzycie_pamieci(args.limit_pamieci, parametry_finalne['szczyt_pamieci'],
+                                         parametry_finalne['procesy'])
+            return
+    elif (not args.nadpisz and len(pierwsze_istniejace) and not args.sito
+          and (parametry_finalne['algorytm'] != 'standardowy' or max_sprawdzone >= limit // 2)):
+        # Rozszerzanie: przesiej tylko nowy zakres. Wyjątek to sito bitowe, gdy nowy
+        # zakres to ponad połowa limitu - wtedy pełne sito bitowe jest szybsze.
+        print("Rozszerzanie cache sitem segmentowanym tylko dla nowego zakresu...")
+        pierwsze = rozszerz_cache_segmentowo(
+            pierwsze_istniejace, max_sprawdzone, limit, parametry_finalne, parametry_uzyte)
     else:
         # Użyj zoptymalizowanego sita z automatycznymi parametrami
         print(f"Używanie zoptymalizowanego sita z automatycznymi parametrami...")
         pierwsze = sito_eratostenesa_dla_cache(limit, parametry_finalne)
 
+    if cache is not None:
+        cache.zamknij()  # wynik ma już istniejące liczby - zapis podmienia plik cache
+
     # Zapisz cache
     print(f"Zapisywanie cache...")
-    zapisz_cache(pierwsze, limit)
+    zapisz_cache(pierwsze, limit, {**parametry_finalne, **parametry_uzyte})
 
     elapsed = time.time() - start_time
 
@@ -643,6 +2132,11 @@ Przykłady użycia:
     print(f"Czas wykonania: {elapsed:.2f} sekund")
     print(f"Wygenerowano {len(pierwsze):,} liczb pierwszych")
     print(f"Cache zapisany jako: {PLIK_CACHE_PIERWSZYCH}")
+    if args.limit_pamieci:
+        # Przed statystykami - te wczytują cache jeszcze raz
+        wyswietl_zuzycie_pamieci(args.limit_pamieci, parametry_finalne['szczyt_pamieci'],
+                                 parametry_finalne['procesy'])
+    del pierwsze, pierwsze_istniejace
 
     # Wyświetl statystyki końcowe
     wyswietl_statystyki_cache()
@@ -653,5 +2147,7 @@ if __name__ == "__main__":
         main()
     except KeyboardInterrupt:
         print("\nOperacja przerwana przez użytkownika.")
+        if os.path.exists(_plik_punktu_kontrolnego()):
+            print("Ukończone etapy są w punkcie kontrolnym - kontynuuj z --wznow")
     except Exception as e:
         print(f"Błąd: {e}")
@@ -6,7 +6,7 @@ Obsługuje formaty PNG i SVG.
 """
 
 from ulam_spiral import (
-    wczytaj_cache_pierwszych,
+    otworz_cache_pierwszych,
     generuj_wspolrzedne_spirali,
     generuj_svg_spirali_ulama,
     utworz_spirale_ulama,
@@ -91,14 +91,15 @@ Przykłady użycia:
 
         # Wczytaj cache liczb pierwszych
         print("\n[1/3] WCZYTYWANIE CACHE LICZB PIERWSZYCH")
-        pierwsze_cache, max_sprawdzone = wczytaj_cache_pierwszych()
+        cache = otworz_cache_pierwszych()
 
-        if not pierwsze_cache:
+        if cache is None or not len(cache):
             print("  Błąd: Brak cache liczb pierwszych!")
             print("  Uruchom najpierw 'python ulam_spiral.py' lub 'python generuj_cache_pierwszych.py'")
             return
 
-        print(f"  ✓ Cache zawiera {len(pierwsze_cache):,} liczb pierwszych")
+        max_sprawdzone = max(cache.max_sprawdzone, 1)
+        print(f"  ✓ Cache zawiera {len(cache):,} liczb pierwszych")
         print(f"  ✓ Maksymalna sprawdzona liczba: {max_sprawdzone:,}")
 
         # Pobierz parametry
@@ -184,7 +185,7 @@ Przykłady użycia:
         wspolrzedne = generuj_wspolrzedne_spirali(n)
 
         # Przygotuj zbiór liczb pierwszych dla tego zakresu
-        pierwsze_zakres = {p for p in pierwsze_cache if p <= n}
+        pierwsze_zakres = set(cache.pierwsze_miedzy(2, n).tolist())
 
         # Generuj grafikę w odpowiednim formacie
         if args.format == 'png':
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Testy Pierwszości
+Deterministyczny test Millera-Rabina dla liczb poniżej 2^64, wspólny dla
+generatora spirali i generatora cache, także w wersji wsadowej dla tablic NumPy.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+# Małe liczby pierwsze do wstępnego odsiewu - odrzucają większość złożonych
+# liczb tańszym dzieleniem niż potęgowanie modularne
+MALE_PIERWSZE = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47,
+                 53, 59, 61, 67, 71, 73, 79, 83, 89, 97)
+
+# (granica, świadkowie): test Millera-Rabina z tymi świadkami jest deterministyczny
+# dla n < granica (Jaeschke; Sorenson i Webster dla pierwszych 12-13 liczb pierwszych)
+SWIADKOWIE_MILLERA_RABINA: Tuple[Tuple[int, Tuple[int, ...]], ...] = (
+    (2_047, (2,)),
+    (1_373_653, (2, 3)),
+    (25_326_001, (2, 3, 5)),
+    (3_215_031_751, (2, 3, 5, 7)),
+    (2_152_302_898_747, (2, 3, 5, 7, 11)),
+    (3_474_749_660_383, (2, 3, 5, 7, 11, 13)),
+    (341_550_071_728_321, (2, 3, 5, 7, 11, 13, 17)),
+    (3_825_123_056_546_413_051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (318_665_857_834_031_151_167_461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (3_317_044_064_679_887_385_961_981, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)),
+)
+
+# Świadkowie {2, 7, 61} wystarczają dla n < 4 759 123 141 (Jaeschke), czyli dla
+# całych 32 bitów - tam iloczyny reszt mieszczą się w uint64 wprost
+SWIADKOWIE_32_BITOW = (2, 7, 61)
+GRANICA_32_BITOW = 1 << 32
+# Do tej granicy test jest wektorowy (mnożenie modulo kawałkami mnożnika);
+# większe liczby sprawdzane są paczkami tej wielkości przez czy_pierwsza
+GRANICA_WEKTOROWA = 1 << 50
+ROZMIAR_PACZKI_OBIEKTOWEJ = 1 << 16
+# Wywołujący sprawdzają zakresy blokami tej wielkości (pamięć ~ kilkanaście bajtów na liczbę)
+ROZMIAR_BLOKU_WSADOWEGO = 1 << 18
+
+
+def swiadkowie_dla(n: int) -> Tuple[int, ...]:
+    """Najmniejszy zbiór świadków, z którym test jest deterministyczny dla n."""
+    for granica, swiadkowie in SWIADKOWIE_MILLERA_RABINA:
+        if n < granica:
+            return swiadkowie
+    # Powyżej ostatniej granicy test jest tylko silnym testem pseudopierwszości
+    return SWIADKOWIE_MILLERA_RABINA[-1][1]
+
+
+def silny_test_millera_rabina(n: int, swiadkowie: Tuple[int, ...]) -> bool:
+    """Silny test pseudopierwszości nieparzystego n > 2 przy podanych świadkach."""
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+
+    for a in swiadkowie:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def czy_pierwsza(n: int) -> bool:
+    """
+    Sprawdź pierwszość n - deterministycznie dla n < 3.3 * 10^24 (w tym całego zakresu 64 bitów).
+
+    Najpierw dzielenie przez MALE_PIERWSZE (dla n < 97^2 rozstrzyga ono samo),
+    potem test Millera-Rabina ze stałym zbiorem świadków dobranym do wielkości n.
+    """
+    if n < 2:
+        return False
+    for p in MALE_PIERWSZE:
+        if n % p == 0:
+            return n == p
+    if n < MALE_PIERWSZE[-1] ** 2:
+        return True
+    return silny_test_millera_rabina(n, swiadkowie_dla(n))
+
+
+def _mnoz_modulo(a: np.ndarray, b: np.ndarray, n: np.ndarray, bity_kawalka: int) -> np.ndarray:
+    """
+    a*b mod n na pasach uint64 (a, b < n).
+
+    Przy bity_kawalka = 0 iloczyn mieści się w uint64 wprost (n < 2^32). Inaczej b
+    dzielone jest na kawałki po bity_kawalka bitów, od najstarszego: przy
+    n * 2^bity_kawalka <= 2^63 ani przesunięta reszta, ani iloczyn a z kawałkiem,
+    ani ich suma nie przekraczają 64 bitów.
+    """
+    if not bity_kawalka:
+        return a * b % n
+    maska = np.uint64((1 << bity_kawalka) - 1)
+    kawalek = np.uint64(bity_kawalka)
+    najwyzsze = (int(n.max()).bit_length() - 1) // bity_kawalka * bity_kawalka
+    przesuniecia = range(najwyzsze, -1, -bity_kawalka)
+    wynik = np.zeros_like(n)
+    for przesuniecie in przesuniecia:
+        wynik = ((wynik << kawalek) + a * ((b >> np.uint64(przesuniecie)) & maska)) % n
+    return wynik
+
+
+def _potega_modulo(
+        podstawa: int,
+        wykladniki: np.ndarray,
+        moduly: np.ndarray,
+        bity_kawalka: int) -> np.ndarray:
+    """podstawa^wykladniki mod moduly na pasach uint64 (mnożenie jak w _mnoz_modulo)."""
+    wynik = np.ones_like(moduly)
+    potega = np.uint64(podstawa) % moduly
+    wykladniki = wykladniki.copy()
+    while wykladniki.any():
+        nieparzyste = (wykladniki & np.uint64(1)).astype(bool)
+        wynik = np.where(nieparzyste, _mnoz_modulo(wynik, potega, moduly, bity_kawalka), wynik)
+        potega = _mnoz_modulo(potega, potega, moduly, bity_kawalka)
+        wykladniki >>= np.uint64(1)
+    return wynik
+
+
+def _miller_rabin_wektorowo(n: np.ndarray) -> np.ndarray:
+    """
+    Test Millera-Rabina dla nieparzystych 97^2 <= n < GRANICA_WEKTOROWA (uint64)
+    bez małych dzielników.
+    """
+    if not len(n):
+        return np.zeros(0, dtype=bool)
+    najwieksza = int(n.max())
+    if najwieksza < GRANICA_32_BITOW:
+        swiadkowie, bity_kawalka = SWIADKOWIE_32_BITOW, 0
+    else:
+        swiadkowie, bity_kawalka = swiadkowie_dla(najwieksza), 63 - najwieksza.bit_length()
+
+    d = n - np.uint64(1)
+    s = np.zeros(len(n), dtype=np.int64)
+    while True:
+        parzyste = (d & np.uint64(1)) == 0
+        if not parzyste.any():
+            break
+        d[parzyste] >>= np.uint64(1)
+        s[parzyste] += 1
+
+    n_minus_1 = n - np.uint64(1)
+    pierwsze = np.ones(len(n), dtype=bool)
+    for a in swiadkowie:
+        x = _potega_modulo(a, d, n, bity_kawalka)
+        przechodzi = (x == 1) | (x == n_minus_1)
+        for r in range(1, int(s.max())):
+            x = _mnoz_modulo(x, x, n, bity_kawalka)
+            przechodzi |= (x == n_minus_1) & (r < s)
+        pierwsze &= przechodzi
+    return pierwsze
+
+
+def czy_pierwsza_wsadowo(liczby: np.ndarray) -> np.ndarray:
+    """
+    Sprawdź pierwszość wszystkich liczb tablicy naraz - zwraca tablicę bool tego samego kształtu.
+
+    Dzielenie przez MALE_PIERWSZE odbywa się na całej tablicy, a ocalałe liczby
+    poniżej GRANICA_WEKTOROWA przechodzą wektorowy test Millera-Rabina na pasach
+    uint64 - osobno te poniżej 2^32 i większe, bo większe wymagają mnożenia
+    kawałkami. Pozostałe (oraz tablice obiektowe z liczbami spoza int64/uint64)
+    sprawdza czy_pierwsza paczkami po ROZMIAR_PACZKI_OBIEKTOWEJ.
+    """
+    liczby = np.asarray(liczby)
+    ksztalt = liczby.shape
+    liczby = liczby.ravel()
+    wynik = np.zeros(len(liczby), dtype=bool)
+
+    if liczby.dtype.kind not in 'iu':
+        indeksy = np.arange(len(liczby))
+        wartosci = liczby
+    else:
+        dodatnie = liczby >= 2 if liczby.dtype.kind == 'i' else liczby >= np.uint64(2)
+        indeksy = np.flatnonzero(dodatnie)
+        wartosci = liczby[indeksy].astype(np.uint64)
+
+        # Wstępny odsiew - reszta 0 oznacza liczbę złożoną, chyba że to sam dzielnik
+        kandydaci = np.ones(len(wartosci), dtype=bool)
+        for p in MALE_PIERWSZE:
+            podzielne = wartosci % np.uint64(p) == 0
+            wynik[indeksy[podzielne & (wartosci == np.uint64(p))]] = True
+            kandydaci &= ~podzielne
+        indeksy, wartosci = indeksy[kandydaci], wartosci[kandydaci]
+
+        # Bez dzielnika do 97 liczby poniżej 97^2 są pierwsze
+        male = wartosci < np.uint64(MALE_PIERWSZE[-1] ** 2)
+        wynik[indeksy[male]] = True
+        indeksy, wartosci = indeksy[~male], wartosci[~male]
+
+        for granica in (GRANICA_32_BITOW, GRANICA_WEKTOROWA):
+            wektorowe = wartosci < np.uint64(granica)
+            wynik[indeksy[wektorowe]] = _miller_rabin_wektorowo(wartosci[wektorowe])
+            indeksy, wartosci = indeksy[~wektorowe], wartosci[~wektorowe]
+
+    for poczatek in range(0, len(indeksy), ROZMIAR_PACZKI_OBIEKTOWEJ):
+        paczka = wartosci[poczatek:poczatek + ROZMIAR_PACZKI_OBIEKTOWEJ].tolist()
+        wynik[indeksy[poczatek:poczatek + ROZMIAR_PACZKI_OBIEKTOWEJ]] = \
+            [czy_pierwsza(int(n)) for n in paczka]
+
+    return wynik.reshape(ksztalt)
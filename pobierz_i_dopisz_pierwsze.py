@@ -6,7 +6,6 @@ Program pobiera zbiory liczb pierwszych z t5k.org i dopisuje je do istniejącego
 
 import argparse
 import os
-import pickle
 import re
 import requests
 import sys
@@ -14,8 +13,11 @@ import time
 import zipfile
 from typing import Set, Dict, Tuple
 
-# Nazwa domyślnego pliku cache
-PLIK_CACHE_PIERWSZYCH = "pierwsze_cache.pkl"
+import numpy as np
+
+from format_cache import PLIK_CACHE_PIERWSZYCH, jako_posortowana_tablica, wczytaj_dane_cache, \
+    zapisz_pierwsze, znajdz_plik_cache
+
 KATALOG_POBRANYCH = "downloaded_primes"
 BASE_URL = "https://t5k.org/lists/small/millions/"
 
@@ -59,41 +61,35 @@ def pobierz_plik(url: str, nazwa_pliku: str) -> bool:
         return False
 
 
-def wczytaj_cache(nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH) -> Tuple[Set[int], int, Dict]:
-    """Wczytaj istniejący cache liczb pierwszych."""
+def wczytaj_cache(nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH) -> Tuple[np.ndarray, int, Dict]:
+    """Wczytaj istniejący cache liczb pierwszych (jako posortowaną tablicę)."""
+    pusty = np.array([], dtype=np.int64)
+    nazwa_pliku = znajdz_plik_cache(nazwa_pliku)
     if not os.path.exists(nazwa_pliku):
         print(f"Cache '{nazwa_pliku}' nie istnieje, utworzę nowy")
-        return set(), 0, {'pierwsze': set(), 'max_sprawdzone': 0}
+        return pusty, 0, {'pierwsze': pusty, 'max_sprawdzone': 0}
 
     try:
-        with open(nazwa_pliku, 'rb') as f:
-            dane = pickle.load(f)
+        dane = wczytaj_dane_cache(nazwa_pliku)
 
-        pierwsze = dane.get('pierwsze', set())
+        # Starsze pliki cache przechowują zbiór - sortujemy go raz przy wczytaniu
+        pierwsze = jako_posortowana_tablica(dane.get('pierwsze', pusty))
         max_sprawdzone = dane.get('max_sprawdzone', 0)
 
-        if not isinstance(pierwsze, set):
-            pierwsze = set(pierwsze) if pierwsze else set()
-
         return pierwsze, max_sprawdzone, dane
 
     except Exception as e:
         print(f"Błąd podczas wczytywania cache: {e}")
-        return set(), 0, {'pierwsze': set(), 'max_sprawdzone': 0}
+        return pusty, 0, {'pierwsze': pusty, 'max_sprawdzone': 0}
 
 
-def zapisz_cache(pierwsze: Set[int], max_sprawdzone: int, nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH):
-    """Zapisz zaktualizowany cache do pliku."""
-    dane = {
-        'pierwsze': pierwsze,
-        'max_sprawdzone': max_sprawdzone,
-        'utworzony': time.strftime('%Y-%m-%d %H:%M:%S'),
-        'wersja': '2.0'
-    }
-
+def zapisz_cache(
+        pierwsze: np.ndarray,
+        max_sprawdzone: int,
+        nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH):
+    """Zapisz zaktualizowany cache (posortowana tablica) do pliku binarnego."""
     try:
-        with open(nazwa_pliku, 'wb') as f:
-            pickle.dump(dane, f)
+        zapisz_pierwsze(pierwsze, max_sprawdzone, nazwa_pliku)
         print(f"Cache zapisano do: {nazwa_pliku}")
         return True
     except Exception as e:
@@ -176,7 +172,7 @@ Przykłady użycia:
   %(prog)s --pliki 1-5           # Pobierz pliki 1-5
   %(prog)s --pliki 1,3,5         # Pobierz pliki 1, 3 i 5
   %(prog)s --bez-aktualizacji     # Tylko pobierz, nie aktualizuj cache
-  %(prog)s --cache moj_cache.pkl # Użyj innego pliku cache
+  %(prog)s --cache moj_cache.bin # Użyj innego pliku cache
         """
     )
 
@@ -221,7 +217,7 @@ Przykłady użycia:
         print(f"Cache zawiera: {len(pierwsze_cache):,} liczb pierwszych")
         print(f"Maksymalna sprawdzona liczba: {max_sprawdzone:,}")
     else:
-        pierwsze_cache = set()
+        pierwsze_cache = np.array([], dtype=np.int64)
 
     # Pobierz i przetworz pliki
     wszystkie_nowe_pierwsze = set()
@@ -260,8 +256,10 @@ Przykłady użycia:
 
     # Podsumowanie pobranych danych
     if wszystkie_nowe_pierwsze:
-        min_nowa = min(wszystkie_nowe_pierwsze)
-        max_nowa = max(wszystkie_nowe_pierwsze)
+        # Jednorazowe sortowanie pobranych liczb - dalej operujemy na tablicach
+        wszystkie_nowe_pierwsze = np.array(sorted(wszystkie_nowe_pierwsze), dtype=np.int64)
+        min_nowa = int(wszystkie_nowe_pierwsze[0])
+        max_nowa = int(wszystkie_nowe_pierwsze[-1])
 
         print(f"\n=== PODSUMOWANIE POBRANYCH DANYCH ===")
         print(f"Pobrano łącznie: {len(wszystkie_nowe_pierwsze):,} unikalnych liczb pierwszych")
@@ -272,16 +270,17 @@ Przykłady użycia:
             print(f"\nAktualizowanie cache...")
 
             # Znajdź nowe liczby pierwsze (nie ma ich w cache)
-            nowe_pierwsze = wszystkie_nowe_pierwsze - pierwsze_cache
+            nowe_pierwsze = np.setdiff1d(wszystkie_nowe_pierwsze, pierwsze_cache,
+                                         assume_unique=True)
             duplikaty = len(wszystkie_nowe_pierwsze) - len(nowe_pierwsze)
 
-            if nowe_pierwsze:
+            if len(nowe_pierwsze):
                 print(f"Nowych liczb pierwszych do dodania: {len(nowe_pierwsze):,}")
                 if duplikaty > 0:
                     print(f"Duplikatów (już w cache): {duplikaty:,}")
 
                 # Dodaj nowe liczby do cache
-                pierwsze_cache.update(nowe_pierwsze)
+                pierwsze_cache = np.union1d(pierwsze_cache, nowe_pierwsze)
                 nowy_max = max(max_sprawdzone, max_nowa)
 
                 # Zapisz zaktualizowany cache
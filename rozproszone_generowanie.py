@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Rozproszone Generowanie Cache Liczb Pierwszych
+Koordynator dzieli zakres [max_sprawdzone+1, limit] na shardy i rozdaje je
+workerom (na tej samej lub innych maszynach) przez TCP. Worker przesiewa shard
+i zapisuje go do pliku .npy we wspólnym katalogu; koordynator scala pliki w cache.
+Shard workera, który się rozłączył lub przekroczył limit czasu, trafia do innego.
+Połączenia uwierzytelnia losowy klucz koordynatora (wiadomości to obiekty pickle).
+"""
+
+import argparse
+import os
+import queue
+import secrets
+import socket
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError, Process
+from multiprocessing.connection import Listener, Client, Connection
+from typing import Callable, Dict, Iterator, List, Set, Tuple
+
+import numpy as np
+
+import generuj_cache_pierwszych as gcf
+
+
+# Domyślny adres koordynatora. Wiadomości to obiekty pickle, więc klucz
+# uwierzytelniania nie ma wartości domyślnej - bez --klucz koordynator losuje go
+# (nowy_klucz) i wypisuje, a worker bez klucza się nie uruchomi
+DOMYSLNY_ADRES = ('localhost', 6000)
+# Po tylu sekundach bez żadnego połączonego workera koordynator kończy z błędem
+DOMYSLNY_LIMIT_BEZ_WORKEROW = 600.0
+# Długość sharda (w liczbach) - granice są wielokrotnościami tej wartości
+ROZMIAR_SHARDU = 10**9
+# Workery uruchomione obok siebie na jednej maszynie przesiewają jednym procesem
+PARAMETRY_LOKALNEGO_WORKERA = {'algorytm': 'segmentowany', 'procesy': 1, 'rozmiar_segmentu': 0}
+# Co ile sekund wątek workera sprawdza, czy wszystkie shardy są gotowe
+ODSTEP_SPRAWDZANIA = 0.1
+# Tyle sekund lokalne workery mają na zakończenie po ostatnim shardzie, zanim zostaną zatrzymane
+CZAS_ZAKONCZENIA_WORKEROW = 10.0
+
+
+def parsuj_adres(tekst: str) -> Tuple[str, int]:
+    """Zamień 'host:port' na krotkę adresu (sam port oznacza localhost)."""
+    host, _, port = tekst.rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def nowy_klucz() -> bytes:
+    """Losowy klucz uwierzytelniania (128 bitów, szesnastkowo - do przekazania przez --klucz)."""
+    return secrets.token_hex(16).encode()
+
+
+def _wymagaj_klucza(klucz: bytes):
+    """Połączenia bez klucza wykonywałyby pickle od każdego, kto dosięgnie portu."""
+    if not klucz:
+        raise ValueError("Wymagany klucz uwierzytelniania (--klucz) - wiadomości to obiekty pickle")
+
+
+def podziel_na_shardy(
+        start: int,
+        limit: int,
+        rozmiar_shardu: int = ROZMIAR_SHARDU) -> List[Tuple[int, int]]:
+    """Podziel [start, limit] na shardy o granicach będących wielokrotnościami rozmiar_shardu."""
+    shardy = []
+    while start <= limit:
+        koniec = min((start // rozmiar_shardu + 1) * rozmiar_shardu, limit)
+        shardy.append((start, koniec))
+        start = koniec + 1
+    return shardy
+
+
+def nazwa_pliku_shardu(start: int, koniec: int) -> str:
+    """Nazwa pliku sharda we wspólnym katalogu."""
+    return f"shard_{start}_{koniec}.npy"
+
+
+def _obsluz_workera(
+        polaczenie: Connection,
+        zadania: queue.Queue,
+        wyniki: Dict[int, Tuple[str, int]],
+        shardy: List[Tuple[int, int]],
+        katalog: str,
+        gotowe: threading.Event,
+        blokada: threading.Lock,
+        polaczeni: Set[int],
+        limit_czasu_shardu: float = None):
+    """
+    Rozdawaj shardy jednemu workerowi, aż wszystkie będą gotowe.
+
+    Zerwane połączenie, przekroczony limit czasu, błędna wiadomość albo brak
+    zgłoszonego pliku zwracają bieżący shard do kolejki - dostanie go inny worker.
+    Połączenie (jego id) jest w polaczeni, dopóki worker jest obsługiwany.
+    """
+    numer = None
+    try:
+        nazwa = polaczenie.recv()[1]
+        with blokada:
+            polaczeni.add(id(polaczenie))
+        print(f"Worker {nazwa} połączony")
+        while not gotowe.is_set():
+            try:
+                numer = zadania.get(timeout=ODSTEP_SPRAWDZANIA)
+            except queue.Empty:
+                continue
+            if numer in wyniki:
+                numer = None
+                continue
+
+            start, koniec = shardy[numer]
+            polaczenie.send(('shard', numer, start, koniec))
+            if limit_czasu_shardu is not None and not polaczenie.poll(limit_czasu_shardu):
+                raise TimeoutError(f"shard {start:,}-{koniec:,} przekroczył limit czasu")
+            _, numer_gotowy, plik, liczba = polaczenie.recv()
+            if numer_gotowy != numer or not os.path.exists(os.path.join(katalog, plik)):
+                raise OSError(f"brak pliku sharda {start:,}-{koniec:,}")
+
+            with blokada:
+                wyniki.setdefault(numer, (plik, liczba))
+                print(f"Shard {start:,}-{koniec:,} gotowy: {liczba:,} liczb pierwszych "
+                      f"({len(wyniki)}/{len(shardy)}, worker {nazwa})")
+                if len(wyniki) == len(shardy):
+                    gotowe.set()
+            numer = None
+        polaczenie.send(('koniec',))
+    except (EOFError, OSError, TimeoutError, ValueError, TypeError, IndexError) as e:
+        if numer is not None:
+            print(f"Worker utracony ({e}) - shard {shardy[numer][0]:,}-{shardy[numer][1]:,} "
+                  f"wraca do kolejki")
+            zadania.put(numer)
+    finally:
+        with blokada:
+            polaczeni.discard(id(polaczenie))
+        polaczenie.close()
+
+
+def _pliki_shardow(
+        katalog: str,
+        shardy: List[Tuple[int, int]],
+        wyniki: Dict[int, Tuple[str, int]]) -> Iterator[np.ndarray]:
+    """Kolejne shardy (mapowane pliki .npy) w kolejności zakresów - po jednym przy scalaniu."""
+    for numer, (start, koniec) in enumerate(shardy):
+        plik, liczba = wyniki[numer]
+        pierwsze = np.load(os.path.join(katalog, plik), mmap_mode='r')
+        if len(pierwsze) != liczba:
+            raise ValueError(f"Shard {start:,}-{koniec:,}: {len(pierwsze):,} liczb "
+                             f"zamiast {liczba:,}")
+        yield pierwsze
+
+
+def scal_shardy(
+        katalog: str,
+        shardy: List[Tuple[int, int]],
+        wyniki: Dict[int, Tuple[str, int]],
+        pierwsze_istniejace,
+        limit: int) -> np.ndarray:
+    """
+    Scal pliki shardów (w kolejności zakresów) z istniejącymi liczbami poniżej pierwszego
+    sharda w jednej alokacji - cache (tablica albo CachePierwszych) i shardy przechodzą blokami.
+    """
+    liczba_nowych = sum(wyniki[numer][1] for numer in range(len(shardy)))
+    return gcf._zloz_wynik(pierwsze_istniejace, shardy[0][0],
+                           _pliki_shardow(katalog, shardy, wyniki), liczba_nowych,
+                           gcf.dtype_dla_limitu(limit))
+
+
+def koordynuj(
+        limit: int,
+        katalog: str,
+        adres: Tuple[str, int] = DOMYSLNY_ADRES,
+        klucz: bytes = None,
+        rozmiar_shardu: int = ROZMIAR_SHARDU,
+        pierwsze_istniejace=None,
+        max_sprawdzone: int = 1,
+        limit_czasu_shardu: float = None,
+        po_starcie: Callable[[Tuple[str, int]], None] = None,
+        limit_bez_workerow: float = DOMYSLNY_LIMIT_BEZ_WORKEROW) -> np.ndarray:
+    """
+    Wygeneruj liczby pierwsze do limit shardami przesiewanymi przez workery.
+
+    Koordynator nasłuchuje na adres (port 0 - dowolny wolny) i każdemu połączonemu
+    workerowi (z tym samym kluczem) w osobnym wątku przydziela kolejne shardy
+    [max_sprawdzone+1, limit]. po_starcie dostaje faktyczny adres nasłuchu (np. do
+    uruchomienia lokalnych workerów). Gdy przez limit_bez_workerow sekund żaden
+    worker nie jest połączony, a shardy czekają, zgłasza TimeoutError zamiast czekać
+    bez końca. Zwraca posortowaną tablicę z istniejącymi liczbami (tablica albo otwarty
+    CachePierwszych - bez rozpakowania całości) i wszystkimi shardami.
+    """
+    _wymagaj_klucza(klucz)
+    if pierwsze_istniejace is None:
+        pierwsze_istniejace = np.array([], dtype=np.uint32)
+    os.makedirs(katalog, exist_ok=True)
+
+    shardy = podziel_na_shardy(max(max_sprawdzone + 1, 2), limit, rozmiar_shardu)
+    if not shardy:
+        return gcf._istniejace_miedzy(pierwsze_istniejace, 0, limit)
+
+    zadania = queue.Queue()
+    for numer in range(len(shardy)):
+        zadania.put(numer)
+    wyniki = {}
+    gotowe = threading.Event()
+    blokada = threading.Lock()
+    polaczeni = set()
+
+    listener = Listener(adres, authkey=klucz)
+    print(f"Koordynator nasłuchuje na {listener.address[0]}:{listener.address[1]} - "
+          f"{len(shardy)} shardów do {limit:,}")
+
+    def przyjmuj_polaczenia():
+        while True:
+            try:
+                polaczenie = listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError):
+                continue  # klient z innym kluczem albo zerwany w trakcie uwierzytelniania
+            except OSError:
+                return  # listener zamknięty po ukończeniu
+            threading.Thread(
+                target=_obsluz_workera,
+                args=(polaczenie, zadania, wyniki, shardy, katalog, gotowe, blokada, polaczeni,
+                      limit_czasu_shardu),
+                daemon=True).start()
+
+    threading.Thread(target=przyjmuj_polaczenia, daemon=True).start()
+    try:
+        if po_starcie:
+            po_starcie(listener.address)
+        bez_workerow_od = time.time()
+        while not gotowe.wait(ODSTEP_SPRAWDZANIA):
+            with blokada:
+                if polaczeni:
+                    bez_workerow_od = time.time()
+                    continue
+            # Shardy utraconych workerów są już z powrotem w kolejce - brakuje tylko chętnych
+            if limit_bez_workerow is not None \
+                    and time.time() - bez_workerow_od > limit_bez_workerow:
+                raise TimeoutError(f"Brak workerów od {limit_bez_workerow:.0f} s - nieprzesiane "
+                                   f"shardy: {len(shardy) - len(wyniki)}/{len(shardy)}")
+    finally:
+        listener.close()
+
+    print("Scalanie shardów...")
+    pierwsze = scal_shardy(katalog, shardy, wyniki, pierwsze_istniejace, limit)
+    for plik, _ in wyniki.values():
+        os.remove(os.path.join(katalog, plik))
+    return pierwsze
+
+
+def uruchom_workera(
+        adres: Tuple[str, int],
+        katalog: str,
+        klucz: bytes = None,
+        parametry: Dict[str, int] = None,
+        nazwa: str = None) -> int:
+    """
+    Przesiewaj shardy od koordynatora pod adres, aż ten odeśle 'koniec'.
+
+    Każdy shard przesiewa pierwsze_w_przedziale (parametry None - dobrane do
+    zasobów tej maszyny) i zapisuje do katalog, widzianego przez koordynatora.
+    Zwraca liczbę przesianych shardów.
+    """
+    _wymagaj_klucza(klucz)
+    nazwa = nazwa or f"{socket.gethostname()}:{os.getpid()}"
+    os.makedirs(katalog, exist_ok=True)
+    przesiane = 0
+    with Client(adres, authkey=klucz) as polaczenie:
+        polaczenie.send(('worker', nazwa))
+        while True:
+            wiadomosc = polaczenie.recv()
+            if wiadomosc[0] == 'koniec':
+                return przesiane
+            _, numer, start, koniec = wiadomosc
+            pierwsze = gcf.pierwsze_w_przedziale(start, koniec, parametry)
+            plik = nazwa_pliku_shardu(start, koniec)
+            # Zapis przez plik tymczasowy - koordynator nie zobaczy niepełnego sharda
+            tymczasowy = os.path.join(katalog, f".{plik}.{os.getpid()}.tmp")
+            with open(tymczasowy, 'wb') as f:
+                np.save(f, pierwsze)
+            os.replace(tymczasowy, os.path.join(katalog, plik))
+            polaczenie.send(('gotowe', numer, plik, len(pierwsze)))
+            przesiane += 1
+
+
+def _uruchom_lokalne_workery(
+        liczba: int,
+        katalog: str,
+        klucz: bytes) -> Tuple[Callable, List[Process]]:
+    """
+    Callback po_starcie uruchamiający liczba procesów workerów na tej maszynie i lista
+    tych procesów (wypełniana przy starcie) - do zakończenia ich przez wywołującego.
+    """
+    procesy = []
+
+    def po_starcie(adres):
+        for i in range(liczba):
+            proces = Process(target=uruchom_workera,
+                             args=(adres, katalog, klucz, PARAMETRY_LOKALNEGO_WORKERA,
+                                   f"lokalny-{i}"))
+            proces.start()
+            procesy.append(proces)
+
+    return po_starcie, procesy
+
+
+def _zakoncz_lokalne_workery(procesy: List[Process], czas: float = 0.0):
+    """Poczekaj do czas sekund na zakończenie workerów, a pozostałe zatrzymaj (terminate)."""
+    koniec = time.time() + czas
+    for proces in procesy:
+        proces.join(max(koniec - time.time(), 0))
+        if proces.is_alive():
+            proces.terminate()
+            proces.join()
+
+
+def main():
+    """Główna funkcja generowania rozproszonego."""
+    parser = argparse.ArgumentParser(
+        description="Rozproszone generowanie cache liczb pierwszych (koordynator/worker przez TCP)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Przykłady użycia:
+  %(prog)s --koordynator 10000000000 --adres 0.0.0.0:6000 --katalog /wspolny/shardy  # Wypisze klucz
+  %(prog)s --worker --adres koordynator:6000 --klucz KLUCZ --katalog /wspolny/shardy
+  %(prog)s --koordynator 1000000000 --lokalne-workery 4 --katalog shardy  # Jedna maszyna
+        """
+    )
+    parser.add_argument('--koordynator', type=int, metavar='LIMIT',
+                        help='Uruchom koordynatora generującego cache do LIMIT')
+    parser.add_argument('--worker', action='store_true',
+                        help='Uruchom workera przesiewającego shardy od koordynatora')
+    parser.add_argument('--adres', default=f"{DOMYSLNY_ADRES[0]}:{DOMYSLNY_ADRES[1]}",
+                        help='Adres koordynatora host:port (domyślnie: %(default)s)')
+    parser.add_argument('--katalog', default='shardy',
+                        help='Wspólny katalog plików shardów (domyślnie: %(default)s)')
+    parser.add_argument('--klucz',
+                        help='Klucz uwierzytelniania połączeń, taki sam dla wszystkich węzłów '
+                             '(koordynator bez niego losuje i wypisuje nowy; worker go wymaga)')
+    parser.add_argument('--shard', type=int, default=ROZMIAR_SHARDU,
+                        help='Długość sharda w liczbach (domyślnie: %(default)s)')
+    parser.add_argument('--limit-czasu-shardu', type=float, metavar='SEKUNDY',
+                        help='Przydziel shard innemu workerowi, jeśli ten nie odpowie w tym czasie')
+    parser.add_argument('--limit-bez-workerow', type=float, default=DOMYSLNY_LIMIT_BEZ_WORKEROW,
+                        metavar='SEKUNDY',
+                        help='Zakończ z błędem, jeśli tak długo żaden worker nie jest połączony '
+                             '(domyślnie: %(default)s)')
+    parser.add_argument('--lokalne-workery', type=int, default=0, metavar='N',
+                        help='Uruchom N workerów na tej maszynie (test bez innych hostów)')
+    parser.add_argument('--nadpisz', action='store_true',
+                        help='Generuj od początku zamiast rozszerzać istniejący cache')
+    args = parser.parse_args()
+
+    adres = parsuj_adres(args.adres)
+
+    if args.worker:
+        if not args.klucz:
+            parser.error("--worker wymaga --klucz (wypisanego przez koordynatora)")
+        przesiane = uruchom_workera(adres, args.katalog, args.klucz.encode())
+        print(f"Worker zakończony - przesiano {przesiane} shardów")
+        return
+    if args.koordynator is None:
+        parser.print_help()
+        return
+    if args.klucz:
+        klucz = args.klucz.encode()
+    else:
+        klucz = nowy_klucz()
+        print(f"Klucz workerów (podaj go jako --klucz): {klucz.decode()}")
+
+    # Istniejący cache jest otwarty (CachePierwszych) - scalanie bierze go blokami
+    cache = None if args.nadpisz else gcf.otworz_istniejacy_cache()
+    if cache is not None:
+        pierwsze_istniejace, max_sprawdzone = cache, max(cache.max_sprawdzone, 1)
+        if max_sprawdzone >= args.koordynator:
+            cache.zamknij()
+            print(f"Cache już zawiera liczby do {max_sprawdzone:,} (>= {args.koordynator:,})")
+            return
+    else:
+        pierwsze_istniejace, max_sprawdzone = np.array([], dtype=np.uint32), 1
+
+    start_time = time.time()
+    po_starcie, procesy = _uruchom_lokalne_workery(args.lokalne_workery, args.katalog, klucz) \
+        if args.lokalne_workery else (None, [])
+    try:
+        pierwsze = koordynuj(
+            args.koordynator, args.katalog, adres, klucz, args.shard,
+            pierwsze_istniejace, max_sprawdzone, args.limit_czasu_shardu, po_starcie,
+            args.limit_bez_workerow)
+        # Po ostatnim shardzie workery dostały 'koniec' - zwykle kończą od razu
+        _zakoncz_lokalne_workery(procesy, CZAS_ZAKONCZENIA_WORKEROW)
+    except TimeoutError as e:
+        print(f"\nBłąd: {e}")
+        sys.exit(1)
+    finally:
+        # Błąd lub Ctrl-C - workery czekające na koordynatora są zatrzymywane
+        _zakoncz_lokalne_workery(procesy)
+        if cache is not None:
+            cache.zamknij()  # wynik ma już istniejące liczby - zapis podmienia plik cache
+    gcf.zapisz_cache(pierwsze, args.koordynator)
+    print(f"\nWygenerowano {len(pierwsze):,} liczb pierwszych "
+          f"w {time.time() - start_time:.2f} sekund")
+    print(f"Cache zapisany jako: {gcf.PLIK_CACHE_PIERWSZYCH}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nOperacja przerwana przez użytkownika.")
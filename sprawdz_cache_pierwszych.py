@@ -9,14 +9,17 @@ i czy nie brakuje żadnych liczb pierwszych w zakresie.
 import argparse
 import math
 import os
-import pickle
 import sys
 import time
-from typing import Set, List, Dict, Tuple
+from typing import List, Dict, Iterator, Tuple
 
+import numpy as np
 
-# Nazwa pliku cache (taka sama jak w głównych skryptach)
-PLIK_CACHE_PIERWSZYCH = "pierwsze_cache.pkl"
+from pierwszosc import czy_pierwsza_wsadowo, ROZMIAR_BLOKU_WSADOWEGO
+from funkcje_pierwszych import liczba_pierwszych_do
+from format_cache import PLIK_CACHE_PIERWSZYCH, ROZMIAR_BLOKU_SUMY, CachePierwszych, \
+    czy_plik_binarny, statystyki_cache, jako_posortowana_tablica, sprawdz_sumy_kontrolne, \
+    wczytaj_dane_cache, wczytaj_naglowek, znajdz_plik_cache
 
 
 def wyswietl_postep(aktualny, calkowity, prefix="Postęp", dlugosc=50):
@@ -31,27 +34,10 @@ def wyswietl_postep(aktualny, calkowity, prefix="Postęp", dlugosc=50):
         sys.stdout.flush()
 
 
-def czy_pierwsza_weryfikacja(n: int) -> bool:
-    """Bardzo dokładna weryfikacja pierwszości - używa trial division."""
-    if n < 2:
-        return False
-    if n == 2:
-        return True
-    if n % 2 == 0:
-        return False
-
-    # Sprawdź wszystkie nieparzyste dzielniki do sqrt(n)
-    sqrt_n = int(math.sqrt(n)) + 1
-    for i in range(3, sqrt_n, 2):
-        if n % i == 0:
-            return False
-    return True
-
-
-def generuj_liczby_pierwsze_referencyj(limit: int) -> Set[int]:
+def generuj_liczby_pierwsze_referencyj(limit: int) -> np.ndarray:
     """Generuje liczby pierwsze metodą referencyjną (sito Eratostenesa)."""
     if limit < 2:
-        return set()
+        return np.array([], dtype=np.int64)
 
     print(f"Generowanie liczb pierwszych referencyjnych do {limit:,}...")
 
@@ -70,76 +56,97 @@ def generuj_liczby_pierwsze_referencyj(limit: int) -> Set[int]:
     if sqrt_limit > 2:
         wyswietl_postep(sqrt_limit, sqrt_limit, "Generowanie ref.")
 
-    # Zbierz liczby pierwsze
-    pierwsze_ref = set()
-    for i in range(2, limit + 1):
-        if i % max(1, limit // 100) == 0 or i == limit:
-            wyswietl_postep(i, limit, "Zbieranie ref.")
-        if sito[i]:
-            pierwsze_ref.add(i)
+    # Zbierz liczby pierwsze (rosnąco)
+    pierwsze_ref = np.flatnonzero(np.array(sito, dtype=bool))
 
     print(f"Wygenerowano {len(pierwsze_ref):,} liczb pierwszych referencyjnych")
     return pierwsze_ref
 
 
 def wczytaj_cache_do_sprawdzenia(
-        nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH) -> Tuple[Set[int], int, Dict]:
-    """Wczytaj cache liczb pierwszych z pliku."""
+        nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH) -> Tuple[np.ndarray, int, Dict]:
+    """
+    Otwórz cache liczb pierwszych do sprawdzenia - (liczby, max_sprawdzone, dane).
+
+    Plik binarny jest otwierany jako CachePierwszych - sprawdzanie czyta liczby
+    blokami i przedziałami, bez rozpakowania bitmapy czy odstępów do jednej
+    tablicy. Stary pickle jest wczytywany jako posortowana tablica.
+    """
+    nazwa_pliku = znajdz_plik_cache(nazwa_pliku)
     if not os.path.exists(nazwa_pliku):
         raise FileNotFoundError(f"Plik cache '{nazwa_pliku}' nie istnieje")
 
     try:
-        with open(nazwa_pliku, 'rb') as f:
-            dane = pickle.load(f)
+        if czy_plik_binarny(nazwa_pliku):
+            naglowek = wczytaj_naglowek(nazwa_pliku)
+            cache = CachePierwszych(nazwa_pliku)
+            dane = {'pierwsze': cache, 'max_sprawdzone': cache.max_sprawdzone,
+                    'format': f"binarny v{naglowek['wersja']}, {naglowek['kodowanie']}"}
+            return cache, cache.max_sprawdzone, dane
 
-        if not isinstance(dane, dict):
-            raise ValueError("Cache nie zawiera słownika danych")
+        dane = wczytaj_dane_cache(nazwa_pliku)
 
-        pierwsze = dane.get('pierwsze', set())
+        pierwsze = jako_posortowana_tablica(dane.get('pierwsze', []))
         max_sprawdzone = dane.get('max_sprawdzone', 0)
 
-        if not isinstance(pierwsze, set):
-            pierwsze = set(pierwsze) if pierwsze else set()
-
         return pierwsze, max_sprawdzone, dane
 
     except Exception as e:
         raise Exception(f"Błąd podczas wczytywania cache: {e}")
 
 
+def bloki_do_sprawdzenia(pierwsze, max_limit: int = None) -> Iterator[np.ndarray]:
+    """
+    Liczby cache <= max_limit kolejnymi blokami po najwyżej ROZMIAR_BLOKU_WSADOWEGO.
+
+    pierwsze to tablica (zbiór) albo CachePierwszych - ten jest czytany przez
+    bloki(), więc w pamięci jest naraz tylko jeden rozpakowany blok.
+    """
+    if isinstance(pierwsze, CachePierwszych):
+        bloki = pierwsze.bloki()
+    else:
+        bloki = [jako_posortowana_tablica(pierwsze)]
+    for blok in bloki:
+        if max_limit and len(blok) and blok[-1] > max_limit:
+            blok = blok[:np.searchsorted(blok, max_limit, side='right')]
+        for blok_start in range(0, len(blok), ROZMIAR_BLOKU_WSADOWEGO):
+            yield blok[blok_start:blok_start + ROZMIAR_BLOKU_WSADOWEGO]
+        if max_limit and len(blok) and blok[-1] >= max_limit:
+            return
+
+
 def sprawdz_poprawnosc_pierwszosci(
-        pierwsze: Set[int], max_limit: int = None) -> Dict[str, List[int]]:
-    """Sprawdź czy wszystkie liczby w zbiorze są rzeczywiście pierwsze."""
+        pierwsze: np.ndarray, max_limit: int = None) -> Dict[str, List[int]]:
+    """Sprawdź czy wszystkie liczby (tablica albo CachePierwszych) są rzeczywiście pierwsze."""
     print(f"\n=== SPRAWDZANIE POPRAWNOŚCI PIERWSZOŚCI ===")
 
+    if not isinstance(pierwsze, CachePierwszych):
+        pierwsze = jako_posortowana_tablica(pierwsze)
     if max_limit:
-        pierwsze_do_sprawdzenia = {p for p in pierwsze if p <= max_limit}
-        print(
-            f"Sprawdzanie {len(pierwsze_do_sprawdzenia):,} liczb pierwszych (limit: {max_limit:,})")
+        if isinstance(pierwsze, CachePierwszych):
+            do_sprawdzenia = pierwsze.liczba_pierwszych_do(max_limit)
+        else:
+            do_sprawdzenia = int(np.searchsorted(pierwsze, max_limit, side='right'))
+        print(f"Sprawdzanie {do_sprawdzenia:,} liczb pierwszych (limit: {max_limit:,})")
     else:
-        pierwsze_do_sprawdzenia = pierwsze
-        print(f"Sprawdzanie wszystkich {len(pierwsze_do_sprawdzenia):,} liczb pierwszych")
+        do_sprawdzenia = len(pierwsze)
+        print(f"Sprawdzanie wszystkich {do_sprawdzenia:,} liczb pierwszych")
 
+    # Test wsadowy blokami - niepoprawne to liczby, które go nie przechodzą
     niepoprawne = []
     sprawdzone = 0
-
-    for liczba in sorted(pierwsze_do_sprawdzenia):
-        sprawdzone += 1
-        if sprawdzone % max(1, len(pierwsze_do_sprawdzenia) // 100) == 0:
-            wyswietl_postep(sprawdzone, len(pierwsze_do_sprawdzenia), "Weryfikacja")
-
-        if not czy_pierwsza_weryfikacja(liczba):
-            niepoprawne.append(liczba)
-
-    wyswietl_postep(len(pierwsze_do_sprawdzenia), len(pierwsze_do_sprawdzenia), "Weryfikacja")
+    for blok in bloki_do_sprawdzenia(pierwsze, max_limit):
+        niepoprawne.extend(blok[~czy_pierwsza_wsadowo(blok)].tolist())
+        sprawdzone += len(blok)
+        wyswietl_postep(sprawdzone, do_sprawdzenia, "Weryfikacja")
 
     return {
         'niepoprawne': niepoprawne,
-        'sprawdzone': len(pierwsze_do_sprawdzenia)
+        'sprawdzone': sprawdzone
     }
 
 
-def sprawdz_kompletnosc(pierwsze: Set[int], max_sprawdzone: int,
+def sprawdz_kompletnosc(pierwsze: np.ndarray, max_sprawdzone: int,
                         limit_sprawdzania: int = None) -> Dict[str, List[int]]:
     """Sprawdź czy nie brakuje liczb pierwszych w zakresie."""
     print(f"\n=== SPRAWDZANIE KOMPLETNOŚCI ===")
@@ -159,26 +166,25 @@ def sprawdz_kompletnosc(pierwsze: Set[int], max_sprawdzone: int,
     # Generuj liczby pierwsze metodą referencyjną
     pierwsze_ref = generuj_liczby_pierwsze_referencyj(effective_limit)
 
-    # Znajdź brakujące liczby
+    # Znajdź brakujące liczby - obie tablice są posortowane, więc wystarczą operacje na tablicach
     print(f"Porównywanie z cache...")
-    pierwsze_w_zakresie = {p for p in pierwsze if p <= effective_limit}
-
-    brakujace = []
-    nadmiarowe = []
+    if isinstance(pierwsze, CachePierwszych):
+        # Rozpakowywany jest tylko sprawdzany zakres
+        pierwsze_w_zakresie = pierwsze.pierwsze_miedzy(0, effective_limit) if len(pierwsze) \
+            else np.array([], dtype=pierwsze.dtype)
+    else:
+        pierwsze = jako_posortowana_tablica(pierwsze)
+        pierwsze_w_zakresie = pierwsze[:np.searchsorted(pierwsze, effective_limit, side='right')]
 
     # Brakujące: są w referencji, ale nie w cache
-    for p in pierwsze_ref:
-        if p not in pierwsze_w_zakresie:
-            brakujace.append(p)
+    brakujace = np.setdiff1d(pierwsze_ref, pierwsze_w_zakresie, assume_unique=True)
 
     # Nadmiarowe: są w cache, ale nie w referencji (błędne liczby pierwsze)
-    for p in pierwsze_w_zakresie:
-        if p not in pierwsze_ref:
-            nadmiarowe.append(p)
+    nadmiarowe = np.setdiff1d(pierwsze_w_zakresie, pierwsze_ref, assume_unique=True)
 
     return {
-        'brakujace': sorted(brakujace),
-        'nadmiarowe': sorted(nadmiarowe),
+        'brakujace': brakujace.tolist(),
+        'nadmiarowe': nadmiarowe.tolist(),
         'sprawdzony_zakres': effective_limit,
         'cache_w_zakresie': len(pierwsze_w_zakresie),
         'referencyjne': len(pierwsze_ref)
@@ -202,12 +208,44 @@ def sprawdz_strukture_cache(dane: Dict) -> Dict[str, any]:
     max_sprawdzone = dane.get('max_sprawdzone', 0)
 
     # Sprawdź typy danych
-    if not isinstance(pierwsze, (set, list)):
+    if not isinstance(pierwsze, (set, list, np.ndarray, CachePierwszych)):
         problemy.append(f"'pierwsze' ma nieprawidłowy typ: {type(pierwsze)}")
 
     if not isinstance(max_sprawdzone, int):
         problemy.append(f"'max_sprawdzone' ma nieprawidłowy typ: {type(max_sprawdzone)}")
 
+    # Tablica z generatora musi być ściśle rosnąca - na tym opierają się narzędzia.
+    # Plik binarny (CachePierwszych) jest sprawdzany blokami, z granicami między nimi
+    if isinstance(pierwsze, (np.ndarray, CachePierwszych)):
+        poprzednia, rosnaca = None, True
+        if pierwsze.dtype.kind in 'iu':
+            for blok in bloki_do_sprawdzenia(pierwsze):
+                if (poprzednia is not None and blok[0] <= poprzednia) \
+                        or not np.all(blok[1:] > blok[:-1]):
+                    rosnaca = False
+                    break
+                poprzednia = blok[-1]
+        if pierwsze.dtype.kind not in 'iu':
+            problemy.append(f"Tablica 'pierwsze' ma nieprawidłowy typ elementów: {pierwsze.dtype}")
+        elif not rosnaca:
+            problemy.append("Tablica 'pierwsze' nie jest ściśle rosnąca")
+        elif len(pierwsze):
+            if isinstance(pierwsze, CachePierwszych):
+                najmniejsza, najwieksza = pierwsze.n_ta_pierwsza(1), pierwsze.najwieksza
+            else:
+                najmniejsza, najwieksza = pierwsze[0], pierwsze[-1]
+            if najwieksza > max_sprawdzone:
+                problemy.append(f"Największa liczba w cache ({najwieksza:,}) "
+                                f"> max_sprawdzone ({max_sprawdzone:,})")
+            elif najwieksza < max_sprawdzone * 0.9:  # Tolerancja 10%
+                ostrzezenia.append(f"Największa liczba w cache ({najwieksza:,}) znacznie mniejsza "
+                                   f"od max_sprawdzone ({max_sprawdzone:,})")
+            if najmniejsza < 2:
+                nieprawidlowe_wartosci = [int(p) for p in
+                                          next(bloki_do_sprawdzenia(pierwsze, 1), [])]
+                problemy.append(f"Znaleziono {len(nieprawidlowe_wartosci)} nieprawidłowych "
+                                f"wartości: {nieprawidlowe_wartosci[:10]}")
+
     # Sprawdź spójność danych
     if isinstance(pierwsze, (set, list)) and pierwsze:
         max_w_cache = max(pierwsze)
@@ -235,36 +273,77 @@ def sprawdz_strukture_cache(dane: Dict) -> Dict[str, any]:
         'problemy': problemy,
         'ostrzezenia': ostrzezenia,
         'pierwsze_typ': type(pierwsze).__name__,
-        'pierwsze_liczba': len(pierwsze) if pierwsze else 0,
+        'pierwsze_liczba': len(pierwsze),
         'max_sprawdzone': max_sprawdzone,
-        'max_w_cache': max(pierwsze) if pierwsze else 0
+        'max_w_cache': (pierwsze.najwieksza if isinstance(pierwsze, CachePierwszych)
+                        else int(max(pierwsze))) if len(pierwsze) else 0
     }
 
 
-def wyswietl_statystyki_cache(nazwa_pliku: str, pierwsze: Set[int], max_sprawdzone: int):
-    """Wyświetl szczegółowe statystyki cache."""
-    rozmiar_pliku = os.path.getsize(nazwa_pliku)
+def sprawdz_licznosc(pierwsze, max_sprawdzone: int) -> Dict[str, int]:
+    """
+    Porównaj liczbę liczb cache (tablica albo CachePierwszych) do max_sprawdzone z π(max_sprawdzone)
+    liczonym bez sita (O(x^¾)) - cały zakres, także ponad --limit.
+    """
+    print(f"\n=== SPRAWDZANIE LICZNOŚCI ===")
+    if isinstance(pierwsze, CachePierwszych):
+        liczba = pierwsze.liczba_pierwszych_do(max_sprawdzone)
+    else:
+        liczba = int(np.searchsorted(jako_posortowana_tablica(pierwsze), max_sprawdzone,
+                                     side='right'))
+    oczekiwane = liczba_pierwszych_do(max_sprawdzone)
+    print(f"π({max_sprawdzone:,}) = {oczekiwane:,}, w cache: {liczba:,}")
+    return {'liczba': liczba, 'oczekiwane': oczekiwane}
+
+
+def sprawdz_sumy_cache(nazwa_pliku: str) -> bool:
+    """Sprawdź sumy CRC32 bloków danych cache; False tylko przy wykrytym uszkodzeniu."""
+    if not czy_plik_binarny(nazwa_pliku) or wczytaj_naglowek(nazwa_pliku)['wersja'] < 2:
+        print(f"\nℹ️  Plik nie ma sum kontrolnych (format sprzed wersji 2) - pominięto")
+        return True
+    start_time = time.time()
+    uszkodzone = sprawdz_sumy_kontrolne(nazwa_pliku)
+    if uszkodzone:
+        print(f"\n❌ USZKODZONE BLOKI DANYCH (niezgodne CRC32): {len(uszkodzone)}")
+        for numer in uszkodzone[:20]:
+            print(f"  • blok {numer}: bajty {numer * ROZMIAR_BLOKU_SUMY:,} - "
+                  f"{(numer + 1) * ROZMIAR_BLOKU_SUMY - 1:,} danych")
+        return False
+    print(f"\n✅ Sumy kontrolne zgodne ({time.time() - start_time:.2f} s)")
+    return True
+
+
+def wyswietl_statystyki_cache(nazwa_pliku: str):
+    """Wyświetl szczegółowe statystyki cache (z nagłówka, bez wczytywania liczb)."""
+    statystyki = statystyki_cache(nazwa_pliku)
+    rozmiar_pliku = statystyki['rozmiar_pliku']
+    max_sprawdzone = statystyki['max_sprawdzone']
+    liczba = statystyki['liczba']
 
     print(f"\n=== STATYSTYKI CACHE ===")
     print(f"Plik: {nazwa_pliku}")
     print(f"Rozmiar pliku: {rozmiar_pliku:,} bajtów ({rozmiar_pliku/1024/1024:.2f} MB)")
+    if statystyki['utworzono'] is not None:
+        utworzono = time.localtime(statystyki['utworzono'])
+        print(f"Utworzono: {time.strftime('%Y-%m-%d %H:%M:%S', utworzono)}")
+    if statystyki['parametry']:
+        parametry = ', '.join(f'{k}={v}' for k, v in statystyki['parametry'].items())
+        print(f"Parametry generatora: {parametry}")
     print(f"Maksymalna sprawdzona liczba: {max_sprawdzone:,}")
-    print(f"Liczb pierwszych w cache: {len(pierwsze):,}")
+    print(f"Liczb pierwszych w cache: {liczba:,}")
 
-    if pierwsze:
-        najmniejsza = min(pierwsze)
-        najwieksza = max(pierwsze)
-        print(f"Zakres: {najmniejsza:,} - {najwieksza:,}")
+    if liczba:
+        print(f"Zakres: {statystyki['najmniejsza']:,} - {statystyki['najwieksza']:,}")
 
         if max_sprawdzone > 1:
-            teoretyczna_gestosc = len(pierwsze) / max_sprawdzone * 100
+            teoretyczna_gestosc = liczba / max_sprawdzone * 100
             print(f"Gęstość liczb pierwszych: {teoretyczna_gestosc:.3f}%")
 
             # Przybliżona gęstość według wzoru π(x) ≈ x / ln(x)
             if max_sprawdzone > 10:
                 szacowana_liczba = max_sprawdzone / math.log(max_sprawdzone)
                 print(f"Szacowana liczba (π(x) ≈ x/ln(x)): {szacowana_liczba:,.0f}")
-                roznica = len(pierwsze) - szacowana_liczba
+                roznica = liczba - szacowana_liczba
                 print(
                     f"Różnica od szacowanej: {roznica:+,.0f} ({roznica/szacowana_liczba*100:+.1f}%)")
 
@@ -277,9 +356,10 @@ def main():
         epilog="""
 Przykłady użycia:
   %(prog)s                    # Sprawdź domyślny cache
-  %(prog)s --plik moj_cache.pkl  # Sprawdź konkretny plik
+  %(prog)s --plik moj_cache.bin  # Sprawdź konkretny plik
   %(prog)s --limit 1000000    # Sprawdź tylko do 1 miliona
   %(prog)s --tylko-struktura  # Sprawdź tylko strukturę cache
+  %(prog)s --tylko-sumy       # Sprawdź tylko sumy kontrolne (CRC32) pliku
   %(prog)s --bez-kompletnosci # Pomiń sprawdzanie kompletności
         """
     )
@@ -290,6 +370,8 @@ Przykłady użycia:
                         help='Maksymalny limit sprawdzania (domyślnie: cały cache)')
     parser.add_argument('--tylko-struktura', action='store_true',
                         help='Sprawdź tylko strukturę cache, bez weryfikacji liczb')
+    parser.add_argument('--tylko-sumy', action='store_true',
+                        help='Sprawdź tylko sumy kontrolne bloków danych, bez wczytywania liczb')
     parser.add_argument('--bez-kompletnosci', action='store_true',
                         help='Pomiń sprawdzanie kompletności (szybsze)')
     parser.add_argument('--szczegolowe', action='store_true',
@@ -298,15 +380,27 @@ Przykłady użycia:
     args = parser.parse_args()
 
     print(f"=== WERYFIKATOR CACHE LICZB PIERWSZYCH ===")
-    print(f"Sprawdzanie pliku: {args.plik}")
+    plik = znajdz_plik_cache(args.plik)
+    print(f"Sprawdzanie pliku: {plik}")
 
     try:
-        # Wczytaj cache
-        print(f"\nWczytywanie cache...")
-        pierwsze, max_sprawdzone, dane = wczytaj_cache_do_sprawdzenia(args.plik)
+        if not os.path.exists(plik):
+            raise FileNotFoundError(f"Plik cache '{plik}' nie istnieje")
+
+        # Sumy CRC32 przed wczytaniem - uszkodzone dane mogłyby zwrócić dowolne liczby
+        if czy_plik_binarny(plik) and not sprawdz_sumy_cache(plik):
+            print(f"\n⚠️  CACHE JEST USZKODZONY - wygeneruj go ponownie ❌")
+            return
+        if args.tylko_sumy:
+            return
 
         # Wyświetl podstawowe statystyki
-        wyswietl_statystyki_cache(args.plik, pierwsze, max_sprawdzone)
+        wyswietl_statystyki_cache(plik)
+
+        # Wczytaj cache
+        print(f"\nWczytywanie cache...")
+        pierwsze, max_sprawdzone, dane = wczytaj_cache_do_sprawdzenia(plik)
+        print(f"Format pliku: {dane['format']}")
 
         # Sprawdź strukturę
         wyniki_struktury = sprawdz_strukture_cache(dane)
@@ -327,13 +421,22 @@ Przykłady użycia:
         if args.tylko_struktura:
             return
 
-        if not pierwsze:
+        if len(pierwsze) == 0:
             print(f"\n❌ Cache jest pusty - brak liczb pierwszych do sprawdzenia")
             return
 
-        # Sprawdź poprawność pierwszości
         start_time = time.time()
 
+        # Liczność z π(x) - braki i nadmiary w całym zakresie bez sita referencyjnego
+        wyniki_licznosci = sprawdz_licznosc(pierwsze, max_sprawdzone)
+        if wyniki_licznosci['liczba'] != wyniki_licznosci['oczekiwane']:
+            print(f"\n❌ LICZNOŚĆ NIEZGODNA Z π(x): "
+                  f"{wyniki_licznosci['liczba'] - wyniki_licznosci['oczekiwane']:+,}")
+        else:
+            print(f"\n✅ Liczność zgodna z π(x)")
+
+        # Sprawdź poprawność pierwszości
+
         wyniki_poprawnosci = sprawdz_poprawnosc_pierwszosci(pierwsze, args.limit)
 
         if wyniki_poprawnosci['niepoprawne']:
@@ -377,6 +480,7 @@ Przykłady użycia:
         # Podsumowanie końcowe
         wszystko_ok = (
             not wyniki_struktury['problemy'] and
+            wyniki_licznosci['liczba'] == wyniki_licznosci['oczekiwane'] and
             not wyniki_poprawnosci['niepoprawne'] and
             (args.bez_kompletnosci or not wyniki_kompletnosci.get('brakujace')) and
             (args.bez_kompletnosci or not wyniki_kompletnosci.get('nadmiarowe'))
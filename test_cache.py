@@ -57,6 +57,60 @@ class TestSprawdzCachePierwszych(unittest.TestCase):
                     except SystemExit:
                         pass  # Funkcja może wywoływać sys.exit()
 
+    def test_wykrywa_liczby_zlozone(self):
+        """Test czy weryfikacja wskazuje liczby złożone w cache."""
+        import numpy as np
+        from sprawdz_cache_pierwszych import sprawdz_poprawnosc_pierwszosci
+
+        pierwsze = np.array([2, 3, 5, 7, 561, 10007, 3215031751, 4294967291], dtype=np.int64)
+        with patch('sys.stdout'):
+            wynik = sprawdz_poprawnosc_pierwszosci(pierwsze)
+        self.assertEqual(wynik['niepoprawne'], [561, 3215031751])
+        self.assertEqual(wynik['sprawdzone'], len(pierwsze))
+
+    def test_sprawdz_bitmape_blokami(self):
+        """Test weryfikacji bitmapy przez CachePierwszych - bez rozpakowania całego pliku."""
+        import numpy as np
+        import format_cache as fc
+        import sprawdz_cache_pierwszych as scp
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(100000),
+                              dtype=np.uint32)
+        with tempfile.TemporaryDirectory() as katalog:
+            plik = os.path.join(katalog, 'cache.bin')
+            fc.zapisz_pierwsze(referencja, 100000, plik, 'bitmapa')
+            from io import StringIO
+            wyjscie = StringIO()
+            with patch('sys.argv', ['sprawdz_cache_pierwszych.py', '--plik', plik]), \
+                    patch('sprawdz_cache_pierwszych.wczytaj_dane_cache',
+                          side_effect=AssertionError), \
+                    patch('sprawdz_cache_pierwszych.ROZMIAR_BLOKU_WSADOWEGO', 1000), \
+                    patch('sys.stdout', wyjscie):
+                scp.main()
+            self.assertIn('CACHE JEST POPRAWNY', wyjscie.getvalue())
+            self.assertIn('Liczność zgodna z π(x)', wyjscie.getvalue())
+            self.assertIn(f'Cache w zakresie: {len(referencja):,}', wyjscie.getvalue())
+
+            with fc.CachePierwszych(plik) as cache, patch('sys.stdout'):
+                wynik = scp.sprawdz_poprawnosc_pierwszosci(cache, 50000)
+                self.assertEqual(wynik, {'niepoprawne': [],
+                                         'sprawdzone': int((referencja <= 50000).sum())})
+
+    def test_wykrywa_niezgodna_licznosc(self):
+        """Test czy weryfikacja porównuje liczność cache do max_sprawdzone z π(x)."""
+        import numpy as np
+        import format_cache as fc
+        from sprawdz_cache_pierwszych import sprawdz_licznosc
+
+        with patch('sys.stdout'):
+            self.assertEqual(sprawdz_licznosc({2, 3, 5, 7, 13}, 16), {'liczba': 5, 'oczekiwane': 6})
+            with tempfile.TemporaryDirectory() as katalog:
+                # Liczby ponad max_sprawdzone (rzadki zbiór) nie wchodzą do porównania
+                plik = os.path.join(katalog, 'cache.bin')
+                fc.zapisz_pierwsze(np.array([2, 3, 5, 7, 11, 13, 10007]), 16, plik, 'odstepy')
+                with fc.CachePierwszych(plik) as cache:
+                    self.assertEqual(sprawdz_licznosc(cache, 16), {'liczba': 6, 'oczekiwane': 6})
+
     def test_sprawdz_nieistniejacy_cache(self):
         """Test sprawdzania nieistniejącego cache."""
         nieistniejacy_plik = "/tmp/nieistniejacy_cache_test.pkl"
@@ -190,6 +244,1089 @@ class TestGenerujCache(unittest.TestCase):
                             f"Funkcja {funkcja} nie istnieje w module")
 
 
+class TestSegmentowaneSitoZKolem(unittest.TestCase):
+    """Testy jądra segmentowanego sita z kołem 30."""
+
+    @staticmethod
+    def pierwsze_referencyjne(limit):
+        """Proste sito Eratostenesa jako referencja."""
+        import numpy as np
+        sito = np.ones(limit + 1, dtype=bool)
+        sito[:2] = False
+        for i in range(2, int(limit ** 0.5) + 1):
+            if sito[i]:
+                sito[i * i::i] = False
+        return [int(p) for p in np.flatnonzero(sito)]
+
+    def test_zgodnosc_z_referencja(self):
+        """Test zgodności segmentów (także niewyrównanych do 30) z prostym sitem."""
+        import generuj_cache_pierwszych as gcf
+
+        limit = 200000
+        referencja = self.pierwsze_referencyjne(limit)
+        with patch('generuj_cache_pierwszych.PROGRESS_CALLBACK', lambda *args: None):
+            pierwsze_podstawowe = gcf.generuj_podstawowe_pierwsze(limit)
+
+        for start, koniec in [(1000, 1999), (1013, 5077), (7, 100), (30, 59),
+                              (150001, 200000), (199990, 200000)]:
+            oczekiwane = {p for p in referencja if start <= p <= koniec}
+            wynik = gcf.segmentowane_sito_z_kolem(start, koniec, pierwsze_podstawowe)
+            self.assertEqual(set(wynik), oczekiwane, f"Segment {start}-{koniec}")
+
+    def test_pusty_zakres(self):
+        """Test segmentu z początkiem za końcem."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        wynik = gcf.segmentowane_sito_z_kolem(100, 50, np.array([2, 3, 5, 7]))
+        self.assertEqual(len(wynik), 0)
+
+    def test_podbloki_malych_liczb(self):
+        """Test czy podbloki pamięci podręcznej nie zmieniają wyniku segmentu."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        with patch('generuj_cache_pierwszych.PROGRESS_CALLBACK', lambda *args: None):
+            pierwsze_podstawowe = gcf.generuj_podstawowe_pierwsze(10**7)
+        for start, koniec in [(1000, 400000), (9000001, 9999999)]:
+            bez = gcf.segmentowane_sito_z_kolem(start, koniec, pierwsze_podstawowe)
+            for blok in [256 * 8, 256 * 64 + 7, 10**6]:
+                z_podblokami = gcf.segmentowane_sito_z_kolem(start, koniec, pierwsze_podstawowe,
+                                                             blok)
+                np.testing.assert_array_equal(z_podblokami, bez)
+
+    def test_wzorzec_segmentu(self):
+        """Test czy segment z wzorca odpowiada ręcznemu wykreśleniu małych liczb pierwszych."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        okres = np.prod(gcf.PIERWSZE_WZORCA_SEGMENTU)
+        for bloki_start, liczba_blokow in [(0, 5), (0, okres + 3), (okres - 2, 10),
+                                           (123457, 2 * okres + 1)]:
+            segment = gcf._segment_z_wzorca(bloki_start, liczba_blokow)
+            liczby = (bloki_start + np.arange(liczba_blokow))[None, :] * gcf.ROZMIAR_KOLA + \
+                gcf.WZORZEC_KOLA[:, None]
+            oczekiwany = np.ones_like(segment)
+            for p in gcf.PIERWSZE_WZORCA_SEGMENTU:
+                oczekiwany &= (liczby % p != 0) | (liczby == p)
+            np.testing.assert_array_equal(segment, oczekiwany)
+
+
+class TestPamiecPodreczna(unittest.TestCase):
+    """Testy doboru segmentów do pamięci podręcznej CPU."""
+
+    def test_wykryj_z_sysfs(self):
+        """Test odczytu L1d/L2 z drzewa w stylu /sys/devices/system/cpu."""
+        import generuj_cache_pierwszych as gcf
+
+        with tempfile.TemporaryDirectory() as katalog:
+            for cpu, l2 in [('cpu0', '2048K'), ('cpu1', '1M')]:
+                for indeks, (poziom, typ, rozmiar) in enumerate(
+                        [('1', 'Data', '48K'), ('1', 'Instruction', '32K'), ('2', 'Unified', l2)]):
+                    sciezka = os.path.join(katalog, cpu, 'cache', f'index{indeks}')
+                    os.makedirs(sciezka)
+                    for plik, wartosc in [('level', poziom), ('type', typ), ('size', rozmiar)]:
+                        with open(os.path.join(sciezka, plik), 'w') as f:
+                            f.write(wartosc + '\n')
+
+            self.assertEqual(gcf.wykryj_pamiec_podreczna(katalog),
+                             {'l1d': 48 * 1024, 'l2': 1024**2})
+            self.assertEqual(gcf.wykryj_pamiec_podreczna(os.path.join(katalog, 'brak')),
+                             gcf.DOMYSLNA_PAMIEC_PODRECZNA)
+
+    def test_rozmiar_segmentu(self):
+        """Test rozmiaru segmentu wynikającego z L2."""
+        import generuj_cache_pierwszych as gcf
+
+        pamiec = {'l1d': 32 * 1024, 'l2': 1024**2}
+        for limit, procesy in [(10**6, 4), (10**9, 1), (10**12, 8)]:
+            rozmiar = gcf.rozmiar_segmentu_dla_pamieci_podrecznej(limit, procesy, pamiec)
+            self.assertEqual(rozmiar % 30, 0)
+            self.assertGreaterEqual(rozmiar, 1024**2 * 30 // 8 - 30)
+            self.assertLessEqual(rozmiar, gcf.WIELOKROTNOSC_L2_SEGMENTU * 1024**2 * 30 // 8)
+
+        zasoby = {'cpu_logiczne': 4, 'cpu_fizyczne': 4, 'pamiec_gb': 8, 'pamiec_podreczna': pamiec}
+        parametry = gcf.oblicz_optymalne_parametry(10**9, zasoby)
+        self.assertEqual(parametry['blok_podreczny'], 1024**2 // 8)
+        # Wątki tylko na żądanie (--backend watki) - automatycznie zawsze pula procesów
+        for limit in (5 * 10**7, 10**9):
+            self.assertEqual(gcf.oblicz_optymalne_parametry(limit, zasoby)['backend'], 'procesy')
+
+
+class TestSitoBitowe(unittest.TestCase):
+    """Testy bitowego sita liczb nieparzystych."""
+
+    def setUp(self):
+        """Wyłącz paski postępu."""
+        patcher = patch('generuj_cache_pierwszych.PROGRESS_CALLBACK', lambda *args: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_zgodnosc_z_referencja(self):
+        """Test zgodności z prostym sitem, także dla bloków mniejszych niż zakres."""
+        import generuj_cache_pierwszych as gcf
+
+        for limit in [2, 3, 10, 11, 100, 12345]:
+            oczekiwane = TestSegmentowaneSitoZKolem.pierwsze_referencyjne(limit)
+            for rozmiar_bloku in [8, 64, gcf.ROZMIAR_BLOKU_BITOWEGO]:
+                bufor = gcf.sito_bitowe_nieparzyste(limit, rozmiar_bloku)
+                wynik = gcf.pierwsze_z_sita_bitowego(bufor, limit, rozmiar_bloku)
+                self.assertEqual(wynik.tolist(), oczekiwane, f"limit={limit}, blok={rozmiar_bloku}")
+
+    def test_rozmiar_bufora(self):
+        """Test czy bufor zajmuje jeden bit na liczbę nieparzystą."""
+        import generuj_cache_pierwszych as gcf
+
+        bufor = gcf.sito_bitowe_nieparzyste(10**6)
+        self.assertEqual(bufor.nbytes, (10**6 // 2 + 7) // 8)
+
+    def test_typ_wyniku(self):
+        """Test wyboru typu tablicy wynikowej."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        self.assertEqual(gcf.dtype_dla_limitu(10**9), np.uint32)
+        self.assertEqual(gcf.dtype_dla_limitu(10**10), np.uint64)
+
+    def test_sito_standardowe(self):
+        """Test gałęzi 'standardowy' sita dla cache."""
+        import generuj_cache_pierwszych as gcf
+
+        wynik = gcf.sito_eratostenesa_dla_cache(
+            1000, {'algorytm': 'standardowy', 'procesy': 1, 'rozmiar_segmentu': 0})
+        self.assertEqual(sorted(wynik), TestSegmentowaneSitoZKolem.pierwsze_referencyjne(1000))
+
+
+class TestSilnikSegmentowy(unittest.TestCase):
+    """Testy sit segmentowanych zwracających posortowane tablice."""
+
+    def setUp(self):
+        """Wyłącz paski postępu i przygotuj plik tymczasowy."""
+        patcher = patch('generuj_cache_pierwszych.PROGRESS_CALLBACK', lambda *args: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.temp_file = None
+
+    def tearDown(self):
+        """Sprzątanie po testach."""
+        if self.temp_file and os.path.exists(self.temp_file):
+            os.remove(self.temp_file)
+
+    def test_algorytmy_zwracaja_posortowane_tablice(self):
+        """Test czy wszystkie algorytmy zwracają tę samą posortowaną tablicę."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        for limit in [10, 999, 1000, 54321]:
+            oczekiwane = TestSegmentowaneSitoZKolem.pierwsze_referencyjne(limit)
+            for algorytm in ['standardowy', 'segmentowany', 'rownolegle_segmentowany', 'kubelkowy']:
+                parametry = {'algorytm': algorytm, 'procesy': 2, 'rozmiar_segmentu': 7777}
+                wynik = gcf.sito_eratostenesa_dla_cache(limit, parametry)
+                self.assertIsInstance(wynik, np.ndarray)
+                self.assertEqual(wynik.dtype, np.uint32)
+                self.assertEqual(wynik.tolist(), oczekiwane, f"{algorytm}, limit={limit}")
+
+    def test_zapisz_wczytaj_tablice(self):
+        """Test zapisu i odczytu cache jako posortowanej tablicy."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pkl') as f:
+            self.temp_file = f.name
+
+        with patch('generuj_cache_pierwszych.PLIK_CACHE_PIERWSZYCH', self.temp_file):
+            gcf.zapisz_cache({13, 2, 7, 3, 11, 5}, 13)
+            pierwsze, max_sprawdzone = gcf.wczytaj_istniejacy_cache()
+
+        self.assertIsInstance(pierwsze, np.ndarray)
+        self.assertEqual(pierwsze.tolist(), [2, 3, 5, 7, 11, 13])
+        self.assertEqual(max_sprawdzone, 13)
+
+    def test_sprawdzanie_indywidualne_dokleja_do_tablicy(self):
+        """Test rozszerzania posortowanej tablicy metodą indywidualną."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        wynik = gcf.sprawdzanie_indywidualne_dla_cache(
+            21, 50, np.array([2, 3, 5, 7, 11, 13, 17, 19]))
+        self.assertEqual(wynik.tolist(), TestSegmentowaneSitoZKolem.pierwsze_referencyjne(50))
+
+    def test_rozszerzenie_segmentowe(self):
+        """Test rozszerzania cache przesiewaniem tylko nowego zakresu."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(60000))
+        for max_sprawdzone, limit in [(1, 100), (4, 5000), (1000, 60000), (40000, 60000)]:
+            for algorytm in ['segmentowany', 'rownolegle_segmentowany']:
+                parametry = {'algorytm': algorytm, 'procesy': 2, 'rozmiar_segmentu': 3001}
+                wynik = gcf.rozszerz_cache_segmentowo(
+                    referencja[referencja <= max_sprawdzone], max_sprawdzone, limit, parametry)
+                self.assertEqual(wynik.tolist(), referencja[referencja <= limit].tolist(),
+                                 f"{algorytm}, {max_sprawdzone} -> {limit}")
+
+    def test_rozszerzenie_z_otwartego_cache(self):
+        """Test rozszerzania i przedziałów z CachePierwszych - bez rozpakowania całego pliku."""
+        import numpy as np
+        import format_cache as fc
+        import generuj_cache_pierwszych as gcf
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(60000))
+        parametry = {'algorytm': 'segmentowany', 'procesy': 1, 'rozmiar_segmentu': 3000}
+        with tempfile.TemporaryDirectory() as katalog, \
+                patch('generuj_cache_pierwszych.PLIK_CACHE_PIERWSZYCH',
+                      os.path.join(katalog, 'cache.bin')):
+            for kodowanie in ('bitmapa', 'odstepy'):
+                fc.zapisz_pierwsze(referencja[referencja <= 20000], 20000,
+                                   gcf.PLIK_CACHE_PIERWSZYCH, kodowanie)
+                with patch('format_cache.wczytaj_dane_cache', side_effect=AssertionError), \
+                        gcf.otworz_istniejacy_cache() as cache:
+                    wynik = gcf.rozszerz_cache_segmentowo(cache, 20000, 60000, parametry)
+                    self.assertEqual(wynik.tolist(), referencja.tolist(), kodowanie)
+                    wynik, _ = gcf.generuj_z_punktami_kontrolnymi(
+                        cache, 20000, 60000, parametry, rozmiar_etapu=10000, w_pamieci=False)
+                    self.assertEqual(wynik.tolist(), referencja.tolist(), kodowanie)
+                    wynik = gcf.pierwsze_w_przedziale(1000, 2000, None, cache, 20000)
+                    oczekiwane = referencja[(referencja >= 1000) & (referencja <= 2000)]
+                    self.assertEqual(wynik.tolist(), oczekiwane.tolist())
+                    wynik = gcf.sprawdzanie_indywidualne_dla_cache(20001, 20100, cache)
+                    self.assertEqual(wynik.tolist(), referencja[referencja <= 20100].tolist())
+            os.remove(gcf.PLIK_CACHE_PIERWSZYCH)
+            self.assertIsNone(gcf.otworz_istniejacy_cache())
+
+    def test_punkty_kontrolne_i_wznowienie(self):
+        """Test przerwania przez budżet czasu, wznowienia i urwanego zapisu punktu kontrolnego."""
+        from io import StringIO
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(60000))
+        parametry = {'algorytm': 'segmentowany', 'procesy': 1, 'rozmiar_segmentu': 3000}
+        with tempfile.TemporaryDirectory() as katalog, \
+                patch('generuj_cache_pierwszych.PLIK_CACHE_PIERWSZYCH',
+                      os.path.join(katalog, 'cache.pkl')):
+            istniejace = referencja[referencja <= 5000]
+            # Zegar testu: sito "przesiewa" 1000 liczb na sekundę budżetu 10 s
+            zegar, przedzialy = [0.0], []
+            przesiej = gcf.pierwsze_w_przedziale
+
+            def pierwsze_w_przedziale(a, b, *argumenty, **nazwane):
+                przedzialy.append((a, b))
+                zegar[0] += (b - a + 1) / 1000
+                return przesiej(a, b, *argumenty, **nazwane)
+
+            with patch('generuj_cache_pierwszych.pierwsze_w_przedziale', pierwsze_w_przedziale), \
+                    patch('generuj_cache_pierwszych.ETAP_PROBNY', 2000), \
+                    patch('time.time', lambda: zegar[0]), \
+                    patch('sys.stdout', new_callable=StringIO) as wyjscie:
+                wynik, pokryte = gcf.generuj_z_punktami_kontrolnymi(
+                    istniejace, 5000, 60000, parametry, budzet_czasu=10, rozmiar_etapu=10000)
+            # Liczby bazowe z cache raz na przebieg, a nie w każdym etapie
+            self.assertEqual(wyjscie.getvalue().count('Liczby bazowe z istniejącego cache: 53'), 1)
+            # Etap próbny, potem etapy na połowę pozostałego budżetu (w granicach etapów),
+            # aż ta połowa jest krótsza od etapu próbnego
+            self.assertEqual(przedzialy, [(5001, 7000), (7001, 10000), (10001, 12500)])
+            self.assertEqual(zegar[0], 7.5)
+            # Przerwany przebieg nie składa wyniku - etapy zostają w punkcie kontrolnym
+            self.assertEqual((wynik, pokryte), (None, 12500))
+            self.assertEqual(gcf.wczytaj_punkt_kontrolny(5000, 60000)[1], 12500)
+            # Wyczerpany budżet - żaden etap nie jest zaczynany
+            wynik, pokryte = gcf.generuj_z_punktami_kontrolnymi(
+                istniejace, 5000, 60000, parametry, wznow=True, budzet_czasu=0, rozmiar_etapu=10000)
+            self.assertEqual((wynik, pokryte), (None, 12500))
+
+            # Urwany ostatni rekord jest odcinany, a punkt z innego stanu cache pomijany
+            with open(gcf._plik_punktu_kontrolnego(), 'ab') as f:
+                f.write(b'\x80\x05urwany')
+            self.assertEqual(gcf.wczytaj_punkt_kontrolny(1, 60000)[1], 1)
+            wynik, pokryte = gcf.generuj_z_punktami_kontrolnymi(
+                istniejace, 5000, 60000, parametry, wznow=True, rozmiar_etapu=10000)
+            self.assertEqual(pokryte, 60000)
+            self.assertEqual(wynik.tolist(), referencja.tolist())
+            self.assertFalse(os.path.exists(gcf._plik_punktu_kontrolnego()))
+
+            # Bez cache liczby bazowe są generowane - komunikat o cache nie pojawia się
+            with patch('sys.stdout', new_callable=StringIO) as wyjscie:
+                wynik, _ = gcf.generuj_z_punktami_kontrolnymi(
+                    np.array([], dtype=np.uint32), 1, 60000, parametry, rozmiar_etapu=20000)
+            self.assertEqual(wynik.tolist(), referencja.tolist())
+            self.assertNotIn('z istniejącego cache', wyjscie.getvalue())
+
+    def test_limit_pamieci(self):
+        """Test planu pamięci (w pamięci, zrzut na dysk, za mało) i składania wyniku z dysku."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        self.assertEqual(gcf.rozmiar_pamieci_z_tekstu('1.5G'), 3 * 1024**3 // 2)
+        self.assertEqual(gcf.rozmiar_pamieci_z_tekstu('512MB'), 512 * 1024**2)
+        zasoby = {'pamiec_podreczna': gcf.DOMYSLNA_PAMIEC_PODRECZNA}
+        parametry = {'algorytm': 'rownolegle_segmentowany', 'procesy': 8, 'backend': 'procesy',
+                     'rozmiar_segmentu': 0, 'opis': ''}
+        # 10^9: ~50,8 mln liczb uint32 (~194 MB)
+        plan = gcf.zaplanuj_pamiec(10**9, 4 * 1024**3, parametry, zasoby=zasoby)
+        self.assertTrue(plan['w_pamieci'])
+        self.assertEqual(plan['procesy'], 8)
+        plan = gcf.zaplanuj_pamiec(10**9, 450 * 1024**2, parametry, zasoby=zasoby)
+        self.assertFalse(plan['w_pamieci'])
+        self.assertLess(plan['procesy'], 8)
+        self.assertLessEqual(plan['szczyt_pamieci'], 450 * 1024**2)
+        self.assertEqual(plan['rozmiar_segmentu'] % gcf.ROZMIAR_KOLA, 0)
+        # Szczyt obejmuje zapis cache: wynik z buforami kodera (cała bitmapa 10^9 / 30)
+        liczba = int(gcf.oszacuj_liczbe_pierwszych(10**9))
+        self.assertGreaterEqual(plan['szczyt_pamieci'],
+                                gcf.NARZUT_PROCESU + 4 * liczba + gcf.pamiec_zapisu(liczba, 10**9))
+        # Przesiewanie zmieściłoby się w 300 MB, ale zapis bitmapy już nie
+        for limit_pamieci in (300 * 1024**2, 150 * 1024**2):
+            with self.assertRaises(ValueError):
+                gcf.zaplanuj_pamiec(10**9, limit_pamieci, parametry, zasoby=zasoby)
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(60000))
+        with tempfile.TemporaryDirectory() as katalog, \
+                patch('generuj_cache_pierwszych.PLIK_CACHE_PIERWSZYCH',
+                      os.path.join(katalog, 'cache.pkl')):
+            wynik, pokryte = gcf.generuj_z_punktami_kontrolnymi(
+                referencja[referencja <= 5000], 5000, 60000,
+                {'algorytm': 'segmentowany', 'procesy': 1, 'rozmiar_segmentu': 3000},
+                rozmiar_etapu=10000, w_pamieci=False)
+            self.assertEqual(pokryte, 60000)
+            self.assertEqual(wynik.tolist(), referencja.tolist())
+
+    def test_pierwsze_w_przedziale(self):
+        """Test przesiewania samego przedziału - wysoko, z cache i w całości w cache."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+        from pierwszosc import czy_pierwsza_wsadowo
+
+        a, b = 10**12, 10**12 + 60000
+        liczby = np.arange(a, b + 1)
+        oczekiwane = liczby[czy_pierwsza_wsadowo(liczby)].tolist()
+        for parametry, uzyte in [
+                (None, None),
+                ({'algorytm': 'kubelkowy', 'procesy': 1, 'rozmiar_segmentu': 9000},
+                 {'algorytm': 'kubelkowy', 'procesy': 1, 'rozmiar_segmentu': 9000,
+                  'backend': None}),
+                ({'algorytm': 'rownolegle_segmentowany', 'procesy': 2, 'rozmiar_segmentu': 9000},
+                 {'algorytm': 'rownolegle_segmentowany', 'procesy': 2, 'rozmiar_segmentu': 9000,
+                  'backend': 'procesy'}),
+                # Sito bitowe nie przesiewa od a - przedział przesiewają segmenty
+                ({'algorytm': 'standardowy', 'procesy': 1, 'rozmiar_segmentu': 9000},
+                 {'algorytm': 'segmentowany', 'procesy': 1, 'rozmiar_segmentu': 9000,
+                  'backend': None})]:
+            parametry_uzyte = {}
+            wynik = gcf.pierwsze_w_przedziale(a, b, parametry, parametry_uzyte=parametry_uzyte)
+            self.assertEqual(wynik.tolist(), oczekiwane)
+            if uzyte:
+                self.assertEqual(parametry_uzyte, uzyte)
+            else:
+                # Automatyczne parametry sita bitowego zamieniane są na sito segmentów
+                self.assertIn(parametry_uzyte['algorytm'],
+                              ('segmentowany', 'kubelkowy', 'rownolegle_segmentowany'))
+                self.assertGreater(parametry_uzyte['rozmiar_segmentu'], 0)
+
+        # Liczby bazowe z cache sięgającego sqrt(b)
+        cache = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(10**6 + 10))
+        self.assertEqual(gcf.pierwsze_w_przedziale(a, b, None, cache, 10**6 + 10).tolist(),
+                         oczekiwane)
+
+        # Przedział w całości pokryty przez cache
+        wynik = gcf.pierwsze_w_przedziale(1000, 2000, None, cache, 10**6 + 10)
+        self.assertEqual(wynik.tolist(), cache[(cache >= 1000) & (cache <= 2000)].tolist())
+        self.assertEqual(len(gcf.pierwsze_w_przedziale(20, 10)), 0)
+
+    def test_pierwsze_w_przedziale_wybor_kubelkowego(self):
+        """Test automatycznego wyboru sita kubełkowego, gdy sqrt(b) przekracza segment/30."""
+        import generuj_cache_pierwszych as gcf
+
+        parametry_auto = {'algorytm': 'segmentowany', 'procesy': 1, 'backend': 'procesy',
+                          'rozmiar_segmentu': 30000, 'blok_podreczny': 0, 'opis': 'test'}
+        with patch('generuj_cache_pierwszych.oblicz_optymalne_parametry',
+                   return_value=parametry_auto), \
+                patch('generuj_cache_pierwszych.sito_kubelkowe',
+                      wraps=gcf.sito_kubelkowe) as kubelkowe, \
+                patch('generuj_cache_pierwszych.segmentowane_sito_duze_liczby',
+                      wraps=gcf.segmentowane_sito_duze_liczby) as segmentowane, \
+                patch('sys.stdout'):
+            # sqrt(10**12) = 10**6 > 30000 // 30 - liczby bazowe szersze od segmentu
+            wynik = gcf.pierwsze_w_przedziale(10**12, 10**12 + 1000)
+            self.assertEqual((kubelkowe.call_count, segmentowane.call_count), (1, 0))
+            self.assertEqual(wynik.tolist()[:2], [1000000000039, 1000000000061])
+
+            # sqrt(10**5) ~ 316 < 1000 - zwykłe sito segmentowane
+            gcf.pierwsze_w_przedziale(10**5 - 1000, 10**5)
+            self.assertEqual((kubelkowe.call_count, segmentowane.call_count), (1, 1))
+
+    def test_sito_kubelkowe(self):
+        """Test sita kubełkowego z liczbami bazowymi szerszymi niż segment."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(300007))
+        for rozmiar_segmentu in [300, 3000, 10**6]:
+            for start in [2, 7, 1000, 123457]:
+                wynik = gcf.sito_kubelkowe(300007, rozmiar_segmentu, start=start)
+                oczekiwane = referencja[referencja >= start]
+                self.assertEqual(wynik.tolist(), oczekiwane.tolist(),
+                                 f"{rozmiar_segmentu}, {start}")
+
+    def test_przesiewanie_z_przenoszeniem_wielokrotnosci(self):
+        """Test czy segmenty z przenoszonymi wielokrotnościami są takie jak przesiane od zera."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        bazowe = gcf.generuj_podstawowe_pierwsze(10**7)
+        for start, rozmiar_segmentu in [(1000, 300), (999997, 3000), (5 * 10**6, 2 * 10**5)]:
+            _, granice = gcf._granice_segmentow_kola(start, start + 10**6, rozmiar_segmentu)
+            granice = list(granice)
+            granice[5:7] = []  # Przerwa - wielokrotności liczone od nowa
+            for segment_start, segment_koniec, bloki_start, segment in gcf.przesiewaj_segmenty_kola(
+                    granice, bazowe, start + 10**6, blok_podreczny=256 * 4):
+                oczekiwany = gcf._przesiej_segment_kola(
+                    bloki_start, segment.shape[1], segment_koniec, bazowe)
+                np.testing.assert_array_equal(segment, oczekiwany)
+
+    def test_bitmapa_kola(self):
+        """Test zapisu segmentów do bitmapy koła 30 i jej rozpakowania."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        limit = 20000
+        bazowe = gcf.generuj_podstawowe_pierwsze(limit)
+        bitmapa = np.zeros(limit // 30 + 1, dtype=np.uint8)
+        liczba = 0
+        for start in range(990, limit + 1, 990):
+            liczba += gcf.przesiej_segment_do_bitmapy(
+                max(start, 1013), min(start + 989, limit), bazowe, bitmapa)
+
+        oczekiwane = [p for p in TestSegmentowaneSitoZKolem.pierwsze_referencyjne(limit)
+                      if p >= 1013]
+        self.assertEqual(liczba, len(oczekiwane))
+        wynik = gcf.pierwsze_z_bitmapy_kola(
+            bitmapa, liczba, np.dtype(np.uint32), np.array([2, 3], dtype=np.uint32))
+        self.assertEqual(wynik.tolist(), [2, 3] + oczekiwane)
+
+    def test_tryby_sita_rownoleglego(self):
+        """Test czy tryby z bitmapą i z tablicami dają ten sam wynik na procesach i wątkach."""
+        import generuj_cache_pierwszych as gcf
+
+        oczekiwane = TestSegmentowaneSitoZKolem.pierwsze_referencyjne(100003)
+        for backend in gcf.BACKENDY:
+            for bez_kopiowania in (True, False):
+                wynik = gcf.segmentowane_sito_rownolegle(100003, 9001, 2, bez_kopiowania,
+                                                         backend=backend)
+                self.assertEqual(wynik.tolist(), oczekiwane, backend)
+                wynik = gcf.segmentowane_sito_rownolegle(
+                    100003, 901, 2, bez_kopiowania, segmenty_na_zadanie=7, backend=backend)
+                self.assertEqual(wynik.tolist(), oczekiwane, backend)
+
+    def test_strumien_segmentow(self):
+        """Test strumieniowego sita - kolejność, postęp po segmencie i przerwanie."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        postep = []
+        def zapisz_postep(aktualny, calkowity, prefix):
+            postep.append((aktualny, calkowity, prefix))
+
+        with patch('generuj_cache_pierwszych.PROGRESS_CALLBACK', zapisz_postep):
+            czesci = list(gcf.strumien_segmentow_rownoleglych(100003, 9001, 2, maks_w_locie=2))
+
+        self.assertEqual(np.concatenate(czesci).tolist(),
+                         TestSegmentowaneSitoZKolem.pierwsze_referencyjne(100003))
+        segmenty = [p for p in postep if p[2] == "Segmenty"]
+        self.assertEqual(len(segmenty), len(czesci) - 1)
+        self.assertEqual(segmenty[-1][0], segmenty[-1][1])
+
+        strumien = gcf.strumien_segmentow_rownoleglych(10**6, 10**4, 2, maks_w_locie=2)
+        next(strumien)
+        next(strumien)
+        strumien.close()  # Nie może zawiesić zamykania puli
+
+    def test_imap_ograniczone(self):
+        """Test czy w locie jest najwyżej maks_w_locie zadań."""
+        import threading
+        from multiprocessing.pool import ThreadPool
+        import generuj_cache_pierwszych as gcf
+
+        wyslane = []
+        blokada = threading.Lock()
+
+        def argumenty():
+            for i in range(1, 51):
+                with blokada:
+                    wyslane.append(i)
+                yield i
+
+        with ThreadPool(4) as pool:
+            for odebrane, wynik in enumerate(gcf._imap_ograniczone(pool, abs, argumenty(), 3)):
+                self.assertEqual(wynik, odebrane + 1)
+                with blokada:
+                    self.assertLessEqual(len(wyslane) - (odebrane + 1), 3)
+
+    def test_liczby_bazowe_w_pamieci_wspoldzielonej(self):
+        """Test czy worker widzi liczby bazowe z pamięci współdzielonej."""
+        import numpy as np
+        import generuj_cache_pierwszych as gcf
+
+        bazowe = gcf.generuj_podstawowe_pierwsze(10**6)
+        pamiec = gcf.opublikuj_w_pamieci_wspoldzielonej(bazowe)
+        try:
+            with patch('generuj_cache_pierwszych._PAMIEC_WORKERA'), \
+                    patch('generuj_cache_pierwszych._PIERWSZE_PODSTAWOWE_WORKERA'):
+                gcf._inicjalizuj_worker(pamiec.name, len(bazowe), bazowe.dtype.str)
+                np.testing.assert_array_equal(gcf._PIERWSZE_PODSTAWOWE_WORKERA, bazowe)
+
+                wynik = gcf.przetwarzaj_segment_rownolegle((999000, 1000100))
+                oczekiwane = gcf.segmentowane_sito_z_kolem(999000, 1000100, bazowe)
+                self.assertEqual(wynik.tolist(), oczekiwane.tolist())
+
+                del wynik
+                gcf._PIERWSZE_PODSTAWOWE_WORKERA = None
+                gcf._PAMIEC_WORKERA.close()
+        finally:
+            pamiec.close()
+            pamiec.unlink()
+
+
+class TestRozproszoneGenerowanie(unittest.TestCase):
+    """Testy koordynatora i workerów generowania rozproszonego na jednej maszynie."""
+
+    def test_podzial_na_shardy(self):
+        """Test granic shardów (wielokrotności rozmiaru sharda)."""
+        from rozproszone_generowanie import podziel_na_shardy, parsuj_adres
+
+        self.assertEqual(podziel_na_shardy(2, 25, 10), [(2, 10), (11, 20), (21, 25)])
+        self.assertEqual(podziel_na_shardy(11, 20, 10), [(11, 20)])
+        self.assertEqual(podziel_na_shardy(21, 20, 10), [])
+        self.assertEqual(parsuj_adres('host:6000'), ('host', 6000))
+        self.assertEqual(parsuj_adres('6000'), ('localhost', 6000))
+
+    def test_koordynator_z_workerami(self):
+        """Test scalania shardów od kilku workerów i przydziału sharda utraconego workera."""
+        import numpy as np
+        from io import StringIO
+        from multiprocessing import Process
+        from multiprocessing.connection import Client
+        import rozproszone_generowanie as rg
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(200000))
+        procesy = []
+        klucz = rg.nowy_klucz()
+
+        def po_starcie(adres):
+            # Klient z błędnym kluczem jest odrzucany, a worker, który zrywa
+            # połączenie po otrzymaniu sharda, oddaje go innemu
+            with self.assertRaises(Exception):
+                Client(adres, authkey=b'inny klucz')
+            with Client(adres, authkey=klucz) as polaczenie:
+                polaczenie.send(('worker', 'zawodny'))
+                self.assertEqual(polaczenie.recv()[0], 'shard')
+            for i in range(2):
+                proces = Process(target=rg.uruchom_workera, args=(
+                    adres, katalog, klucz, rg.PARAMETRY_LOKALNEGO_WORKERA, f"w{i}"))
+                proces.start()
+                procesy.append(proces)
+
+        with tempfile.TemporaryDirectory() as katalog, patch('sys.stdout', new_callable=StringIO):
+            istniejace = referencja[referencja <= 10000]
+            wynik = rg.koordynuj(200000, katalog, ('localhost', 0), klucz, rozmiar_shardu=30000,
+                                 pierwsze_istniejace=istniejace, max_sprawdzone=10000,
+                                 po_starcie=po_starcie)
+            for proces in procesy:
+                proces.join(10)
+            self.assertEqual(os.listdir(katalog), [])
+
+        self.assertEqual(wynik.tolist(), referencja.tolist())
+        self.assertEqual([proces.exitcode for proces in procesy], [0, 0])
+
+    def test_scal_shardy_z_otwartego_cache(self):
+        """Test scalania shardów z CachePierwszych - bez rozpakowania całego cache."""
+        import numpy as np
+        import format_cache as fc
+        import rozproszone_generowanie as rg
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(100000))
+        with tempfile.TemporaryDirectory() as katalog:
+            plik_cache = os.path.join(katalog, 'cache.bin')
+            fc.zapisz_pierwsze(referencja[referencja <= 40000], 40000, plik_cache, 'bitmapa')
+            shardy = rg.podziel_na_shardy(40001, 100000, 30000)
+            wyniki = {}
+            for numer, (start, koniec) in enumerate(shardy):
+                plik = rg.nazwa_pliku_shardu(start, koniec)
+                shard = referencja[(referencja >= start) & (referencja <= koniec)]
+                np.save(os.path.join(katalog, plik), shard)
+                wyniki[numer] = (plik, len(shard))
+            with patch('format_cache.wczytaj_dane_cache', side_effect=AssertionError), \
+                    fc.CachePierwszych(plik_cache) as cache:
+                wynik = rg.scal_shardy(katalog, shardy, wyniki, cache, 100000)
+                self.assertEqual(wynik.tolist(), referencja.tolist())
+                # Cache sięga ponad limit - bez shardów zwracany jest sam jego początek
+                wynik = rg.koordynuj(30000, katalog, klucz=rg.nowy_klucz(),
+                                     pierwsze_istniejace=cache, max_sprawdzone=40000)
+                self.assertEqual(wynik.tolist(), referencja[referencja <= 30000].tolist())
+
+            # Shard o innej liczności niż zgłoszona przez workera
+            wyniki[1] = (wyniki[1][0], wyniki[1][1] + 1)
+            with self.assertRaises(ValueError):
+                rg.scal_shardy(katalog, shardy, wyniki, referencja[referencja <= 40000], 100000)
+
+    def test_koordynator_bez_workerow_i_klucza(self):
+        """Test końca czekania, gdy jedyny worker rozłączył się w trakcie sharda, i klucza."""
+        import time
+        from io import StringIO
+        from multiprocessing.connection import Client
+        import rozproszone_generowanie as rg
+
+        klucz = rg.nowy_klucz()
+        self.assertNotEqual(klucz, rg.nowy_klucz())
+        przydzielone = []
+
+        def po_starcie(adres):
+            with Client(adres, authkey=klucz) as polaczenie:
+                polaczenie.send(('worker', 'zawodny'))
+                przydzielone.append(polaczenie.recv())
+
+        with tempfile.TemporaryDirectory() as katalog, \
+                patch('sys.stdout', new_callable=StringIO) as wyjscie:
+            start = time.time()
+            with self.assertRaises(TimeoutError):
+                rg.koordynuj(100000, katalog, ('localhost', 0), klucz, rozmiar_shardu=30000,
+                             po_starcie=po_starcie, limit_bez_workerow=0.5)
+            self.assertLess(time.time() - start, 10)
+            self.assertEqual(przydzielone[0][:2], ('shard', 0))
+            self.assertIn('wraca do kolejki', wyjscie.getvalue())
+
+            with self.assertRaises(ValueError):
+                rg.koordynuj(100000, katalog, ('localhost', 0))
+            with self.assertRaises(ValueError):
+                rg.uruchom_workera(('localhost', 6000), katalog)
+
+
+    def test_lokalne_workery_zatrzymywane_po_przerwaniu(self):
+        """Test czy main zatrzymuje lokalne workery, gdy koordynacja zostaje przerwana."""
+        import signal
+        from io import StringIO
+        from multiprocessing.connection import Listener
+        import rozproszone_generowanie as rg
+
+        uruchomione = []
+        uruchom = rg._uruchom_lokalne_workery
+
+        def uruchom_lokalne(*argumenty):
+            po_starcie, procesy = uruchom(*argumenty)
+            uruchomione.append(procesy)
+            return po_starcie, procesy
+
+        # Nasłuch bez przyjmowania połączeń - workery czekają w uwierzytelnianiu
+        with Listener(('localhost', 0), authkey=b'klucz') as listener, \
+                tempfile.TemporaryDirectory() as katalog:
+            def koordynuj(*argumenty):
+                argumenty[8](listener.address)  # po_starcie
+                raise KeyboardInterrupt
+
+            with patch('sys.argv', ['rozproszone_generowanie.py', '--koordynator', '100000',
+                                    '--nadpisz', '--lokalne-workery', '2', '--katalog', katalog,
+                                    '--klucz', 'klucz']), \
+                    patch('rozproszone_generowanie.koordynuj', koordynuj), \
+                    patch('rozproszone_generowanie._uruchom_lokalne_workery', uruchom_lokalne), \
+                    patch('sys.stdout', new_callable=StringIO):
+                with self.assertRaises(KeyboardInterrupt):
+                    rg.main()
+            procesy = uruchomione[0]
+            self.assertEqual(len(procesy), 2)
+            self.assertEqual([proces.is_alive() for proces in procesy], [False, False])
+            self.assertEqual([proces.exitcode for proces in procesy], [-signal.SIGTERM] * 2)
+
+
+class TestFunkcjePierwszych(unittest.TestCase):
+    """Testy funkcji liczb pierwszych bez ich wyliczania."""
+
+    def test_liczba_pierwszych_do(self):
+        """Test π(x) z sitem referencyjnym i ze znanymi wartościami."""
+        import numpy as np
+        from funkcje_pierwszych import liczba_pierwszych_do
+
+        skumulowane = np.cumsum(np.isin(
+            np.arange(20001), TestSegmentowaneSitoZKolem.pierwsze_referencyjne(20000)))
+        for x in list(range(-3, 400)) + [961, 1000, 1024, 9999, 10007, 20000]:
+            self.assertEqual(liczba_pierwszych_do(x), int(skumulowane[x]) if x >= 0 else 0, x)
+
+        znane = {10**6: 78498, 10**9: 50847534, 10**10: 455052511}
+        for x, pi_x in znane.items():
+            self.assertEqual(liczba_pierwszych_do(x), pi_x)
+
+    def test_n_ta_pierwsza(self):
+        """Test n-tej liczby pierwszej z cache, bez niego i przy cache za krótkim."""
+        import numpy as np
+        from io import StringIO
+        from funkcje_pierwszych import n_ta_pierwsza
+
+        referencyjne = TestSegmentowaneSitoZKolem.pierwsze_referencyjne(20000)
+        with patch('sys.stdout', new_callable=StringIO):
+            for n in list(range(1, 60)) + [168, 169, 1000, 1229, len(referencyjne)]:
+                self.assertEqual(n_ta_pierwsza(n), referencyjne[n - 1], n)
+            self.assertEqual(n_ta_pierwsza(10**6), 15485863)
+
+            cache = np.array(referencyjne[:500], dtype=np.uint32)
+            self.assertEqual(n_ta_pierwsza(500, cache, int(cache[-1])), referencyjne[499])
+            self.assertEqual(n_ta_pierwsza(2000, cache, int(cache[-1])), referencyjne[1999])
+
+        with self.assertRaises(ValueError):
+            n_ta_pierwsza(0)
+
+    def test_wyswietl_n_ta_pierwsza_bez_wczytywania(self):
+        """Test n-tej liczby pierwszej przez CachePierwszych - bez wczytywania całego cache."""
+        import numpy as np
+        from io import StringIO
+        import generuj_cache_pierwszych as gcf
+
+        referencyjne = TestSegmentowaneSitoZKolem.pierwsze_referencyjne(20000)
+        with tempfile.TemporaryDirectory() as katalog:
+            plik = os.path.join(katalog, 'cache.bin')
+            with patch('generuj_cache_pierwszych.PLIK_CACHE_PIERWSZYCH', plik), \
+                    patch('generuj_cache_pierwszych.wczytaj_istniejacy_cache',
+                          side_effect=AssertionError):
+                for pierwsze, max_sprawdzone in [(referencyjne[:1000], referencyjne[999]),
+                                                 (referencyjne, 20000)]:
+                    gcf.zapisz_cache(np.array(pierwsze), max_sprawdzone)
+                    for n in (1, 1000, 2000):
+                        with patch('sys.stdout', new_callable=StringIO) as wyjscie:
+                            gcf.wyswietl_n_ta_pierwsza(n)
+                        self.assertIn(f"p({n:,}) = {referencyjne[n - 1]:,}", wyjscie.getvalue())
+                        self.assertEqual('Odczyt z cache' in wyjscie.getvalue(), n <= len(pierwsze))
+
+    def test_statystyki_cache_z_pi(self):
+        """Test czy statystyki porównują liczność cache z π(max_sprawdzone) na życzenie."""
+        import numpy as np
+        from io import StringIO
+        import generuj_cache_pierwszych as gcf
+
+        with tempfile.TemporaryDirectory() as katalog:
+            plik = os.path.join(katalog, 'cache.pkl')
+            with patch('generuj_cache_pierwszych.PLIK_CACHE_PIERWSZYCH', plik):
+                for pierwsze, oczekiwane in [([2, 3, 5, 7, 11, 13], 'zgodne'),
+                                             ([2, 3, 5, 7, 13], 'NIEZGODNE')]:
+                    gcf.zapisz_cache(np.array(pierwsze), 16)
+                    # Domyślnie sam nagłówek - bez liczenia π(x)
+                    with patch('sys.stdout', new_callable=StringIO) as wyjscie, \
+                            patch('generuj_cache_pierwszych.liczba_pierwszych_do',
+                                  side_effect=AssertionError):
+                        gcf.wyswietl_statystyki_cache()
+                    self.assertIn(f"Liczba liczb pierwszych w cache: {len(pierwsze)}",
+                                  wyjscie.getvalue())
+                    self.assertNotIn("π(16)", wyjscie.getvalue())
+                    with patch('sys.stdout', new_callable=StringIO) as wyjscie:
+                        gcf.wyswietl_statystyki_cache(sprawdz_pi=True)
+                    self.assertIn(f"π(16) = 6 - {oczekiwane} z cache", wyjscie.getvalue())
+
+
+class TestFormatCache(unittest.TestCase):
+    """Testy binarnego formatu cache i odczytu starego pickle."""
+
+    def test_zapis_odczyt_binarny(self):
+        """Test zapisu, odczytu przez np.memmap, doboru typu liczb i wykrywania urwanego pliku."""
+        import numpy as np
+        import format_cache as fc
+
+        with tempfile.TemporaryDirectory() as katalog:
+            # Format rozpoznawany po magii, nie rozszerzeniu
+            plik = os.path.join(katalog, 'cache.pkl')
+            for pierwsze, dtype in [([2, 3, 5, 7], np.uint32), ([2, 4294967311], np.uint64),
+                                    ([], np.uint32)]:
+                fc.zapisz_pierwsze(np.array(pierwsze, dtype=np.int64), 4294967320, plik, 'tablica')
+                self.assertTrue(fc.czy_plik_binarny(plik))
+                wczytane, max_sprawdzone = fc.wczytaj_pierwsze(plik)
+                self.assertEqual(wczytane.tolist(), pierwsze)
+                self.assertEqual(wczytane.dtype, dtype)
+                self.assertEqual(max_sprawdzone, 4294967320)
+            self.assertFalse(os.path.exists(plik + '.tmp'))
+
+            fc.zapisz_pierwsze({13, 2, 7, 3, 11, 5}, 13, plik, 'tablica')
+            wczytane, _ = fc.wczytaj_pierwsze(plik)
+            self.assertIsInstance(wczytane, np.memmap)
+            self.assertEqual(wczytane.tolist(), [2, 3, 5, 7, 11, 13])
+            self.assertEqual(fc.wczytaj_naglowek(plik)['liczba'], 6)
+            self.assertEqual(fc.wczytaj_naglowek(plik)['rozmiar_danych'], 6 * 4)
+
+            del wczytane  # mapowanie zamykane przed skróceniem pliku
+            with open(plik, 'r+b') as f:
+                f.truncate(fc.ROZMIAR_NAGLOWKA + 10)
+            with self.assertRaises(ValueError):
+                fc.wczytaj_pierwsze(plik)
+
+    def test_bitmapa_kola(self):
+        """Test kodowania bitmapą koła: wybór kodowania, odczyt bitów i rozpakowanie przedziałów."""
+        import numpy as np
+        import format_cache as fc
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(100000),
+                              dtype=np.uint32)
+        self.assertEqual(fc.wybierz_kodowanie(referencja, 100000), 'bitmapa')
+        self.assertEqual(fc.wybierz_kodowanie(np.array([2, 99991]), 100000), 'tablica')
+        # Liczby poza zakresem bitmapy
+        self.assertEqual(fc.wybierz_kodowanie(referencja, 99990), 'odstepy')
+
+        with tempfile.TemporaryDirectory() as katalog:
+            plik = os.path.join(katalog, 'cache.bin')
+            fc.zapisz_pierwsze(referencja, 100000, plik)
+            self.assertEqual(fc.wczytaj_naglowek(plik)['rozmiar_danych'], 100000 // 30 + 1)
+            self.assertEqual(fc.wczytaj_naglowek(plik)['liczba'], len(referencja))
+            wczytane, max_sprawdzone = fc.wczytaj_pierwsze(plik)
+            self.assertEqual((wczytane.tolist(), max_sprawdzone), (referencja.tolist(), 100000))
+
+            bitmapa, naglowek = fc.wczytaj_bitmape(plik)
+            liczby = np.arange(-1, 100001)
+            self.assertEqual(np.flatnonzero(fc.czy_pierwsza_w_bitmapie(bitmapa, liczby)).tolist(),
+                             (referencja + 1).tolist())
+            self.assertTrue(fc.czy_pierwsza_w_bitmapie(bitmapa, 99991))
+            self.assertFalse(fc.czy_pierwsza_w_bitmapie(bitmapa, 10**9 + 7))  # poza bitmapą
+            for a, b in [(0, 100000), (3, 31), (89, 97), (90, 96), (99990, 10**6)]:
+                oczekiwane = referencja[(referencja >= a) & (referencja <= b)].tolist()
+                wynik = fc.pierwsze_z_bitmapy(bitmapa, a, b, naglowek['male_pierwsze'])
+                self.assertEqual(wynik.tolist(), oczekiwane, (a, b))
+
+            # Bez liczb 2, 3, 5 w tablicy nie pojawiają się one po odczycie
+            fc.zapisz_pierwsze(referencja[3:], 100000, plik, 'bitmapa')
+            self.assertEqual(fc.wczytaj_pierwsze(plik)[0].tolist(), referencja[3:].tolist())
+
+    def test_odstepy_z_indeksem(self):
+        """Test kodowania odstępami: duże odstępy, przedziały z indeksu bloków i zapis."""
+        import numpy as np
+        import format_cache as fc
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(100000),
+                              dtype=np.uint64)
+        # Rzadki zbiór: przerwa ponad 2*255 i liczby powyżej 2^32 zaczynają nowe bloki
+        rzadkie = np.concatenate((referencja, [4294967311, 4294967357, 10**12 + 39]))
+        indeks, odstepy, male_pierwsze = fc.odstepy_z_pierwszych(rzadkie, 1000)
+        self.assertEqual(male_pierwsze, (2,))
+        self.assertEqual(len(odstepy), len(rzadkie) - 1 - len(indeks))
+        self.assertEqual(indeks['pierwsza'][-2:].tolist(), [4294967311, 10**12 + 39])
+        self.assertEqual(indeks['liczba_przed'][:3].tolist(), [1, 1001, 2001])
+        for a, b in [(0, 10**13), (2, 2), (3, 31), (7900, 8100), (99990, 4294967356),
+                     (10**12, 10**12 + 39)]:
+            oczekiwane = rzadkie[(rzadkie >= a) & (rzadkie <= b)].tolist()
+            self.assertEqual(fc.pierwsze_z_odstepow(indeks, odstepy, a, b, male_pierwsze).tolist(),
+                             oczekiwane, (a, b))
+
+        with self.assertRaises(ValueError):
+            fc.odstepy_z_pierwszych(np.array([3, 5, 8, 11]))
+
+        with tempfile.TemporaryDirectory() as katalog:
+            plik = os.path.join(katalog, 'cache.bin')
+            fc.zapisz_pierwsze(rzadkie, 100000, plik)
+            naglowek = fc.wczytaj_naglowek(plik)
+            self.assertEqual((naglowek['kodowanie'], naglowek['dtype'], naglowek['liczba']),
+                             ('odstepy', np.dtype(np.uint64), len(rzadkie)))
+            self.assertLess(os.path.getsize(plik), len(rzadkie) * 2)
+            wczytane, max_sprawdzone = fc.wczytaj_pierwsze(plik)
+            self.assertEqual((wczytane.tolist(), max_sprawdzone), (rzadkie.tolist(), 100000))
+
+            indeks, odstepy, naglowek = fc.wczytaj_odstepy(plik)
+            wynik = fc.pierwsze_z_odstepow(indeks, odstepy, 89, 101, naglowek['male_pierwsze'])
+            self.assertEqual(wynik.tolist(), [89, 97, 101])
+
+            fc.zapisz_pierwsze(referencja[1:], 100000, plik, 'odstepy')
+            self.assertEqual(fc.wczytaj_pierwsze(plik)[0].tolist(), referencja[1:].tolist())
+
+    def test_cache_pierwszych_ranga_i_wybor(self):
+        """Test zapytań CachePierwszych (ranga, wybór, sąsiednie, przedziały) w każdym kodowaniu."""
+        import numpy as np
+        import format_cache as fc
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(100000),
+                              dtype=np.int64)
+        x = np.array([-3, 0, 1, 2, 3, 4, 5, 29, 30, 31, 7919, 65535, 99990, 99991, 10**6])
+        with tempfile.TemporaryDirectory() as katalog:
+            plik = os.path.join(katalog, 'cache.bin')
+            for kodowanie in fc.KODOWANIA:
+                fc.zapisz_pierwsze(referencja, 100000, plik, kodowanie)
+                with fc.CachePierwszych(plik) as cache:
+                    self.assertEqual((cache.kodowanie, len(cache), cache.max_sprawdzone),
+                                     (kodowanie, len(referencja), 100000))
+                    self.assertEqual(cache.liczba_pierwszych_do(x).tolist(),
+                                     np.searchsorted(referencja, x, 'right').tolist(), kodowanie)
+                    self.assertEqual(cache.liczba_pierwszych_do(7919), 1000)
+                    self.assertEqual(cache.czy_pierwsza(x).tolist(),
+                                     np.isin(x, referencja).tolist())
+                    self.assertTrue(7919 in cache)
+                    self.assertFalse(cache.czy_pierwsza(7917))
+                    self.assertEqual(
+                        [cache.n_ta_pierwsza(k) for k in (1, 2, 3, 4, 1000, len(referencja))],
+                        [2, 3, 5, 7, 7919, int(referencja[-1])])
+                    sasiednie = (cache.nastepna_pierwsza(7919), cache.poprzednia_pierwsza(7919))
+                    self.assertEqual(sasiednie, (7927, 7907))
+                    self.assertEqual((cache.nastepna_pierwsza(99991), cache.poprzednia_pierwsza(2)),
+                                     (None, None))
+                    self.assertEqual(cache.pierwsze_miedzy(89, 101).tolist(), [89, 97, 101])
+                    self.assertEqual(np.concatenate(list(cache.bloki())).tolist(),
+                                     referencja.tolist())
+                    with self.assertRaises(ValueError):
+                        cache.n_ta_pierwsza(len(referencja) + 1)
+
+            with self.assertRaises(FileNotFoundError):
+                fc.CachePierwszych(os.path.join(katalog, 'brak.bin'))
+
+    def test_liczniki_stron_z_pliku(self):
+        """Test liczników stron bitmapy: mapowane z pliku, a bez nich (lub uszkodzone) liczone."""
+        import numpy as np
+        import format_cache as fc
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(100000),
+                              dtype=np.int64)
+        x = np.array([-1, 2, 7919, 7680, 7681, 65535, 99991, 10**6])
+        k = np.array([1, 4, 1000, 5000, len(referencja)])
+
+        def sprawdz(plik, z_pliku):
+            with fc.CachePierwszych(plik) as cache:
+                self.assertEqual(isinstance(cache._liczby_przed_stronami, np.memmap), z_pliku)
+                self.assertEqual(cache.liczba_pierwszych_do(x).tolist(),
+                                 np.searchsorted(referencja, x, 'right').tolist())
+                self.assertEqual([cache.n_ta_pierwsza(int(i)) for i in k],
+                                 referencja[k - 1].tolist())
+
+        with tempfile.TemporaryDirectory() as katalog, \
+                patch('format_cache.ROZMIAR_STRONY_BITMAPY', 256):
+            plik = os.path.join(katalog, 'cache.bin')
+            fc.zapisz_pierwsze(referencja, 100000, plik, 'bitmapa', {'algorytm': 'segmentowany'})
+            naglowek = fc.wczytaj_naglowek(plik)
+            self.assertEqual(naglowek['liczba_stron'], -(-naglowek['rozmiar_danych'] // 256) + 1)
+            self.assertEqual(naglowek['parametry'], {'algorytm': 'segmentowany'})
+            # Zapytania nie przeliczają liczników z bitmapy
+            with patch('format_cache.liczniki_stron', side_effect=AssertionError):
+                sprawdz(plik, True)
+
+            # Inny rozmiar strony niż zapisany - liczniki liczone od nowa
+            with patch('format_cache.ROZMIAR_STRONY_BITMAPY', 512):
+                sprawdz(plik, False)
+
+            # Uszkodzone liczniki są pomijane, a nie dają złych odpowiedzi
+            with open(plik, 'r+b') as f:
+                f.seek(naglowek['przesuniecie_stron'] + 8 * 3)
+                f.write(b'\x7f')
+            sprawdz(plik, False)
+
+            # Plik wersji 2 sprzed liczników (zera w nagłówku, bez tabeli) pozostaje czytelny
+            with open(plik, 'r+b') as f:
+                surowy = bytearray(f.read(fc.ROZMIAR_NAGLOWKA))
+                fc.STRUKTURA_STRON.pack_into(
+                    surowy, fc.ROZMIAR_NAGLOWKA_V1 + fc.STRUKTURA_METADANYCH.size, 0, 0, 0)
+                fc.STRUKTURA_SUMY_NAGLOWKA.pack_into(surowy, fc.ROZMIAR_NAGLOWKA - 4,
+                                                     fc._suma_naglowka(surowy))
+                f.seek(0)
+                f.write(surowy)
+                f.truncate(naglowek['przesuniecie_stron'])
+            self.assertEqual(fc.wczytaj_naglowek(plik)['liczba_stron'], 0)
+            sprawdz(plik, False)
+
+    def test_sumy_kontrolne_i_statystyki(self):
+        """Test metadanych nagłówka v2, wykrywania uszkodzeń sumami CRC32 i odczytu v1."""
+        import time
+        import numpy as np
+        import format_cache as fc
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(100000),
+                              dtype=np.int64)
+        with tempfile.TemporaryDirectory() as katalog:
+            plik = os.path.join(katalog, 'cache.bin')
+            for kodowanie in fc.KODOWANIA:
+                with patch('format_cache.ROZMIAR_BLOKU_SUMY', 1024):
+                    fc.zapisz_pierwsze(referencja, 100000, plik, kodowanie,
+                                       {'algorytm': 'segmentowany', 'procesy': 2})
+                naglowek = fc.wczytaj_naglowek(plik)
+                self.assertEqual((naglowek['wersja'], naglowek['rozmiar_bloku_sum']),
+                                 (fc.WERSJA_FORMATU, 1024))
+                self.assertEqual(naglowek['liczba_sum'], -(-naglowek['rozmiar_danych'] // 1024))
+                statystyki = fc.statystyki_cache(plik)
+                self.assertEqual((statystyki['liczba'], statystyki['najmniejsza'],
+                                  statystyki['najwieksza'], statystyki['max_sprawdzone']),
+                                 (len(referencja), 2, 99991, 100000), kodowanie)
+                self.assertEqual(statystyki['parametry'],
+                                 {'algorytm': 'segmentowany', 'procesy': 2})
+                self.assertAlmostEqual(statystyki['utworzono'], time.time(), delta=60)
+                self.assertEqual(fc.sprawdz_sumy_kontrolne(plik), [])
+
+                # Jeden zmieniony bit w danych - wskazany dokładnie jego blok
+                with open(plik, 'r+b') as f:
+                    f.seek(naglowek['przesuniecie'] + 1024 + 5)
+                    bajt = f.read(1)[0]
+                    f.seek(-1, os.SEEK_CUR)
+                    f.write(bytes([bajt ^ 1]))
+                self.assertEqual(fc.sprawdz_sumy_kontrolne(plik), [1])
+
+                # Uszkodzony nagłówek zgłaszany przed jakimkolwiek odczytem danych
+                with open(plik, 'r+b') as f:
+                    f.seek(20)
+                    f.write(b'\x07')
+                with self.assertRaises(ValueError):
+                    fc.wczytaj_naglowek(plik)
+
+            # Plik v1 (64-bajtowy nagłówek, bez sum) pozostaje czytelny
+            with open(plik, 'wb') as f:
+                naglowek = fc.STRUKTURA_NAGLOWKA.pack(fc.MAGIA_FORMATU, 1, 0, b'<u4', 100, 25,
+                                                      0, 0, 0, 0)
+                f.write(naglowek.ljust(fc.ROZMIAR_NAGLOWKA_V1, b'\0'))
+                f.write(referencja[:25].astype('<u4').tobytes())
+            self.assertEqual(fc.wczytaj_pierwsze(plik)[0].tolist(), referencja[:25].tolist())
+            statystyki = fc.statystyki_cache(plik)
+            self.assertEqual((statystyki['najmniejsza'], statystyki['najwieksza'],
+                              statystyki['utworzono']), (2, 97, None))
+            with self.assertRaises(ValueError):
+                fc.sprawdz_sumy_kontrolne(plik)
+            fc.migruj_cache(plik, plik)
+            self.assertEqual(fc.wczytaj_naglowek(plik)['wersja'], fc.WERSJA_FORMATU)
+            self.assertEqual(fc.sprawdz_sumy_kontrolne(plik), [])
+
+    def test_pamiec_zapisu(self):
+        """Test oszacowania buforów zapisu - nie mniej niż tracemalloc w każdym kodowaniu."""
+        import tracemalloc
+        import numpy as np
+        import format_cache as fc
+
+        referencja = np.array(TestSegmentowaneSitoZKolem.pierwsze_referencyjne(10**6),
+                              dtype=np.uint32)
+        with tempfile.TemporaryDirectory() as katalog:
+            plik = os.path.join(katalog, 'cache.bin')
+            for kodowanie in fc.KODOWANIA:
+                tracemalloc.start()
+                try:
+                    fc.zapisz_pierwsze(referencja, 10**6, plik, kodowanie)
+                    szczyt = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                oszacowanie = fc.pamiec_zapisu(len(referencja), 10**6, kodowanie=kodowanie)
+                self.assertLessEqual(szczyt, oszacowanie, kodowanie)
+        self.assertGreater(fc.pamiec_zapisu(len(referencja), 10**6), 10**6 // fc.ROZMIAR_KOLA)
+        # Bez bitmapy (liczby poza zakresem) maksimum nie obejmuje całej bitmapy
+        self.assertLess(fc.pamiec_zapisu(10, 10**12, najwieksza=2 * 10**12),
+                        10**12 // fc.ROZMIAR_KOLA)
+
+    def test_stary_pickle_i_migracja(self):
+        """Test odczytu starego cache (pickle ze zbiorem), pliku zastępczego i migracji."""
+        import pickle
+        import format_cache as fc
+
+        with tempfile.TemporaryDirectory() as katalog:
+            stary = os.path.join(katalog, 'stary.pkl')
+            nowy = os.path.join(katalog, 'nowy.bin')
+            with open(stary, 'wb') as f:
+                pickle.dump({'pierwsze': {7, 2, 5, 3}, 'max_sprawdzone': 10}, f)
+
+            self.assertFalse(fc.czy_plik_binarny(stary))
+            pierwsze, max_sprawdzone = fc.wczytaj_pierwsze(stary)
+            self.assertEqual((pierwsze.tolist(), max_sprawdzone), ([2, 3, 5, 7], 10))
+
+            # Domyślny plik binarny, którego nie ma, zastępuje stary pickle
+            with patch('format_cache.PLIK_CACHE_PIERWSZYCH', nowy), \
+                    patch('format_cache.PLIK_CACHE_PICKLE', stary):
+                self.assertEqual(fc.znajdz_plik_cache(nowy), stary)
+                wynik = fc.migruj_cache(stary, nowy)
+                self.assertEqual(fc.znajdz_plik_cache(nowy), nowy)
+            self.assertEqual(wynik['liczba'], 4)
+            self.assertTrue(fc.czy_plik_binarny(nowy))
+            self.assertEqual(fc.wczytaj_pierwsze(nowy)[0].tolist(), [2, 3, 5, 7])
+            self.assertTrue(os.path.exists(stary))
+
+
 class TestWykresGestosci(unittest.TestCase):
     """Testy generatora wykresu gęstości."""
 
@@ -214,6 +1351,28 @@ class TestWykresGestosci(unittest.TestCase):
             self.assertTrue(hasattr(wgp, funkcja),
                             f"Funkcja {funkcja} nie istnieje w module")
 
+    def test_gestosc_z_posortowanej_tablicy(self):
+        """Test liczenia pierwszych w przedziałach na posortowanej tablicy."""
+        import numpy as np
+        import wykres_gestosci_pierwszych as wgp
+
+        pierwsze = np.array([2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47])
+        from io import StringIO
+        with patch('sys.stdout', StringIO()):
+            przedzialy, gestosci, liczby = wgp.oblicz_gestosc_w_przedziałach(pierwsze, 50, 10)
+
+        self.assertEqual(przedzialy, [7.0, 17.0, 27.0, 37.0, 46.0])
+        self.assertEqual(liczby, [5, 3, 3, 2, 2])
+        self.assertEqual(gestosci[0], 50.0)
+
+        # Ten sam wynik z rang otwartego cache (bitmapa)
+        import format_cache as fc
+        with tempfile.TemporaryDirectory() as katalog:
+            plik = os.path.join(katalog, 'cache.bin')
+            fc.zapisz_pierwsze(pierwsze, 50, plik, 'bitmapa')
+            with patch('sys.stdout', StringIO()), fc.CachePierwszych(plik) as cache:
+                self.assertEqual(wgp.oblicz_gestosc_w_przedziałach(cache, 50, 10)[2], liczby)
+
 
 class TestPobierzDopisz(unittest.TestCase):
     """Testy modułu pobierania i dopisywania liczb pierwszych."""
@@ -35,6 +35,26 @@ class TestCzyPierwsza(unittest.TestCase):
         for z in zlozone:
             self.assertFalse(czy_pierwsza(z), f"{z} nie powinno być pierwsze")
 
+    def test_wsadowo(self):
+        """Test wsadowego sprawdzania tablic - pasy 32-bitowe, większe i obiektowe."""
+        from pierwszosc import czy_pierwsza_wsadowo
+
+        tablice = [
+            np.arange(-10, 20000),
+            np.arange(2**32 - 3000, 2**32 + 3000, dtype=np.uint64),
+            np.arange(10**12, 10**12 + 3000),
+            np.arange(2**50 - 1000, 2**50 + 1000),
+            np.array([3215031751, 3474749660383, 341550071728321, 2**61 - 1], dtype=np.int64),
+            np.array([2**64 - 59, 2**64 - 1], dtype=np.uint64),
+            np.array([2**89 - 1, 2**89 + 1, 7], dtype=object),
+        ]
+        for tablica in tablice:
+            oczekiwane = [czy_pierwsza(int(n)) for n in tablica.tolist()]
+            self.assertEqual(czy_pierwsza_wsadowo(tablica).tolist(), oczekiwane)
+
+        wynik = czy_pierwsza_wsadowo(np.array([[2, 4], [97, 9409]]))
+        self.assertEqual(wynik.tolist(), [[True, False], [True, False]])
+
     def test_przypadki_brzegowe(self):
         """Test przypadków brzegowych."""
         self.assertFalse(czy_pierwsza(0))
@@ -47,6 +67,31 @@ class TestCzyPierwsza(unittest.TestCase):
         for p in duze_pierwsze:
             self.assertTrue(czy_pierwsza(p), f"{p} powinno być pierwsze")
 
+    def test_zgodnosc_z_sitem(self):
+        """Test zgodności Millera-Rabina z sitem Eratostenesa."""
+        limit = 200000
+        sito = np.ones(limit + 1, dtype=bool)
+        sito[:2] = False
+        for i in range(2, int(limit ** 0.5) + 1):
+            if sito[i]:
+                sito[i * i::i] = False
+        self.assertEqual([n for n in range(limit + 1) if czy_pierwsza(n)],
+                         np.flatnonzero(sito).tolist())
+
+    def test_liczby_64_bitowe(self):
+        """Test liczb 64-bitowych i silnych pseudopierwszych dla mniejszych zbiorów świadków."""
+        pierwsze = [2**31 - 1, 10**9 + 7, 999999999989, 2**61 - 1, 2**64 - 59]
+        for p in pierwsze:
+            self.assertTrue(czy_pierwsza(p), f"{p} powinno być pierwsze")
+
+        # Najmniejsze silne pseudopierwsze dla kolejnych zbiorów świadków, liczby
+        # Carmichaela i iloczyny dużych liczb pierwszych
+        zlozone = [2047, 1373653, 25326001, 3215031751, 2152302898747, 3474749660383,
+                   341550071728321, 3825123056546413051, 561, 41041, 825265,
+                   (2**31 - 1) * (10**9 + 7), 4294967291 * 4294967279]
+        for z in zlozone:
+            self.assertFalse(czy_pierwsza(z), f"{z} nie powinno być pierwsze")
+
 
 class TestGenerujWspolrzedneSpirali(unittest.TestCase):
     """Testy funkcji generowania współrzędnych spirali."""
@@ -11,57 +11,40 @@ import os
 import pickle
 import numpy as np
 import matplotlib.pyplot as plt
-from typing import List, Tuple, Set
+from typing import List, Optional, Tuple, Set
 import xml.etree.ElementTree as ET
 
+from pierwszosc import czy_pierwsza, czy_pierwsza_wsadowo, ROZMIAR_BLOKU_WSADOWEGO
+from format_cache import PLIK_CACHE_PIERWSZYCH, CachePierwszych, zapisz_pierwsze
 
-def czy_pierwsza(n: int) -> bool:
-    """Wysoce zoptymalizowane sprawdzanie pierwszości z faktoryzacją kołową."""
-    if n < 2:
-        return False
-    if n == 2 or n == 3:
-        return True
-    if n % 2 == 0 or n % 3 == 0:
-        return False
 
-    # Użyj faktoryzacji kołowej 6k±1 - sprawdzaj tylko liczby postaci 6k±1
-    i = 5
-    sqrt_n = int(math.sqrt(n)) + 1
-    while i < sqrt_n:
-        if n % i == 0 or n % (i + 2) == 0:
-            return False
-        i += 6
-    return True
-
-
-# Nazwa pliku cache dla liczb pierwszych
-PLIK_CACHE_PIERWSZYCH = "pierwsze_cache.pkl"
+def otworz_cache_pierwszych() -> Optional[CachePierwszych]:
+    """Otwórz cache liczb pierwszych (mapowany, bez wczytywania liczb) albo None, gdy go brak."""
+    try:
+        return CachePierwszych(PLIK_CACHE_PIERWSZYCH)
+    except (FileNotFoundError, pickle.UnpicklingError, KeyError, ValueError):
+        return None
 
 
-def wczytaj_cache_pierwszych() -> Tuple[Set[int], int]:
-    """Wczytaj cache liczb pierwszych z pliku. Zwraca (zbiór_pierwszych, maksymalna_sprawdzona_liczba)."""
-    if not os.path.exists(PLIK_CACHE_PIERWSZYCH):
-        return set(), 1
+def wczytaj_cache_pierwszych(limit: int = None) -> Tuple[Set[int], int]:
+    """
+    Wczytaj cache liczb pierwszych z pliku. Zwraca (zbiór_pierwszych, maksymalna_sprawdzona_liczba).
 
-    try:
-        with open(PLIK_CACHE_PIERWSZYCH, 'rb') as f:
-            dane = pickle.load(f)
-            pierwsze = dane.get('pierwsze', set())
-            max_sprawdzone = dane.get('max_sprawdzone', 1)
-            return pierwsze, max_sprawdzone
-    except (FileNotFoundError, pickle.UnpicklingError, KeyError):
+    Z limitem zbiór zawiera tylko liczby pierwsze <= limit - odczytywana jest tylko ta część pliku.
+    """
+    cache = otworz_cache_pierwszych()
+    if cache is None:
         return set(), 1
+    with cache:
+        # Spirala potrzebuje zbioru
+        return set(cache.pierwsze_miedzy(2, limit).tolist()), max(cache.max_sprawdzone, 1)
 
 
 def zapisz_cache_pierwszych(pierwsze: Set[int], max_sprawdzone: int):
     """Zapisz cache liczb pierwszych do pliku."""
     try:
-        dane = {
-            'pierwsze': pierwsze,
-            'max_sprawdzone': max_sprawdzone
-        }
-        with open(PLIK_CACHE_PIERWSZYCH, 'wb') as f:
-            pickle.dump(dane, f)
+        # Ten sam format co generator cache - binarna posortowana tablica liczb
+        zapisz_pierwsze(pierwsze, max_sprawdzone, PLIK_CACHE_PIERWSZYCH)
     except Exception as e:
         print(f"  Ostrzeżenie: Nie można zapisać cache liczb pierwszych: {e}")
 
@@ -84,7 +67,7 @@ def sito_eratostenesa_z_cache(limit: int) -> Set[int]:
         return set()
 
     print(f"    Krok 1/4: Wczytywanie cache liczb pierwszych...")
-    pierwsze_cache, max_sprawdzone = wczytaj_cache_pierwszych()
+    pierwsze_cache, max_sprawdzone = wczytaj_cache_pierwszych(limit)
 
     if max_sprawdzone >= limit:
         # Cache zawiera wszystkie potrzebne liczby pierwsze
@@ -163,7 +146,7 @@ def sprawdzanie_pierwszosci_z_cache(n: int) -> Set[int]:
     print(f"  Używanie zoptymalizowanego sprawdzania indywidualnego z cache dla {n:,} liczb...")
 
     # Wczytaj cache
-    pierwsze_cache, max_sprawdzone = wczytaj_cache_pierwszych()
+    pierwsze_cache, max_sprawdzone = wczytaj_cache_pierwszych(n)
     pierwsze = set(pierwsze_cache)
 
     if max_sprawdzone >= n:
@@ -185,11 +168,12 @@ def sprawdzanie_pierwszosci_z_cache(n: int) -> Set[int]:
     if start_range % 2 == 0:  # Upewnij się że zaczynamy od liczby nieparzystej
         start_range += 1
 
-    for i in range(start_range, n + 1, 2):
-        if i % max(1, n // 100) == 0 or i == n or (i == n - 1 and n % 2 == 0):
-            wyswietl_postep(i, n, "  Sprawdzanie pierwszości")
-        if czy_pierwsza(i):
-            pierwsze.add(i)
+    # Blokami testem wsadowym
+    for blok_start in range(start_range, n + 1, 2 * ROZMIAR_BLOKU_WSADOWEGO):
+        liczby = np.arange(blok_start, min(blok_start + 2 * ROZMIAR_BLOKU_WSADOWEGO, n + 1), 2,
+                           dtype=np.int64)
+        pierwsze.update(liczby[czy_pierwsza_wsadowo(liczby)].tolist())
+        wyswietl_postep(int(liczby[-1]), n, "  Sprawdzanie pierwszości")
 
     # Upewnij się, że pasek postępu jest zakończony
     wyswietl_postep(n, n, "  Sprawdzanie pierwszości")
@@ -8,8 +8,8 @@ import sys
 import os
 import io
 import base64
+from datetime import datetime, timezone
 from typing import Dict, Any, Set, Callable
-import pickle
 
 # Add parent directory to path to import existing modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,17 +19,25 @@ import generuj_cache_pierwszych
 import wykres_gestosci_pierwszych
 import eksportuj_cache_do_csv
 import sprawdz_cache_pierwszych
+import funkcje_pierwszych
+from format_cache import PLIK_CACHE_PIERWSZYCH, PLIK_CACHE_PICKLE, CachePierwszych, \
+    czy_plik_binarny, statystyki_cache
 
-PLIK_CACHE_PIERWSZYCH = "pierwsze_cache.pkl"
+# Export formats accepted by export_csv_wrapper
+EXPORT_FORMATS = ("basic", "advanced", "chunks")
+
+# Directory CSV exports are written to - the one /api/download-csv serves files from
+EXPORT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 def get_cache_stats() -> Dict[str, Any]:
     """Get statistics about the current cache."""
     try:
-        cache_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            PLIK_CACHE_PIERWSZYCH
-        )
+        cache_dir = os.path.dirname(os.path.abspath(__file__))
+        cache_path = os.path.join(cache_dir, PLIK_CACHE_PIERWSZYCH)
+        if not os.path.exists(cache_path):
+            # Legacy pickle cache, until it is migrated
+            cache_path = os.path.join(cache_dir, PLIK_CACHE_PICKLE)
         
         if not os.path.exists(cache_path):
             return {
@@ -39,18 +47,21 @@ def get_cache_stats() -> Dict[str, Any]:
                 "size_mb": 0
             }
         
-        with open(cache_path, 'rb') as f:
-            data = pickle.load(f)
-            pierwsze = data['pierwsze']
-            max_sprawdzone = data['max_sprawdzone']
-        
-        file_size = os.path.getsize(cache_path) / (1024 * 1024)
+        # Binary v2 cache: everything comes from the header, without reading the primes
+        stats = statystyki_cache(cache_path)
+        created = stats['utworzono']
         
         return {
             "exists": True,
-            "count": len(pierwsze),
-            "max_value": max_sprawdzone,
-            "size_mb": round(file_size, 2)
+            "count": stats['liczba'],
+            "max_value": stats['max_sprawdzone'],
+            "min_prime": stats['najmniejsza'],
+            "max_prime": stats['najwieksza'],
+            "size_mb": round(stats['rozmiar_pliku'] / (1024 * 1024), 2),
+            "format": 'binary' if czy_plik_binarny(cache_path) else 'pickle',
+            "created": (datetime.fromtimestamp(created, timezone.utc).isoformat()
+                        if created is not None else None),
+            "generator": stats['parametry']
         }
     except Exception as e:
         return {
@@ -81,7 +92,7 @@ def generate_cache_wrapper(limit: int, progress_callback: Callable = None) -> Di
         zasoby = generuj_cache_pierwszych.wykryj_zasoby_systemu()
         parametry = generuj_cache_pierwszych.oblicz_optymalne_parametry(limit, zasoby)
         pierwsze = generuj_cache_pierwszych.sito_eratostenesa_dla_cache(limit, parametry)
-        generuj_cache_pierwszych.zapisz_cache(pierwsze, limit)
+        generuj_cache_pierwszych.zapisz_cache(pierwsze, limit, parametry)
         
         # Clear callback after completion
         generuj_cache_pierwszych.PROGRESS_CALLBACK = None
@@ -125,7 +136,7 @@ def generate_ulam_spiral_wrapper(n: int = 1000, colorful: bool = False,
         import matplotlib.pyplot as plt
         
         # Load prime cache
-        pierwsze, max_sprawdzone = ulam_spiral.wczytaj_cache_pierwszych()
+        pierwsze, max_sprawdzone = ulam_spiral.wczytaj_cache_pierwszych(n)
         
         # Generate spiral
         wspolrzedne = ulam_spiral.generuj_wspolrzedne_spirali(n)
@@ -198,7 +209,7 @@ def generate_density_chart_wrapper(interval: int = 10000,
         matplotlib.use('Agg')
         import matplotlib.pyplot as plt
         
-        # Load cache
+        # Load cache (memory-mapped - interval counts come from rank queries)
         pierwsze, max_sprawdzone = wykres_gestosci_pierwszych.wczytaj_cache()
         
         if max_range is None or max_range > max_sprawdzone:
@@ -250,29 +261,103 @@ def export_csv_wrapper(format_type: str = "basic",
         chunk_size: Size of chunks if using chunked export
     
     Returns:
-        Dictionary with file path and info
+        Dictionary with the generated file names (in EXPORT_DIR) under "data"
     """
+    if format_type not in EXPORT_FORMATS:
+        return {
+            "success": False,
+            "error": "Invalid format. Must be 'basic', 'advanced', or 'chunks'",
+            "code": "INVALID_FORMAT"
+        }
+    
     try:
-        # Load cache
-        pierwsze, max_sprawdzone = eksportuj_cache_do_csv.wczytaj_cache()
-        
-        output_file = f"primes_export_{format_type}.csv"
-        
-        if format_type == "basic":
-            eksportuj_cache_do_csv.eksportuj_do_csv_podstawowy(pierwsze, output_file)
-        elif format_type == "advanced":
-            eksportuj_cache_do_csv.eksportuj_do_csv_zaawansowany(pierwsze, output_file)
-        elif format_type == "chunks":
-            eksportuj_cache_do_csv.eksportuj_do_csv_w_chunkach(
-                pierwsze, "primes_chunk", chunk_size
-            )
-            output_file = f"primes_chunk_*.csv (multiple files)"
+        # Open the cache memory-mapped - exporters stream it block by block
+        try:
+            pierwsze, max_sprawdzone = eksportuj_cache_do_csv.wczytaj_cache(
+                generuj_cache_pierwszych.PLIK_CACHE_PIERWSZYCH)
+        except FileNotFoundError:
+            return {
+                "success": False,
+                "error": "No cache available. Generate cache first.",
+                "code": "NO_CACHE"
+            }
+        
+        output_file = os.path.join(EXPORT_DIR, f"primes_export_{format_type}.csv")
+        
+        with pierwsze:
+            total_primes = len(pierwsze)
+            if format_type == "basic":
+                success = eksportuj_cache_do_csv.eksportuj_do_csv_podstawowy(pierwsze, output_file)
+                files = [output_file]
+            elif format_type == "advanced":
+                success = eksportuj_cache_do_csv.eksportuj_do_csv_zaawansowany(
+                    pierwsze, output_file)
+                files = [output_file]
+            else:
+                success = eksportuj_cache_do_csv.eksportuj_do_csv_w_chunkach(
+                    pierwsze, output_file, chunk_size
+                )
+                files = eksportuj_cache_do_csv.nazwy_chunkow(output_file, total_primes, chunk_size)
+        
+        if not success:
+            return {
+                "success": False,
+                "error": "CSV export failed",
+                "code": "EXPORT_ERROR"
+            }
+        
+        data = {
+            "files": [os.path.basename(path) for path in files],
+            "total_primes": total_primes,
+            "format": format_type
+        }
+        if format_type == "chunks":
+            data["chunk_size"] = chunk_size
+            data["num_chunks"] = len(files)
         
         return {
             "success": True,
-            "file": output_file,
-            "count": len(pierwsze),
-            "format": format_type
+            "data": data
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"CSV export failed: {e}",
+            "code": "EXPORT_ERROR"
+        }
+
+
+def nth_prime_wrapper(n: int) -> Dict[str, Any]:
+    """
+    Find the n-th prime without a cache that reaches it.
+    
+    Args:
+        n: Index of the prime (1 -> 2)
+    
+    Returns:
+        Dictionary with the prime and whether the cache answered directly
+    """
+    try:
+        from_cache = False
+        try:
+            # Select straight from the memory-mapped cache, without loading it;
+            # the cache is closed before the fallback runs
+            with CachePierwszych(generuj_cache_pierwszych.PLIK_CACHE_PIERWSZYCH) as cache:
+                from_cache = len(cache) >= n
+                if from_cache:
+                    prime = cache.n_ta_pierwsza(n)
+        except FileNotFoundError:
+            pass
+        
+        if not from_cache:
+            prime = funkcje_pierwszych.n_ta_pierwsza(n)
+        
+        return {
+            "success": True,
+            "n": n,
+            "prime": prime,
+            "from_cache": from_cache
         }
         
     except Exception as e:
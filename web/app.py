@@ -19,7 +19,8 @@ from api_helpers import (
     generate_ulam_spiral_wrapper,
     generate_density_chart_wrapper,
     export_csv_wrapper,
-    verify_cache_wrapper
+    verify_cache_wrapper,
+    nth_prime_wrapper
 )
 
 # Initialize Flask app
@@ -164,6 +165,32 @@ def verify_cache():
     return jsonify(result)
 
 
+@app.route('/api/nth-prime', methods=['POST'])
+def nth_prime():
+    """Find the n-th prime (pi(x) estimate plus a short window sieve)."""
+    data = request.get_json()
+    
+    if 'n' not in data:
+        return jsonify({
+            'success': False,
+            'error': 'Parameter n is required',
+            'code': 'MISSING_PARAMETER'
+        }), 400
+    
+    n = data.get('n')
+    
+    # Validate index range (pi(x) near p_n for n = 10^11 takes about 10 seconds)
+    if not isinstance(n, int) or n < 1 or n > 100000000000:
+        return jsonify({
+            'success': False,
+            'error': 'n must be between 1 and 100,000,000,000',
+            'code': 'INVALID_INDEX'
+        }), 400
+    
+    result = nth_prime_wrapper(n)
+    return jsonify(result)
+
+
 @app.route('/api/download-csv/<filename>')
 def download_csv(filename):
     """Download generated CSV file."""
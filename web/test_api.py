@@ -8,6 +8,7 @@ Tests cover all REST API endpoints:
 - POST /api/density-chart
 - POST /api/export-csv
 - POST /api/verify-cache
+- POST /api/nth-prime
 """
 
 import unittest
@@ -35,7 +36,15 @@ class TestWebAPI(unittest.TestCase):
         
         # Create temporary directory for test files
         self.test_dir = tempfile.mkdtemp()
-        self.test_cache_path = os.path.join(self.test_dir, 'test_cache.pkl')
+        
+        # Cache and CSV exports live in the temporary directory, not in cwd
+        self.cache_path = os.path.join(self.test_dir, PLIK_CACHE_PIERWSZYCH)
+        for target, value in [('generuj_cache_pierwszych.PLIK_CACHE_PIERWSZYCH', self.cache_path),
+                              ('ulam_spiral.PLIK_CACHE_PIERWSZYCH', self.cache_path),
+                              ('api_helpers.EXPORT_DIR', self.test_dir)]:
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
         
     def tearDown(self):
         """Clean up temporary files."""
@@ -129,23 +138,48 @@ class TestWebAPI(unittest.TestCase):
         data = json.loads(response.data)
         self.assertFalse(data['success'])
     
+    def _write_test_cache(self, primes, max_checked):
+        """Write a binary cache into the test directory."""
+        from format_cache import zapisz_pierwsze
+        zapisz_pierwsze(primes, max_checked, self.cache_path)
+    
+    def _export(self, body):
+        """POST /api/export-csv (exporters print progress)."""
+        with patch('sys.stdout'):
+            response = self.client.post('/api/export-csv',
+                                       json=body,
+                                       content_type='application/json')
+        return json.loads(response.data)
+    
     def test_export_csv_basic_format(self):
         """Test CSV export with basic format."""
-        # Create test cache first
-        import pickle
-        test_primes = [2, 3, 5, 7, 11]
-        with open(self.test_cache_path, 'wb') as f:
-            pickle.dump(test_primes, f)
+        self._write_test_cache([2, 3, 5, 7, 11], 12)
         
-        with patch('api_helpers.os.path.dirname', return_value=self.test_dir):
-            response = self.client.post('/api/export-csv',
-                                       json={'format': 'basic'},
-                                       content_type='application/json')
-            
-            data = json.loads(response.data)
-            if data['success']:
-                self.assertEqual(data['data']['format'], 'basic')
-                self.assertIn('files', data['data'])
+        data = self._export({'format': 'basic'})
+        self.assertTrue(data['success'])
+        self.assertEqual(data['data'], {'files': ['primes_export_basic.csv'],
+                                        'total_primes': 5, 'format': 'basic'})
+        with open(os.path.join(self.test_dir, 'primes_export_basic.csv')) as f:
+            self.assertEqual(f.read().split(), ['liczba_pierwsza', '2', '3', '5', '7', '11'])
+    
+    def test_export_csv_chunks_format(self):
+        """Test CSV export split into chunks lists every chunk file."""
+        self._write_test_cache([2, 3, 5, 7, 11], 12)
+        
+        data = self._export({'format': 'chunks', 'chunk_size': 2})
+        self.assertTrue(data['success'])
+        self.assertEqual(data['data']['files'], ['primes_export_chunks_chunk_001.csv',
+                                                 'primes_export_chunks_chunk_002.csv',
+                                                 'primes_export_chunks_chunk_003.csv'])
+        self.assertEqual(data['data']['num_chunks'], 3)
+        for name in data['data']['files']:
+            self.assertTrue(os.path.exists(os.path.join(self.test_dir, name)))
+    
+    def test_export_csv_no_cache(self):
+        """Test CSV export without a cache."""
+        data = self._export({'format': 'basic'})
+        self.assertFalse(data['success'])
+        self.assertEqual(data['code'], 'NO_CACHE')
     
     # POST /api/verify-cache Tests
     
@@ -160,6 +194,52 @@ class TestWebAPI(unittest.TestCase):
             self.assertFalse(data['success'])
             self.assertIn('does not exist', data['error'].lower())
     
+    # POST /api/nth-prime Tests
+    
+    def test_nth_prime_missing_parameter(self):
+        """Test n-th prime lookup with missing parameter."""
+        response = self.client.post('/api/nth-prime',
+                                   json={},
+                                   content_type='application/json')
+        
+        data = json.loads(response.data)
+        self.assertFalse(data['success'])
+        self.assertIn('required', data['error'].lower())
+    
+    def test_nth_prime_invalid_index(self):
+        """Test n-th prime lookup with invalid index."""
+        response = self.client.post('/api/nth-prime',
+                                   json={'n': 0},
+                                   content_type='application/json')
+        
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(data['success'])
+    
+    def test_nth_prime_valid(self):
+        """Test n-th prime lookup without a cache."""
+        response = self.client.post('/api/nth-prime',
+                                   json={'n': 100000},
+                                   content_type='application/json')
+        
+        data = json.loads(response.data)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['prime'], 1299709)
+        self.assertFalse(data['from_cache'])
+    
+    def test_nth_prime_closes_short_cache(self):
+        """Test n-th prime beyond the cache - the cache is closed before the fallback."""
+        from format_cache import CachePierwszych
+        self._write_test_cache([2, 3, 5, 7, 11], 12)
+        with patch.object(CachePierwszych, 'zamknij', autospec=True) as close:
+            response = self.client.post('/api/nth-prime',
+                                       json={'n': 6},
+                                       content_type='application/json')
+        
+        data = json.loads(response.data)
+        self.assertEqual((data['prime'], data['from_cache']), (13, False))
+        close.assert_called_once()
+    
     # API Helper Functions Tests
     
     def test_get_cache_stats_helper(self):
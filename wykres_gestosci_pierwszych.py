@@ -9,12 +9,11 @@ import math
 import matplotlib.pyplot as plt
 import numpy as np
 import os
-import pickle
 import sys
-from typing import Set, List, Tuple
+from typing import Iterable, List, Tuple, Union
 
-# Nazwa domyślnego pliku cache
-PLIK_CACHE_PIERWSZYCH = "pierwsze_cache.pkl"
+from funkcje_pierwszych import liczba_pierwszych_do
+from format_cache import PLIK_CACHE_PIERWSZYCH, CachePierwszych, znajdz_plik_cache
 
 
 def wyswietl_postep(aktualny, calkowity, prefix="Postęp", dlugosc=50):
@@ -29,28 +28,24 @@ def wyswietl_postep(aktualny, calkowity, prefix="Postęp", dlugosc=50):
         sys.stdout.flush()
 
 
-def wczytaj_cache(nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH) -> Tuple[Set[int], int]:
-    """Wczytaj cache liczb pierwszych z pliku."""
-    if not os.path.exists(nazwa_pliku):
+def wczytaj_cache(nazwa_pliku: str = PLIK_CACHE_PIERWSZYCH) -> Tuple[CachePierwszych, int]:
+    """
+    Otwórz cache liczb pierwszych z pliku (mapowany - gęstość liczona rangami,
+    bez wczytywania liczb).
+    """
+    if not os.path.exists(znajdz_plik_cache(nazwa_pliku)):
         raise FileNotFoundError(f"Plik cache '{nazwa_pliku}' nie istnieje")
 
     try:
-        with open(nazwa_pliku, 'rb') as f:
-            dane = pickle.load(f)
-
-        pierwsze = dane.get('pierwsze', set())
-        max_sprawdzone = dane.get('max_sprawdzone', 0)
-
-        if not isinstance(pierwsze, set):
-            pierwsze = set(pierwsze) if pierwsze else set()
-
-        return pierwsze, max_sprawdzone
+        # Starsze pliki cache (pickle) są wczytywane do pamięci i sortowane raz przy otwarciu
+        cache = CachePierwszych(nazwa_pliku)
+        return cache, cache.max_sprawdzone
 
     except Exception as e:
         raise Exception(f"Błąd podczas wczytywania cache: {e}")
 
 
-def oblicz_gestosc_w_przedziałach(pierwsze: Set[int],
+def oblicz_gestosc_w_przedziałach(pierwsze: Union[CachePierwszych, Iterable[int]],
                                   max_zakres: int,
                                   rozmiar_przedzialu: int = 10000) -> Tuple[List[int],
                                                                             List[float],
@@ -59,47 +54,38 @@ def oblicz_gestosc_w_przedziałach(pierwsze: Set[int],
     Oblicz gęstość liczb pierwszych w przedziałach.
 
     Args:
-        pierwsze: Zbiór liczb pierwszych
+        pierwsze: Otwarty cache albo posortowana tablica liczb pierwszych (zbiór jest sortowany)
         max_zakres: Maksymalny zakres do analizy
         rozmiar_przedzialu: Rozmiar każdego przedziału
 
     Returns:
         Tuple: (środki_przedziałów, gęstości, liczby_pierwszych_w_przedziałach)
     """
-    przedzialy = []
-    gestosci = []
-    liczby_w_przedziałach = []
-
-    # Oblicz liczbę przedziałów dla paska postępu
-    liczba_przedziałów = (max_zakres - 2) // rozmiar_przedzialu + \
-        (1 if (max_zakres - 2) % rozmiar_przedzialu else 0)
-    aktualny_przedział = 0
-
-    for start in range(2, max_zakres, rozmiar_przedzialu):
-        aktualny_przedział += 1
-        koniec = min(start + rozmiar_przedzialu, max_zakres)
-        srodek = (start + koniec) / 2
-
-        # Wyświetl postęp
-        if aktualny_przedział % max(1, liczba_przedziałów //
-                                    20) == 0 or aktualny_przedział == liczba_przedziałów:
-            wyswietl_postep(aktualny_przedział, liczba_przedziałów, "Analiza przedziałów")
+    if not isinstance(pierwsze, (np.ndarray, CachePierwszych)):
+        pierwsze = np.array(sorted(pierwsze), dtype=np.int64)
 
-        # Policz liczby pierwsze w przedziale
-        pierwsze_w_przedziale = sum(1 for p in pierwsze if start <= p < koniec)
+    # Granice przedziałów [start, koniec) - ostatni przedział kończy się na max_zakres
+    poczatki = np.arange(2, max_zakres, rozmiar_przedzialu, dtype=np.int64)
+    if len(poczatki) == 0:
+        return [], [], []
+    konce = np.minimum(poczatki + rozmiar_przedzialu, max_zakres)
 
-        # Oblicz gęstość jako procent
-        gestosc = (pierwsze_w_przedziale / rozmiar_przedzialu) * 100
+    if isinstance(pierwsze, CachePierwszych):
+        # Różnica rang granic (π(koniec - 1) - π(start - 1)) - przedziały przylegają,
+        # więc wystarczy jedna ranga na granicę
+        rangi = pierwsze.liczba_pierwszych_do(np.append(poczatki, konce[-1]) - 1)
+        liczby_w_przedziałach = np.diff(rangi)
+    else:
+        # Liczba pierwszych w przedziale to różnica pozycji granic w posortowanej tablicy
+        liczby_w_przedziałach = (np.searchsorted(pierwsze, konce, side='left') -
+                                 np.searchsorted(pierwsze, poczatki, side='left'))
 
-        przedzialy.append(srodek)
-        gestosci.append(gestosc)
-        liczby_w_przedziałach.append(pierwsze_w_przedziale)
+    przedzialy = ((poczatki + konce) / 2).tolist()
+    gestosci = (liczby_w_przedziałach / rozmiar_przedzialu * 100).tolist()
 
-    # Upewnij się, że pasek postępu jest zakończony
-    if liczba_przedziałów > 0:
-        wyswietl_postep(liczba_przedziałów, liczba_przedziałów, "Analiza przedziałów")
+    wyswietl_postep(len(przedzialy), len(przedzialy), "Analiza przedziałów")
 
-    return przedzialy, gestosci, liczby_w_przedziałach
+    return przedzialy, gestosci, liczby_w_przedziałach.tolist()
 
 
 def oblicz_gestosc_teoretyczna(x_values: List[float]) -> List[float]:
@@ -189,6 +175,11 @@ def wyswietl_statystyki_gestosci(
     print(f"Analizowany zakres: 2 - {max_sprawdzone:,}")
     print(f"Rozmiar przedziału: {rozmiar_przedzialu:,}")
     print(f"Liczba przedziałów: {len(przedzialy):,}")
+    if max_sprawdzone > 2:
+        # π(x) bez wyliczania liczb - łączna liczba w zakresie niezależnie od cache
+        pi_x = liczba_pierwszych_do(max_sprawdzone)
+        print(f"π({max_sprawdzone:,}) = {pi_x:,} "
+              f"(x/ln(x) = {max_sprawdzone / math.log(max_sprawdzone):,.0f})")
 
     if gestosci:
         print(f"\nGęstość rzeczywista:")
@@ -247,7 +238,7 @@ Przykłady użycia:
         print(f"Wczytywanie cache z pliku: {args.plik_cache}")
         pierwsze, max_sprawdzone = wczytaj_cache(args.plik_cache)
 
-        if not pierwsze:
+        if len(pierwsze) == 0:
             print("❌ Cache jest pusty - brak danych do analizy")
             return
 